@@ -0,0 +1,29 @@
+from app.database import engine
+from sqlalchemy import text
+
+# company_id dénormalisé sur entries / entry_lines : ajout, rattrapage des lignes existantes, index
+STATEMENTS = [
+    "ALTER TABLE entries ADD COLUMN company_id INTEGER REFERENCES companies(id)",
+    "ALTER TABLE entry_lines ADD COLUMN company_id INTEGER REFERENCES companies(id)",
+    "UPDATE entries SET company_id = (SELECT journals.company_id FROM journals WHERE journals.id = entries.journal_id) "
+    "WHERE company_id IS NULL",
+    "UPDATE entry_lines SET company_id = (SELECT entries.company_id FROM entries WHERE entries.id = entry_lines.entry_id) "
+    "WHERE company_id IS NULL",
+    "CREATE INDEX ix_entries_company_date ON entries (company_id, date, id)",
+    "CREATE INDEX ix_entry_lines_company_account ON entry_lines (company_id, account_id)",
+    "ANALYZE",
+]
+
+def add_columns():
+    for statement in STATEMENTS:
+        with engine.connect() as conn:
+            try:
+                result = conn.execute(text(statement))
+                conn.commit()
+                rows = f" ({result.rowcount} lignes)" if statement.startswith("UPDATE") else ""
+                print(f"OK: {statement.split(' SET ')[0]}{rows}")
+            except Exception as e:
+                print(f"Error (maybe already applied): {e}")
+
+if __name__ == "__main__":
+    add_columns()
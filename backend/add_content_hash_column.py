@@ -0,0 +1,21 @@
+from app.database import engine
+from sqlalchemy import text
+
+STATEMENTS = [
+    "ALTER TABLE documents ADD COLUMN content_hash VARCHAR(64)",
+    "CREATE INDEX ix_documents_content_hash ON documents (content_hash)",
+    "ALTER TABLE import_jobs ADD COLUMN content_hash VARCHAR(64)",
+]
+
+def add_columns():
+    for statement in STATEMENTS:
+        with engine.connect() as conn:
+            try:
+                conn.execute(text(statement))
+                conn.commit()
+                print(f"OK: {statement}")
+            except Exception as e:
+                print(f"Error (maybe already applied): {e}")
+
+if __name__ == "__main__":
+    add_columns()
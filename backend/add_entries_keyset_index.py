@@ -0,0 +1,19 @@
+from app.database import engine
+from sqlalchemy import text
+
+STATEMENTS = [
+    "CREATE INDEX ix_entries_date_id ON entries (date, id)",
+]
+
+def add_indexes():
+    for statement in STATEMENTS:
+        with engine.connect() as conn:
+            try:
+                conn.execute(text(statement))
+                conn.commit()
+                print(f"OK: {statement}")
+            except Exception as e:
+                print(f"Error (maybe already applied): {e}")
+
+if __name__ == "__main__":
+    add_indexes()
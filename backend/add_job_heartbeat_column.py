@@ -0,0 +1,19 @@
+from app.database import engine
+from sqlalchemy import text
+
+STATEMENTS = [
+    "ALTER TABLE import_jobs ADD COLUMN heartbeat_at TIMESTAMP",
+]
+
+def add_columns():
+    for statement in STATEMENTS:
+        with engine.connect() as conn:
+            try:
+                conn.execute(text(statement))
+                conn.commit()
+                print(f"OK: {statement}")
+            except Exception as e:
+                print(f"Error (maybe already applied): {e}")
+
+if __name__ == "__main__":
+    add_columns()
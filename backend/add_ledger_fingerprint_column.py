@@ -0,0 +1,26 @@
+from app.database import engine
+from sqlalchemy import text
+
+# Amounts are stored in minor units: the raw SUMs are the fingerprint totals.
+# Only documents whose balance cache can be used (content_hash) are filled.
+STATEMENTS = [
+    "ALTER TABLE documents ADD COLUMN ledger_fingerprint VARCHAR",
+    "UPDATE documents SET ledger_fingerprint = ("
+    "SELECT CAST(COUNT(l.id) AS VARCHAR) || ':' || CAST(COALESCE(SUM(l.debit), 0) AS VARCHAR) || ':' "
+    "|| CAST(COALESCE(SUM(l.credit), 0) AS VARCHAR) "
+    "FROM entry_lines l JOIN entries e ON e.id = l.entry_id WHERE e.document_id = documents.id"
+    ") WHERE content_hash IS NOT NULL",
+]
+
+def add_columns():
+    for statement in STATEMENTS:
+        with engine.connect() as conn:
+            try:
+                conn.execute(text(statement))
+                conn.commit()
+                print(f"OK: {statement}")
+            except Exception as e:
+                print(f"Error (maybe already applied): {e}")
+
+if __name__ == "__main__":
+    add_columns()
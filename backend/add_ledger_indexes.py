@@ -0,0 +1,29 @@
+from app.database import engine
+from sqlalchemy import text
+
+# Clés étrangères et accès par société des tables du grand livre
+STATEMENTS = [
+    "CREATE INDEX ix_accounts_company_code ON accounts (company_id, code)",
+    "CREATE INDEX ix_journals_company_code ON journals (company_id, code)",
+    "CREATE INDEX ix_entries_journal_date ON entries (journal_id, date)",
+    "CREATE INDEX ix_entries_document_id ON entries (document_id)",
+    "CREATE INDEX ix_entry_lines_entry_id ON entry_lines (entry_id)",
+    "CREATE INDEX ix_entry_lines_account_entry ON entry_lines (account_id, entry_id)",
+    "CREATE INDEX ix_documents_company_id ON documents (company_id)",
+]
+
+def add_indexes():
+    for statement in STATEMENTS:
+        with engine.connect() as conn:
+            try:
+                conn.execute(text(statement))
+                conn.commit()
+                print(f"OK: {statement}")
+            except Exception as e:
+                print(f"Error (maybe already applied): {e}")
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))  # statistiques à jour pour le planificateur
+        conn.commit()
+
+if __name__ == "__main__":
+    add_indexes()
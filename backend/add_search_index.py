@@ -0,0 +1,19 @@
+"""
+Migration : index de recherche plein texte des écritures (cf. app/services/entry_search.py).
+
+- PostgreSQL : extension pg_trgm, index GIN trigrammes sur le libellé ‖ la
+  référence des écritures et sur le libellé des lignes.
+- SQLite     : tables FTS5 (tokenizer trigram) et triggers de mise à jour,
+  puis reconstruction complète de l'index depuis entries / entry_lines.
+
+Sans risque à relancer (reconstruit l'index SQLite). Exécuter :
+  cd backend
+  python add_search_index.py
+"""
+
+from app.database import engine
+from app.services.entry_search import ensure_search_index
+
+if __name__ == "__main__":
+    ensure_search_index(engine, rebuild=True)
+    print(f"OK: index de recherche ({engine.dialect.name})")
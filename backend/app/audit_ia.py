@@ -1,6 +1,8 @@
+from sqlalchemy import BigInteger, case, type_coerce
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from . import models
+from .money import MINOR_UNITS, from_minor
+from .services import balance_snapshot
 from typing import List, Dict
 
 def analyze_entries(db: Session, company_id: int) -> Dict:
@@ -19,9 +21,30 @@ def analyze_entries(db: Session, company_id: int) -> Dict:
     status = "GREEN"
 
     # --- 1. ENTRY LEVEL CHECKS (Anomalies) ---
-    entries = db.query(models.Entry).join(models.Journal).filter(
-        models.Journal.company_id == company_id
-    ).all()
+    entries = (
+        db.query(models.Entry.id, models.Entry.date, models.Entry.label)
+        .filter(models.Entry.company_id == company_id)
+        .order_by(models.Entry.id)
+        .all()
+    )
+
+    # Rule: Suspicious Round Numbers (> 5000 and % 1000 == 0) — one query over
+    # entry_lines, on the raw minor units: { entry_id: [(amount, account code)] }
+    debit = type_coerce(models.EntryLine.debit, BigInteger)
+    credit = type_coerce(models.EntryLine.credit, BigInteger)
+    amount = case((debit > 0, debit), else_=credit)
+    round_lines = {}
+    for entry_id, line_amount, account_code in (
+        db.query(models.EntryLine.entry_id, amount, models.Account.code)
+        .outerjoin(models.Account, models.Account.id == models.EntryLine.account_id)
+        .filter(
+            models.EntryLine.company_id == company_id,
+            amount > 5000 * MINOR_UNITS,
+            amount % (1000 * MINOR_UNITS) == 0,
+        )
+        .order_by(models.EntryLine.entry_id, models.EntryLine.id)
+    ):
+        round_lines.setdefault(entry_id, []).append((from_minor(line_amount), account_code))
 
     for entry in entries:
         # Rule: Missing Labels
@@ -34,63 +57,33 @@ def analyze_entries(db: Session, company_id: int) -> Dict:
                 "description": f"Libellé absent ou trop court ('{entry.label}')."
             })
 
-        # Rule: Suspicious Round Numbers (> 5000 and % 1000 == 0)
-        for line in entry.lines:
-            amount = line.debit if line.debit > 0 else line.credit
-            if amount > 5000 and amount % 1000 == 0:
-                anomalies.append({
-                    "entry_id": entry.id,
-                    "date": entry.date.isoformat() if entry.date else None,
-                    "type": "SUSPICIOUS_ROUND",
-                    "severity": "LOW",
-                    "description": f"Montant rond ({amount}) sur le compte {line.account.code if line.account else '?'}. Vérifiez la pièce."
-                })
+        for line_amount, account_code in round_lines.get(entry.id, ()):
+            anomalies.append({
+                "entry_id": entry.id,
+                "date": entry.date.isoformat() if entry.date else None,
+                "type": "SUSPICIOUS_ROUND",
+                "severity": "LOW",
+                "description": f"Montant rond ({line_amount}) sur le compte {account_code or '?'}. Vérifiez la pièce."
+            })
 
     # --- 2. GLOBAL CHECKS (Certification) ---
 
-    # Check A: General Balance (Debit = Credit)
-    total_debit = db.query(func.sum(models.EntryLine.debit)).join(
-        models.Entry, models.Entry.id == models.EntryLine.entry_id
-    ).join(
-        models.Journal, models.Journal.id == models.Entry.journal_id
-    ).filter(
-        models.Journal.company_id == company_id
-    ).scalar() or 0
-
-    total_credit = db.query(func.sum(models.EntryLine.credit)).join(
-        models.Entry, models.Entry.id == models.EntryLine.entry_id
-    ).join(
-        models.Journal, models.Journal.id == models.Entry.journal_id
-    ).filter(
-        models.Journal.company_id == company_id
-    ).scalar() or 0
-
-    diff = round(abs(float(total_debit) - float(total_credit)), 2)
-    if diff > 0.01:
-        checks.append({"name": "Équilibre Général", "status": "KO", "message": f"Déséquilibre de {diff} FCFA"})
+    # Check A: General Balance (Debit = Credit) — per-account totals kept by account_balances
+    totals = balance_snapshot.account_totals(db, company_id)
+    diff = totals.total_debit() - totals.total_credit()  # exact, in minor units
+    if diff != 0:
+        checks.append({"name": "Équilibre Général", "status": "KO", "message": f"Déséquilibre de {from_minor(abs(diff))} FCFA"})
         score -= 50
         status = "RED"
     else:
         checks.append({"name": "Équilibre Général", "status": "OK", "message": "Balance équilibrée"})
 
     # Check B: Negative Cash Accounts (Caisse créditrice) - Class 5
-    cash_accounts = db.query(models.Account).filter(
-        models.Account.company_id == company_id,
-        models.Account.code.like("5%")
-    ).all()
-
     negative_cash_found = False
-    for acc in cash_accounts:
-        debit = db.query(func.sum(models.EntryLine.debit)).filter(
-            models.EntryLine.account_id == acc.id
-        ).scalar() or 0
-        credit = db.query(func.sum(models.EntryLine.credit)).filter(
-            models.EntryLine.account_id == acc.id
-        ).scalar() or 0
-        balance = float(debit) - float(credit)
-
+    for code in totals.matching_codes("5"):
+        balance = from_minor(totals.net_of(code))
         if balance < -100:  # Tolerance
-            checks.append({"name": f"Trésorerie ({acc.code})", "status": "WARNING", "message": f"Solde négatif : {round(balance, 2)}"})
+            checks.append({"name": f"Trésorerie ({code})", "status": "WARNING", "message": f"Solde négatif : {balance}"})
             negative_cash_found = True
 
     if negative_cash_found:
@@ -1,5 +1,11 @@
+from sqlalchemy import Integer, cast, delete, extract, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from typing import Iterable, Optional
 from . import models, schemas
+from .money import from_minor, to_minor
+import csv
+import io
 
 # --- ACCOUNTS ---
 def get_account(db: Session, account_id: int):
@@ -15,36 +21,307 @@ def create_account(db: Session, account: schemas.AccountCreate, company_id: int)
     db.refresh(db_account)
     return db_account
 
+def get_account_ids_by_code(db: Session, company_id: int) -> dict[str, int]:
+    """{ code: id } for every account of the company (no limit)."""
+    rows = db.query(models.Account.code, models.Account.id).filter(models.Account.company_id == company_id)
+    return {code: account_id for code, account_id in rows}
+
+def bulk_create_accounts(db: Session, accounts: list[dict], company_id: int) -> dict[str, int]:
+    """
+    Insert many accounts in a single INSERT ... RETURNING.
+    `accounts` items are { code, name, class_code }. Returns { code: id }.
+    Does not commit — the caller owns the transaction.
+    """
+    if not accounts:
+        return {}
+    rows = db.execute(
+        insert(models.Account).returning(models.Account.code, models.Account.id),
+        [{**acc, "company_id": company_id, "is_active": True} for acc in accounts],
+    )
+    return {code: account_id for code, account_id in rows}
+
 # --- ENTRIES ---
 def create_entry(db: Session, entry: schemas.EntryCreate):
+    company_id = db.query(models.Journal.company_id).filter(models.Journal.id == entry.journal_id).scalar()
+
     # Create Header
     db_entry = models.Entry(
         date=entry.date,
         reference=entry.reference,
         label=entry.label,
         journal_id=entry.journal_id,
+        company_id=company_id,
         document_id=entry.document_id, # Add this
         validated=False
     )
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    db.flush()  # header id for the lines — one commit for the whole entry
     
     # Create Lines
     for line in entry.lines:
         db_line = models.EntryLine(
             entry_id=db_entry.id,
+            company_id=company_id,
             account_id=line.account_id,
             debit=line.debit,
             credit=line.credit,
             label=line.label or entry.label # Default to header label if empty
         )
         db.add(db_line)
+
+    record_account_balances(db, company_id, (
+        (line.account_id, entry.date, line.debit, line.credit, 1) for line in entry.lines
+    ))
+    clear_ledger_fingerprints(db, [entry.document_id])
     
     db.commit()
     db.refresh(db_entry)
     return db_entry
 
+def bulk_create_entries(db: Session, entries: list[schemas.EntryCreate]) -> list[int]:
+    """
+    Insert many entries: all headers in one INSERT ... RETURNING (ids in input
+    order), then all lines through bulk_create_entry_lines.
+    Line labels default to the entry label, as in create_entry.
+    Does not commit — the caller owns the transaction. Returns the entry ids.
+    """
+    if not entries:
+        return []
+    journal_companies = dict(
+        db.query(models.Journal.id, models.Journal.company_id)
+        .filter(models.Journal.id.in_({entry.journal_id for entry in entries}))
+        .all()
+    )
+    entry_ids = db.scalars(
+        insert(models.Entry).returning(models.Entry.id, sort_by_parameter_order=True),
+        [
+            {
+                "date": entry.date,
+                "reference": entry.reference,
+                "label": entry.label,
+                "journal_id": entry.journal_id,
+                "company_id": journal_companies[entry.journal_id],
+                "document_id": entry.document_id,
+                "validated": False,
+            }
+            for entry in entries
+        ],
+    ).all()
+    bulk_create_entry_lines(db, [
+        {
+            "entry_id": entry_id,
+            "company_id": journal_companies[entry.journal_id],
+            "account_id": line.account_id,
+            "debit": line.debit,
+            "credit": line.credit,
+            "label": line.label or entry.label,
+        }
+        for entry_id, entry in zip(entry_ids, entries)
+        for line in entry.lines
+    ])
+
+    by_company: dict[int, list] = {}
+    for entry in entries:
+        by_company.setdefault(journal_companies[entry.journal_id], []).extend(
+            (line.account_id, entry.date, line.debit, line.credit, 1) for line in entry.lines
+        )
+    for company_id, lines in by_company.items():
+        record_account_balances(db, company_id, lines)
+    clear_ledger_fingerprints(db, [entry.document_id for entry in entries])
+    return entry_ids
+
+def clear_ledger_fingerprints(db: Session, document_ids: Iterable[Optional[int]]):
+    """
+    Lines were added to / moved off these documents: their balance cache no
+    longer matches (see services/balance_cache). Does not commit.
+    """
+    document_ids = {document_id for document_id in document_ids if document_id}
+    if document_ids:
+        db.execute(
+            update(models.Document).where(models.Document.id.in_(document_ids)).values(ledger_fingerprint=None)
+        )
+
+ENTRY_LINE_COLUMNS = ("entry_id", "company_id", "account_id", "debit", "credit", "label")
+
+def bulk_create_entry_lines(db: Session, lines: list[dict]):
+    """
+    Insert many entry lines in one statement. Each line dict carries the
+    ENTRY_LINE_COLUMNS, company_id included.
+    PostgreSQL: COPY ... FROM STDIN on the session's connection.
+    Other dialects: a single executemany INSERT.
+    Does not commit — the caller owns the transaction.
+    """
+    if not lines:
+        return
+    conn = db.connection()
+    if conn.dialect.name == "postgresql":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for line in lines:
+            # COPY bypasses the Money column type: amounts go in as minor units
+            writer.writerow([
+                to_minor(line[col]) if col in ("debit", "credit") else line[col] for col in ENTRY_LINE_COLUMNS
+            ])
+        buf.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY entry_lines ({', '.join(ENTRY_LINE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(models.EntryLine), lines)
+
+# --- ACCOUNT BALANCES ---
+# Totaux Débit / Crédit tenus à jour dans la transaction de chaque écriture :
+# - account_balances         : par (société, compte, exercice) — soldes
+# - account_monthly_balances : par (société, compte, mois) — séries, N / N-1
+# Les lectures de soldes (liasse, audit, tableau de bord) lisent quelques
+# centaines de lignes au lieu d'agréger entry_lines.
+# rebuild_account_balances recalcule les deux tables depuis les écritures.
+
+def fiscal_year_of(entry_date) -> int:
+    """Exercice d'une écriture : l'année de sa date (0 pour une écriture sans date)."""
+    return entry_date.year if entry_date else 0
+
+def period_of(entry_date) -> int:
+    """Mois d'une écriture au format AAAAMM (0 pour une écriture sans date)."""
+    return entry_date.year * 100 + entry_date.month if entry_date else 0
+
+def record_account_balances(db: Session, company_id: int, lines: Iterable[tuple]):
+    """
+    Apply written / removed lines to account_balances and account_monthly_balances.
+    `lines`: (account_id, entry_date, debit, credit, sign) — sign is 1 for a
+    written line, -1 for a removed one (an updated line is -old then +new).
+    Deltas are summed per (account, year) and (account, month) first: one
+    upsert row per account and bucket.
+    Does not commit — the caller owns the transaction.
+    """
+    yearly: dict[tuple[int, int], list] = {}
+    monthly: dict[tuple[int, int], list] = {}
+    for account_id, entry_date, debit, credit, sign in lines:
+        debit = sign * to_minor(debit)  # exact integer deltas
+        credit = sign * to_minor(credit)
+        for totals, bucket in ((yearly, fiscal_year_of(entry_date)), (monthly, period_of(entry_date))):
+            total = totals.setdefault((account_id, bucket), [0, 0, 0])
+            total[0] += debit
+            total[1] += credit
+            total[2] += sign
+    _upsert_totals(db, models.AccountBalance, "fiscal_year", company_id, yearly)
+    _upsert_totals(db, models.AccountMonthlyBalance, "period", company_id, monthly)
+
+def _upsert_totals(db: Session, model, bucket_column: str, company_id: int, totals: dict):
+    """
+    Add (debit, credit, line_count) deltas to the (company, account, bucket)
+    rows of `model`. Amount deltas are integer minor units.
+    """
+    # Fixed key order: concurrent transactions lock balance rows in the same order
+    rows = [
+        {"company_id": company_id, "account_id": account_id, bucket_column: bucket,
+         "debit": from_minor(debit), "credit": from_minor(credit), "line_count": count}
+        for (account_id, bucket), (debit, credit, count) in sorted(totals.items())
+        if debit or credit or count
+    ]
+    if not rows:
+        return
+
+    dialect = db.connection().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["company_id", "account_id", bucket_column],
+            set_={
+                "debit": model.debit + stmt.excluded.debit,
+                "credit": model.credit + stmt.excluded.credit,
+                "line_count": model.line_count + stmt.excluded.line_count,
+            },
+        )
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            balance = db.get(model, (row["company_id"], row["account_id"], row[bucket_column]))
+            if balance is None:
+                db.add(model(**row))
+            else:
+                balance.debit += row["debit"]
+                balance.credit += row["credit"]
+                balance.line_count += row["line_count"]
+        db.flush()
+
+def rebuild_account_balances(db: Session, company_id: int = None) -> int:
+    """
+    Recompute account_balances and account_monthly_balances from entry_lines
+    (all companies, or one). Does not commit. Returns the number of rows written.
+    """
+    year = cast(extract("year", models.Entry.date), Integer)
+    month = cast(extract("month", models.Entry.date), Integer)
+    buckets = (
+        (models.AccountBalance, "fiscal_year", func.coalesce(year, 0)),
+        (models.AccountMonthlyBalance, "period", func.coalesce(year * 100 + month, 0)),
+    )
+    written = 0
+    for model, bucket_column, bucket in buckets:
+        cleanup = delete(model)
+        if company_id is not None:
+            cleanup = cleanup.where(model.company_id == company_id)
+        db.execute(cleanup)
+
+        source = (
+            select(
+                models.EntryLine.company_id,
+                models.EntryLine.account_id,
+                bucket,
+                func.coalesce(func.sum(models.EntryLine.debit), 0.0),
+                func.coalesce(func.sum(models.EntryLine.credit), 0.0),
+                func.count(models.EntryLine.id),
+            )
+            .join(models.Entry, models.Entry.id == models.EntryLine.entry_id)
+            .group_by(models.EntryLine.company_id, models.EntryLine.account_id, bucket)
+        )
+        if company_id is not None:
+            source = source.where(models.EntryLine.company_id == company_id)
+        result = db.execute(
+            insert(model).from_select(
+                ["company_id", "account_id", bucket_column, "debit", "credit", "line_count"], source
+            )
+        )
+        written += result.rowcount
+    return written
+
+def get_account_totals(
+    db: Session,
+    company_id: int,
+    fiscal_year: int = None,
+    class_code: int = None,
+    code_prefix: str = None,
+) -> dict[str, tuple[float, float]]:
+    """
+    { code: (debit_total, credit_total) } of the accounts that have lines,
+    from account_balances (all fiscal years unless one is given).
+    """
+    query = (
+        db.query(
+            models.Account.code,
+            func.sum(models.AccountBalance.debit),
+            func.sum(models.AccountBalance.credit),
+        )
+        .join(models.Account, models.Account.id == models.AccountBalance.account_id)
+        .filter(models.AccountBalance.company_id == company_id, models.AccountBalance.line_count > 0)
+    )
+    if fiscal_year is not None:
+        query = query.filter(models.AccountBalance.fiscal_year == fiscal_year)
+    if class_code is not None:
+        query = query.filter(models.Account.class_code == class_code)
+    if code_prefix:
+        query = query.filter(models.Account.code.startswith(code_prefix))
+    return {
+        code: (float(debit or 0.0), float(credit or 0.0))
+        for code, debit, credit in query.group_by(models.Account.code)
+    }
+
 def get_entries(db: Session, journal_id: int = None, skip: int = 0, limit: int = 100):
     query = db.query(models.Entry)
     if journal_id:
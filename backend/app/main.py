@@ -10,6 +10,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Pagination par curseur de /accounting/entries/
 )
 
 from .database import engine, Base
@@ -19,6 +20,20 @@ from .routers import accounting, audit, auth, safe, reports, dashboard, template
 # Create all tables on startup
 Base.metadata.create_all(bind=engine)
 
+from .services import entry_search
+
+# Index de recherche plein texte (pg_trgm / FTS5), hors du modèle SQLAlchemy
+try:
+    entry_search.ensure_search_index(engine)
+except Exception as e:
+    print(f"[entry_search] WARN: index de recherche indisponible : {e}")
+
+from .services import import_jobs
+
+@app.on_event("startup")
+def resume_import_jobs():
+    import_jobs.resume_pending_jobs()
+
 app.include_router(accounting.router)
 app.include_router(audit.router)
 app.include_router(auth.router)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, JSON, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from .database import Base
+from .money import Money
 
 class AccountType(str, enum.Enum):
     ASSET = "ASSET"           # Actif
@@ -57,6 +58,7 @@ class Company(Base):
     accounts = relationship("Account", back_populates="company", cascade="all, delete-orphan")
     journals = relationship("Journal", back_populates="company", cascade="all, delete-orphan")
     documents = relationship("Document", back_populates="company", cascade="all, delete-orphan")
+    period_locks = relationship("PeriodLock", back_populates="company", cascade="all, delete-orphan")
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -76,6 +78,44 @@ class Account(Base):
     company = relationship("Company", back_populates="accounts")
 
     entries = relationship("EntryLine", back_populates="account")
+    balances = relationship("AccountBalance", back_populates="account", cascade="all, delete-orphan")
+    monthly_balances = relationship("AccountMonthlyBalance", back_populates="account", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_accounts_company_code", "company_id", "code"),  # Plan d'une société, recherche par code / préfixe
+    )
+
+class AccountBalance(Base):
+    """Totaux Débit / Crédit par compte et par exercice, tenus à jour à chaque écriture"""
+    __tablename__ = "account_balances"
+
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    fiscal_year = Column(Integer, primary_key=True)  # Année de la date d'écriture
+
+    debit = Column(Money, default=0.0)
+    credit = Column(Money, default=0.0)
+    line_count = Column(Integer, default=0)  # Nombre de lignes d'écriture agrégées
+
+    account = relationship("Account", back_populates="balances")
+
+class AccountMonthlyBalance(Base):
+    """Cube société × compte × mois : totaux Débit / Crédit par mois calendaire (graphiques, N / N-1, tendances)"""
+    __tablename__ = "account_monthly_balances"
+
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    period = Column(Integer, primary_key=True)  # AAAAMM du mois de l'écriture (0 : sans date)
+
+    debit = Column(Money, default=0.0)
+    credit = Column(Money, default=0.0)
+    line_count = Column(Integer, default=0)
+
+    account = relationship("Account", back_populates="monthly_balances")
+
+    __table_args__ = (
+        Index("ix_account_monthly_balances_company_period", "company_id", "period"),  # Plages de mois
+    )
 
 class Journal(Base):
     """Journaux Comptables (Achats, Ventes, Bq, OD...)"""
@@ -90,6 +130,10 @@ class Journal(Base):
     
     entries = relationship("Entry", back_populates="journal", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_journals_company_code", "company_id", "code"),
+    )
+
 class Entry(Base):
     """Une écriture comptable (Header)"""
     __tablename__ = "entries"
@@ -102,6 +146,8 @@ class Entry(Base):
     journal_id = Column(Integer, ForeignKey("journals.id"))
     journal = relationship("Journal", back_populates="entries")
 
+    company_id = Column(Integer, ForeignKey("companies.id"))  # Dénormalisé (société du journal)
+
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
     document = relationship("Document", back_populates="entries")
     
@@ -110,6 +156,13 @@ class Entry(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     validated = Column(Boolean, default=False) # Validé = plus modifiable (loi anti-fraude)
 
+    __table_args__ = (
+        Index("ix_entries_date_id", "date", "id"),  # Pagination par curseur (date, id)
+        Index("ix_entries_journal_date", "journal_id", "date"),  # Écritures d'une société (via journaux) par période
+        Index("ix_entries_document_id", "document_id"),  # Écritures d'une balance importée
+        Index("ix_entries_company_date", "company_id", "date", "id"),  # Écritures d'une société, par date / curseur
+    )
+
 class EntryLine(Base):
     """Ligne d'écriture (Debit/Credit)"""
     __tablename__ = "entry_lines"
@@ -121,12 +174,20 @@ class EntryLine(Base):
     
     account_id = Column(Integer, ForeignKey("accounts.id"))
     account = relationship("Account", back_populates="entries")
+
+    company_id = Column(Integer, ForeignKey("companies.id"))  # Dénormalisé (société de l'écriture)
     
-    debit = Column(Float, default=0.0)
-    credit = Column(Float, default=0.0)
+    debit = Column(Money, default=0.0)  # Unités mineures en base (cf. app/money.py)
+    credit = Column(Money, default=0.0)
     
     label = Column(String, nullable=True) # Libellé ligne si différent entête
 
+    __table_args__ = (
+        Index("ix_entry_lines_entry_id", "entry_id"),  # Lignes d'une écriture
+        Index("ix_entry_lines_account_entry", "account_id", "entry_id"),  # Mouvements d'un compte
+        Index("ix_entry_lines_company_account", "company_id", "account_id"),  # Agrégats d'une société
+    )
+
 class ReportTemplate(Base):
     """Modèles de Liasses Fiscales (Excel + Mapping)"""
     __tablename__ = "report_templates"
@@ -154,6 +215,10 @@ class Document(Base):
     filename = Column(String)
     file_path = Column(String)
     file_type = Column(String) # "balance", "other"
+    content_hash = Column(String(64), nullable=True, index=True) # SHA-256 du fichier
+    # "lignes:Σdébit:Σcrédit" (unités mineures) des lignes du document, écrit avec elles ;
+    # vidé dès qu'une autre écriture est rattachée au document (voir services/balance_cache)
+    ledger_fingerprint = Column(String, nullable=True)
     
     company_id = Column(Integer, ForeignKey("companies.id"))
     company = relationship("Company", back_populates="documents")
@@ -161,3 +226,50 @@ class Document(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_documents_company_id", "company_id"),
+    )
+
+
+class PeriodLock(Base):
+    """Clôture d'une période : écritures validées et chaînées (SHA-256) jusqu'à closing_date"""
+    __tablename__ = "period_locks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), index=True)
+    company = relationship("Company", back_populates="period_locks")
+
+    closing_date = Column(DateTime)  # Dernier jour verrouillé (inclus)
+    previous_hash = Column(String(64))  # Tête de chaîne de la clôture précédente (ou GENESIS)
+    chain_hash = Column(String(64))  # Tête de chaîne après la dernière écriture de la période
+    entries_count = Column(Integer, default=0)
+    lines_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ImportJob(Base):
+    """Import de balance exécuté en arrière-plan (file d'attente en base, sans broker)"""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+
+    filename = Column(String)   # Nom d'origine (détection de l'exercice)
+    file_path = Column(String)  # Fichier déjà sauvegardé dans uploads/
+    content_hash = Column(String(64), nullable=True)  # SHA-256 calculé à l'upload
+    incremental = Column(Boolean, default=False)  # Réimport sur l'écriture BG-<exercice> existante
+
+    status = Column(String, default="queued", index=True)  # queued, running, done, failed
+    phase = Column(String, default="queued")  # queued, parsing, writing, done
+    rows_parsed = Column(Integer, default=0)
+    rows_written = Column(Integer, default=0)
+
+    result = Column(JSON, nullable=True)  # Même contenu que la réponse d'import synchrone
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # Rafraîchi par le thread qui exécute le job
+    finished_at = Column(DateTime, nullable=True)
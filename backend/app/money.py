@@ -0,0 +1,195 @@
+import operator
+from typing import Iterable, Mapping
+
+import numpy as np
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+
+# ---------------------------------------------------------------------------
+# MONTANTS EXACTS EN UNITÉS MINEURES
+#
+# Les montants (débit, crédit, totaux) sont stockés en entiers : centièmes de
+# FCFA (BIGINT). Les sommes en base et en Python sont donc exactes — plus de
+# round(..., 2) ni de tolérance 0.01 / 0.05 pour comparer Débit et Crédit.
+# L'API et le code applicatif continuent de manipuler des montants décimaux :
+# la conversion se fait à l'écriture et à la lecture de la colonne (Money), y
+# compris pour SUM(...) et les différences débit - crédit calculées en SQL.
+# Les agrégations de soldes (liasse, contrôles) travaillent sur des tableaux
+# int64 triés par code (AccountTotals) : une somme par préfixe de compte est
+# une différence de cumuls, trouvée par recherche dichotomique.
+# ---------------------------------------------------------------------------
+
+MINOR_UNITS = 100  # 1 FCFA = 100 unités mineures
+
+
+def to_minor(amount) -> int:
+    """Decimal amount → integer minor units (nearest unit)."""
+    if amount is None:
+        return 0
+    return int(round(float(amount) * MINOR_UNITS))
+
+
+def from_minor(units) -> float:
+    """Integer minor units → decimal amount."""
+    return int(units) / MINOR_UNITS
+
+
+def to_minor_array(amounts) -> np.ndarray:
+    """Decimal amounts (list, array, Series) → int64 minor units, vectorized."""
+    values = np.asarray(amounts, dtype=np.float64)
+    return np.rint(np.nan_to_num(values) * MINOR_UNITS).astype(np.int64)
+
+
+class Money(TypeDecorator):
+    """
+    Monetary column: BIGINT of minor units in the database, float in Python.
+    Sums, differences and negations computed in SQL keep the Money type, so
+    their results are converted back as well.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    class comparator_factory(TypeDecorator.Comparator):
+        def _adapt_expression(self, op, other_comparator):
+            if op in (operator.add, operator.sub, operator.mul, operator.neg):
+                return op, self.type
+            return super()._adapt_expression(op, other_comparator)
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_minor(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_minor(value)
+
+
+# Au-delà de tout caractère d'un code : [préfixe, préfixe + PREFIX_END) couvre les codes du préfixe
+PREFIX_END = "\U0010ffff"
+
+
+def _running_sum(values: np.ndarray) -> np.ndarray:
+    """[0, v0, v0 + v1, ...]: the sum of values[i:j] is result[j] - result[i]."""
+    return np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+
+
+def _covering(prefixes: Iterable[str]) -> list[str]:
+    """Sorted prefixes without those covered by a shorter one ("1", "16" → "1"): their ranges are disjoint."""
+    kept = []
+    for prefix in sorted(set(prefixes)):
+        if not kept or not prefix.startswith(kept[-1]):
+            kept.append(prefix)
+    return kept
+
+
+class AccountTotals:
+    """
+    Per-account totals sorted by account code: codes + int64 debit / credit
+    in minor units, with their running sums. The accounts of a prefix ("41")
+    or of a code range form one contiguous slice of the sorted codes, so any
+    prefix or range sum is two np.searchsorted calls and a subtraction.
+    """
+
+    def __init__(self, codes: Iterable[str], debit, credit):
+        codes = np.asarray(codes if isinstance(codes, np.ndarray) else list(codes), dtype=str)
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.debit = np.asarray(debit, dtype=np.int64)[order]
+        self.credit = np.asarray(credit, dtype=np.int64)[order]
+        self.net = self.debit - self.credit
+        self._cum_debit = _running_sum(self.debit)
+        self._cum_credit = _running_sum(self.credit)
+        # Soldes débiteurs seuls / créditeurs seuls (sum_net(..., sign=±1))
+        self._cum_debit_balances = _running_sum(np.where(self.net > 0, self.net, 0))
+        self._cum_credit_balances = _running_sum(np.where(self.net < 0, self.net, 0))
+
+    @classmethod
+    def from_amounts(cls, totals: Mapping[str, tuple[float, float]]) -> "AccountTotals":
+        """From { code: (debit, credit) } decimal amounts."""
+        pairs = list(totals.values())
+        return cls(
+            totals.keys(),
+            to_minor_array([d for d, _ in pairs]),
+            to_minor_array([c for _, c in pairs]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _search(self, keys, side: str = "left") -> np.ndarray:
+        return np.searchsorted(self.codes, np.asarray(keys, dtype=str), side=side)
+
+    def _prefix_bounds(self, prefixes: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """(start, stop) positions of the slice of each prefix."""
+        if not prefixes:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return self._search(prefixes), self._search(np.char.add(np.asarray(prefixes, dtype=str), PREFIX_END))
+
+    def _slices(self, prefixes: tuple[str, ...]) -> tuple[np.ndarray, np.ndarray]:
+        """Disjoint slices covering the accounts of any of `prefixes` (all accounts when none)."""
+        if not prefixes:
+            return np.array([0]), np.array([len(self.codes)])
+        return self._prefix_bounds(_covering(prefixes))
+
+    def _running(self, sign: int) -> np.ndarray:
+        if sign > 0:
+            return self._cum_debit_balances
+        if sign < 0:
+            return self._cum_credit_balances
+        return self._cum_debit - self._cum_credit
+
+    def sum_net(self, *prefixes: str, sign: int = 0) -> int:
+        """
+        Σ (debit - credit) of the accounts starting with any of `prefixes`
+        (all accounts when none), in minor units. `sign`: 1 = debit balances
+        only, -1 = credit balances only, 0 = all.
+        """
+        start, stop = self._slices(prefixes)
+        running = self._running(sign)
+        return int((running[stop] - running[start]).sum())
+
+    def sum_range(self, first: str, last: str, sign: int = 0) -> int:
+        """
+        Σ (debit - credit) of the accounts from `first` to `last`, both read as
+        prefixes: sum_range("601", "605") covers 601* … 605*. Minor units.
+        """
+        start, stop = self._search([first, last + PREFIX_END])
+        running = self._running(sign)
+        return int(running[max(stop, start)] - running[start])
+
+    def sum_prefixes(self, prefixes: list[str]) -> np.ndarray:
+        """Σ (debit - credit) of each prefix taken separately, one int64 per prefix (vectorized)."""
+        start, stop = self._prefix_bounds(prefixes)
+        running = self._running(0)
+        return running[stop] - running[start]
+
+    def net_of_codes(self, codes: list[str]) -> np.ndarray:
+        """Net balance of each exact account code (0 when absent), one int64 per code."""
+        if not codes:
+            return np.zeros(0, dtype=np.int64)
+        running = self._running(0)
+        return running[self._search(codes, side="right")] - running[self._search(codes)]
+
+    def net_of(self, code: str) -> int:
+        """Net balance (minor units) of one exact account code, 0 if absent."""
+        return int(self.net_of_codes([code])[0])
+
+    def matching_codes(self, *prefixes: str) -> list[str]:
+        """Sorted codes of the accounts starting with any of `prefixes`."""
+        start, stop = self._slices(prefixes)
+        return [code for a, b in zip(start.tolist(), stop.tolist()) for code in self.codes[a:b].tolist()]
+
+    def count(self, *prefixes: str) -> int:
+        """Number of accounts starting with any of `prefixes`."""
+        start, stop = self._slices(prefixes)
+        return int((stop - start).sum())
+
+    def total_debit(self) -> int:
+        return int(self._cum_debit[-1])
+
+    def total_credit(self) -> int:
+        return int(self._cum_credit[-1])
+
+    def as_amounts(self) -> dict[str, float]:
+        """{ code: debit - credit } in decimal amounts, by code."""
+        return {code: from_minor(net) for code, net in zip(self.codes.tolist(), self.net.tolist())}
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
-from sqlalchemy.orm import Session
-from typing import List
-import pandas as pd
-import io
-import math
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Literal, Optional
+import base64
 import os
 import shutil
-from datetime import datetime
+from datetime import date, datetime
 
 from .. import schemas, crud, models
 from ..database import get_db
+from ..money import from_minor, to_minor
 from ..syscohada import seed_syscohada
+from ..services import balance_import, batch_import, bulk_entries, entry_search, import_jobs, ledger_export, period_lock, storage
 
 router = APIRouter(
     prefix="/accounting",
@@ -50,28 +53,187 @@ def create_journal(journal: schemas.JournalCreate, company_id: int, db: Session
 # --- ENTRIES ---
 @router.post("/entries/", response_model=schemas.Entry)
 def create_entry_transaction(entry: schemas.EntryCreate, db: Session = Depends(get_db)):
-    # Validate Debit = Credit
-    total_debit = sum(line.debit for line in entry.lines)
-    total_credit = sum(line.credit for line in entry.lines)
+    # Validate Debit = Credit — exact, in minor units (amounts are stored as such)
+    total_debit = sum(to_minor(line.debit) for line in entry.lines)
+    total_credit = sum(to_minor(line.credit) for line in entry.lines)
     
-    if abs(total_debit - total_credit) > 0.05: # Allow small float error
-        raise HTTPException(status_code=400, detail=f"Unbalanced Entry: Debit ({total_debit}) != Credit ({total_credit})")
+    if total_debit != total_credit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unbalanced Entry: Debit ({from_minor(total_debit)}) != Credit ({from_minor(total_credit)})",
+        )
+
+    company_id = db.query(models.Journal.company_id).filter(models.Journal.id == entry.journal_id).scalar()
+    try:
+        period_lock.ensure_open(db, company_id, entry.date)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
         
     return crud.create_entry(db=db, entry=entry)
 
+@router.post("/entries/bulk")
+def create_entries_bulk(entries: List[schemas.EntryCreate], atomic: bool = False, db: Session = Depends(get_db)):
+    """
+    Création d'écritures en lot (intégrations banque / caisse).
+
+    Chaque écriture est contrôlée (Débit = Crédit, journal, comptes et document
+    de la même société) ; les écritures valides sont insérées en quelques
+    requêtes multi-lignes dans une seule transaction.
+    `atomic=true` : une seule écriture invalide fait rejeter tout le lot.
+    Retourne un résultat par écriture, dans l'ordre reçu (entry_id ou erreur).
+    """
+    return bulk_entries.create_entries(db, entries, atomic=atomic)
+
+def _encode_cursor(entry: models.Entry) -> str:
+    return base64.urlsafe_b64encode(f"{entry.date.isoformat()}|{entry.id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date_part, id_part = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
 @router.get("/entries/", response_model=List[schemas.Entry])
-def read_entries(company_id: int = None, journal_id: int = None, skip: int = 0, limit: int = 200, db: Session = Depends(get_db)):
-    query = db.query(models.Entry)
+def read_entries(
+    response: Response,
+    company_id: int = None,
+    journal_id: int = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 200,
+    db: Session = Depends(get_db),
+):
+    """
+    Écritures, des plus récentes aux plus anciennes (date, puis id).
+
+    Pagination par curseur : quand la page est pleine, l'en-tête `X-Next-Cursor`
+    contient le curseur de la page suivante (?cursor=...). Chaque page coûte
+    deux requêtes (écritures, puis toutes leurs lignes en un lot), quelle que
+    soit sa profondeur. `skip` reste accepté pour les anciens clients.
+    """
+    query = db.query(models.Entry).options(selectinload(models.Entry.lines))
     if journal_id:
         query = query.filter(models.Entry.journal_id == journal_id)
     elif company_id:
-        # Filter by company through journal
-        query = query.join(models.Journal).filter(models.Journal.company_id == company_id)
-    return query.order_by(models.Entry.date.desc()).offset(skip).limit(limit).all()
+        query = query.filter(models.Entry.company_id == company_id)
+
+    query = query.order_by(models.Entry.date.desc(), models.Entry.id.desc())
+    if cursor:
+        after_date, after_id = _decode_cursor(cursor)
+        query = query.filter(tuple_(models.Entry.date, models.Entry.id) < tuple_(after_date, after_id))
+    elif skip:
+        query = query.offset(skip)
+
+    entries = query.limit(limit).all()
+    if len(entries) == limit and entries[-1].date is not None:
+        response.headers["X-Next-Cursor"] = _encode_cursor(entries[-1])
+    return entries
+
+# --- RECHERCHE ---
+@router.get("/search/{company_id}")
+def search_entries(
+    company_id: int,
+    q: str,
+    journal_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    amount_min: Optional[float] = None,
+    amount_max: Optional[float] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+):
+    """
+    Recherche d'écritures par fragments de libellé ou de référence
+    (ex. « btci mars »), sur l'en-tête comme sur les libellés de lignes.
+
+    Chaque terme doit compter au moins 3 caractères. Filtres : journal, dates,
+    montant (une ligne au débit ou au crédit dans [amount_min, amount_max]).
+    Résultats classés par pertinence (`score`), puis du plus récent au plus ancien.
+    """
+    try:
+        return entry_search.search_entries(
+            db, company_id, q, journal_id, date_from, date_to, amount_min, amount_max, limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+# --- CLÔTURE DE PÉRIODE (LOI ANTI-FRAUDE) ---
+@router.post("/lock/{company_id}", response_model=schemas.PeriodLock)
+def lock_period(company_id: int, closing_date: date, db: Session = Depends(get_db)):
+    """
+    Clôture (valide) toutes les écritures de la société jusqu'à `closing_date`
+    incluse. Les écritures sont chaînées par SHA-256 dans l'ordre (date, id),
+    à la suite de la clôture précédente ; la tête de chaîne est conservée.
+    Aucune écriture ne peut ensuite être passée dans la période clôturée.
+    """
+    try:
+        return period_lock.lock_period(db, company_id, closing_date)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@router.get("/lock/{company_id}", response_model=List[schemas.PeriodLock])
+def read_period_locks(company_id: int, db: Session = Depends(get_db)):
+    return (
+        db.query(models.PeriodLock)
+        .filter(models.PeriodLock.company_id == company_id)
+        .order_by(models.PeriodLock.closing_date)
+        .all()
+    )
+
+@router.get("/lock/{company_id}/verify")
+def verify_period_locks(company_id: int, lock_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Recalcule la chaîne de hachage, période par période (ou seulement `lock_id`),
+    en lisant les écritures par lots. `valid` est faux dès qu'une écriture
+    verrouillée a été modifiée, ajoutée, supprimée ou dévalidée.
+    """
+    try:
+        return period_lock.verify_chain(db, company_id, lock_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+# --- GRAND LIVRE ---
+@router.get("/ledger/{company_id}")
+def export_ledger(
+    company_id: int,
+    format: Literal["csv", "ndjson"] = "csv",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    account: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Export du grand livre d'une société, en flux (CSV ou NDJSON).
+
+    Une ligne par ligne d'écriture, triées par compte puis chronologiquement :
+    date, compte, journal, pièce, libellés, débit, crédit et solde progressif
+    du compte (reports antérieurs à `date_from` inclus).
+    `account` : préfixe de compte (ex. 411) pour restreindre l'export.
+    """
+    if not db.query(models.Company.id).filter(models.Company.id == company_id).first():
+        raise HTTPException(status_code=404, detail="Société introuvable")
+
+    query = ledger_export.ledger_query(company_id, date_from, date_to, account)
+    period = "_".join(d.isoformat() for d in (date_from, date_to) if d) or "complet"
+    filename = f"grand_livre_{company_id}_{period}.{format}"
+    if format == "csv":
+        content, media_type = ledger_export.stream_csv(query), "text/csv; charset=utf-8"
+    else:
+        content, media_type = ledger_export.stream_ndjson(query), "application/x-ndjson"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 # --- IMPORT BALANCE ---
-@router.post("/import-balance/{company_id}")
-async def import_balance(company_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+@router.post("/import-balance/{company_id}", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
+async def import_balance(
+    company_id: int, file: UploadFile = File(...), incremental: bool = False, db: Session = Depends(get_db)
+):
     """
     Importe une Balance Générale (Excel ou CSV) au format SYSCOHADA Révisé.
 
@@ -80,307 +242,95 @@ async def import_balance(company_id: int, file: UploadFile = File(...), db: Sess
     - 6 colonnes  : Compte | Libellé | Débit Mvt | Crédit Mvt | Solde D | Solde C
     - 8 colonnes  : Compte | Libellé | Débit Mvt | Crédit Mvt | Reprise AN | ... | Solde D | Solde C
     Lorsque les soldes ET les mouvements sont présents, on utilise les SOLDES (colonnes finales).
-    """
 
-    # ------------------------------------------------------------------ #
-    # 1. Sauvegarde physique du fichier                                    #
-    # ------------------------------------------------------------------ #
-    BASE_UPLOAD_DIR = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "uploads"
-    )
-    company_dir = os.path.join(BASE_UPLOAD_DIR, str(company_id))
-    os.makedirs(company_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename.replace(' ', '_')}"
-    file_path = os.path.join(company_dir, safe_filename)
-
-    contents = await file.read()
-    with open(file_path, "wb") as buf:
-        buf.write(contents)
+    `incremental=true` : réimport d'une balance corrigée. L'écriture BG-<exercice>
+    existante est mise à jour compte par compte (lignes ajoutées / modifiées /
+    supprimées uniquement) au lieu d'en créer une seconde ; le document précédent
+    est conservé pour l'historique.
 
-    # Essai de détection de l'exercice dans le nom de fichier (ex: "Balance_2025.xlsx")
-    import re
-    year_match = re.search(r"20\d{2}", file.filename)
-    fiscal_year = int(year_match.group()) if year_match else datetime.now().year
+    L'import est mis en file d'attente : la réponse contient l'identifiant du job
+    à suivre via GET /accounting/import-jobs/{job_id}.
+    """
 
     # ------------------------------------------------------------------ #
-    # 2. Enregistrement du Document                                        #
+    # 1. Sauvegarde physique du fichier (streaming + SHA-256)              #
     # ------------------------------------------------------------------ #
-    db_doc = models.Document(
-        name=f"Balance Générale {fiscal_year} — Import {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        filename=safe_filename,
-        file_path=file_path,
-        file_type="balance",
-        company_id=company_id,
-    )
-    db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
+    _, file_path = storage.company_upload_path(company_id, file.filename)
+    content_hash = await storage.save_upload(file, file_path)
 
     # ------------------------------------------------------------------ #
-    # 3. Lecture du fichier                                                #
+    # 2. Lecture, parsing et écriture en arrière-plan                      #
     # ------------------------------------------------------------------ #
-    try:
-        if file.filename.lower().endswith(".csv"):
-            # Try semicolon first (French locale), then comma
-            try:
-                df_raw = pd.read_csv(io.BytesIO(contents), sep=";", header=None, dtype=str)
-                if df_raw.shape[1] < 3:
-                    df_raw = pd.read_csv(io.BytesIO(contents), sep=",", header=None, dtype=str)
-            except Exception:
-                df_raw = pd.read_csv(io.BytesIO(contents), header=None, dtype=str)
-        else:
-            df_raw = pd.read_excel(io.BytesIO(contents), header=None, dtype=str)
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=f"Fichier illisible : {str(exc)}")
+    return import_jobs.enqueue_import(db, company_id, file_path, file.filename, content_hash, incremental)
 
-    # ------------------------------------------------------------------ #
-    # 4. Détection des en-têtes                                           #
-    # ------------------------------------------------------------------ #
-    # Scan the first 5 rows to find a header row
-    header_row_idx = None
-    HEADER_KEYWORDS = {"compte", "account", "numero", "numéro", "code", "libellé", "intitulé"}
-
-    for i in range(min(5, len(df_raw))):
-        row_vals = {str(v).strip().lower() for v in df_raw.iloc[i].tolist()}
-        if row_vals & HEADER_KEYWORDS:
-            header_row_idx = i
-            break
-
-    if header_row_idx is not None:
-        df = df_raw.iloc[header_row_idx + 1:].reset_index(drop=True)
-        df.columns = [str(v).strip().lower() for v in df_raw.iloc[header_row_idx].tolist()]
-    else:
-        df = df_raw.copy()
-        # Generate positional column names
-        num_cols = df.shape[1]
-        col_names = [f"col_{i}" for i in range(num_cols)]
-        # ── Standard SYSCOHADA balance layouts ──
-        # 4-col : Compte | Libellé | Débit | Crédit
-        # 6-col : Compte | Libellé | Débit Mvt | Crédit Mvt | Solde D | Solde C
-        # 8-col : Compte | Libellé | Débit Mvt | Crédit Mvt | AN D | AN C | Solde D | Solde C
-        if num_cols >= 2:
-            col_names[0] = "compte"
-            col_names[1] = "libellé"
-        if num_cols == 4:
-            col_names[2] = "solde_debit"
-            col_names[3] = "solde_credit"
-        elif num_cols == 6:
-            col_names[2] = "mvt_debit"
-            col_names[3] = "mvt_credit"
-            col_names[4] = "solde_debit"
-            col_names[5] = "solde_credit"
-        elif num_cols >= 8:
-            # Use last two numeric columns as soldes
-            col_names[num_cols - 2] = "solde_debit"
-            col_names[num_cols - 1] = "solde_credit"
-        df.columns = col_names
-
-    df.columns = [str(c).strip().lower() for c in df.columns]
 
-    # ------------------------------------------------------------------ #
-    # 5. Identification des colonnes clés                                  #
-    # ------------------------------------------------------------------ #
-    col_map: dict[str, str] = {}
-
-    ACCOUNT_KEYS  = ["compte", "account", "numéro", "numero", "code"]
-    LABEL_KEYS    = ["libellé", "intitulé", "label", "description", "libelle", "intitule"]
-    # Prefer solde columns over mouvement columns
-    DEBIT_KEYS    = ["solde_debit", "solde débit", "sd", "débit", "debit"]
-    CREDIT_KEYS   = ["solde_credit", "solde crédit", "sc", "crédit", "credit"]
-    BALANCE_KEYS  = ["solde", "balance"]
-
-    for col in df.columns:
-        col_l = col.lower()
-        if not col_map.get("account") and any(k in col_l for k in ACCOUNT_KEYS):
-            col_map["account"] = col
-        if not col_map.get("label") and any(k in col_l for k in LABEL_KEYS):
-            col_map["label"] = col
-        if not col_map.get("debit") and any(k in col_l for k in DEBIT_KEYS):
-            col_map["debit"] = col
-        if not col_map.get("credit") and any(k in col_l for k in CREDIT_KEYS):
-            col_map["credit"] = col
-        if not col_map.get("balance") and any(k in col_l for k in BALANCE_KEYS):
-            col_map["balance"] = col
-
-    if "account" not in col_map:
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                "Impossible de trouver la colonne 'Compte' dans le fichier. "
-                "Vérifiez que votre fichier contient bien les colonnes : "
-                "Compte | Libellé | Débit | Crédit (ou Solde Débiteur | Solde Créditeur)."
-            )
+@router.post("/import-balance/{company_id}/preview")
+async def preview_import_balance(
+    company_id: int, file: UploadFile = File(...), sample: int = 20, db: Session = Depends(get_db)
+):
+    """
+    Aperçu (dry-run) d'un import de balance : rien n'est écrit, ni document,
+    ni compte, ni écriture.
+
+    Retourne les colonnes détectées (col_map), un échantillon de lignes parsées,
+    le nombre de lignes ignorées, les totaux Débit / Crédit, l'écart et la ligne
+    d'équilibrage 4799 qui serait passée, les comptes à créer et l'écriture
+    BG-<exercice> existante éventuelle (réimport incrémental).
+    Un fichier inexploitable est rejeté dès la lecture de ses premières lignes.
+    """
+    file_path = await storage.save_temporary_upload(file)
+    try:
+        return await run_in_threadpool(
+            balance_import.preview_balance_file, db, company_id, file_path, file.filename, sample
         )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        os.remove(file_path)
+
+
+@router.post("/import-batch")
+async def import_balance_batch(
+    files: List[UploadFile] = File(...),
+    companies: List[str] = Form(...),
+    incremental: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Import de portefeuille : plusieurs balances, plusieurs sociétés, un seul appel.
 
-    # ------------------------------------------------------------------ #
-    # 6. Journal OD propre à la société                                    #
-    # ------------------------------------------------------------------ #
-    od_journal = (
-        db.query(models.Journal)
-        .filter(models.Journal.company_id == company_id, models.Journal.code == "OD")
-        .first()
-    )
-    if not od_journal:
-        od_journal = models.Journal(code="OD", name="Opérations Diverses", company_id=company_id)
-        db.add(od_journal)
-        db.commit()
-        db.refresh(od_journal)
-
-    # ------------------------------------------------------------------ #
-    # 7. Parsing ligne par ligne                                           #
-    # ------------------------------------------------------------------ #
-    existing_accounts = {acc.code: acc for acc in crud.get_accounts(db, company_id, limit=5000)}
-    entry_lines: list[schemas.EntryLineCreate] = []
-    skipped_rows = 0
-    accounts_created = 0
-
-    def _to_float(val) -> float:
-        if val is None or (isinstance(val, float) and math.isnan(val)):
-            return 0.0
-        try:
-            return float(str(val).replace(" ", "").replace("\xa0", "").replace(",", "."))
-        except (ValueError, TypeError):
-            return 0.0
-
-    for _, row in df.iterrows():
-        code_raw = str(row.get(col_map["account"], "")).split(".")[0].strip().lstrip("0")
-        # Keep leading structure: don't strip all zeros (e.g. "101" not "11")
-        code_raw = str(row.get(col_map["account"], "")).strip()
-        # Remove trailing decimals e.g. "411.0" → "411"
-        code_raw = code_raw.split(".")[0].strip()
-
-        if not code_raw or code_raw.lower() in {"nan", "", "total", "totaux"}:
-            skipped_rows += 1
-            continue
-
-        # Skip non-numeric account codes (subtotals lines, etc.)
-        if not re.match(r"^\d{2,}", code_raw):
-            skipped_rows += 1
-            continue
-
-        label_raw = str(row.get(col_map.get("label", ""), "Solde Initial")).strip()
-        if not label_raw or label_raw.lower() == "nan":
-            label_raw = f"Compte {code_raw}"
-
-        # Read debit/credit
-        if "debit" in col_map and "credit" in col_map:
-            debit  = _to_float(row.get(col_map["debit"]))
-            credit = _to_float(row.get(col_map["credit"]))
-        elif "balance" in col_map:
-            bal = _to_float(row.get(col_map["balance"]))
-            debit  = bal if bal > 0 else 0.0
-            credit = abs(bal) if bal < 0 else 0.0
-        else:
-            skipped_rows += 1
-            continue
-
-        if debit == 0.0 and credit == 0.0:
-            skipped_rows += 1
-            continue
-
-        # Find or create account
-        if code_raw not in existing_accounts:
-            try:
-                class_code = int(code_raw[0])
-            except (ValueError, IndexError):
-                class_code = 0
-
-            new_acc = schemas.AccountCreate(
-                code=code_raw,
-                name=label_raw[:120],
-                class_code=class_code,
-            )
-            db_acc = crud.create_account(db, new_acc, company_id)
-            existing_accounts[code_raw] = db_acc
-            accounts_created += 1
-
-        account_id = existing_accounts[code_raw].id
-        entry_lines.append(schemas.EntryLineCreate(
-            account_id=account_id,
-            debit=round(debit, 2),
-            credit=round(credit, 2),
-            label=label_raw[:120],
-        ))
-
-    if not entry_lines:
+    `companies[i]` identifie la société du fichier `files[i]` (NIF ou ID).
+    Le parsing est réparti sur un pool de processus ; chaque dossier est écrit
+    dans sa propre transaction. Retourne un rapport par fichier.
+    `incremental` : réimport sur les écritures BG-<exercice> existantes (cf. /import-balance).
+    """
+    if len(companies) != len(files):
         raise HTTPException(
             status_code=400,
-            detail=(
-                f"Aucune ligne comptable valide trouvée ({skipped_rows} lignes ignorées). "
-                "Vérifiez le format du fichier et que les colonnes Compte / Débit / Crédit sont présentes."
-            )
-        )
-
-    # ------------------------------------------------------------------ #
-    # 8. Équilibrage automatique via compte d'attente 479                  #
-    # ------------------------------------------------------------------ #
-    total_d = round(sum(l.debit for l in entry_lines), 2)
-    total_c = round(sum(l.credit for l in entry_lines), 2)
-    gap      = round(total_d - total_c, 2)
-    gap_note = None
-
-    SUSPENSE_CODE = "4799"
-    if abs(gap) > 0.01:
-        # Create / re-use compte d'attente 4799
-        if SUSPENSE_CODE not in existing_accounts:
-            susp_acc = schemas.AccountCreate(code=SUSPENSE_CODE, name="Compte d'attente — Écart de balance", class_code=4)
-            db_susp  = crud.create_account(db, susp_acc, company_id)
-            existing_accounts[SUSPENSE_CODE] = db_susp
-            accounts_created += 1
-
-        susp_id = existing_accounts[SUSPENSE_CODE].id
-        if gap > 0:
-            # Debit > Credit → add credit line to balance
-            entry_lines.append(schemas.EntryLineCreate(
-                account_id=susp_id, debit=0.0, credit=gap,
-                label=f"Équilibrage automatique — Écart {gap:,.2f}"
-            ))
-        else:
-            # Credit > Debit → add debit line to balance
-            entry_lines.append(schemas.EntryLineCreate(
-                account_id=susp_id, debit=abs(gap), credit=0.0,
-                label=f"Équilibrage automatique — Écart {abs(gap):,.2f}"
-            ))
-
-        gap_note = (
-            f"⚠ La balance importée présentait un écart de {abs(gap):,.2f} FCFA "
-            f"({'Débit > Crédit' if gap > 0 else 'Crédit > Débit'}). "
-            f"Il a été passé automatiquement en compte d'attente {SUSPENSE_CODE}. "
-            "Vérifiez et corrigez si nécessaire avant de générer la liasse."
+            detail=f"{len(files)} fichier(s) pour {len(companies)} société(s) : chaque fichier doit être associé à une société.",
         )
 
-    # ------------------------------------------------------------------ #
-    # 9. Création de l'écriture                                            #
-    # ------------------------------------------------------------------ #
-    entry_data = schemas.EntryCreate(
-        company_id=company_id,
-        journal_id=od_journal.id,
-        date=datetime(fiscal_year, 12, 31),   # Close of fiscal year
-        reference=f"BG-{fiscal_year}",
-        label=f"Balance Générale {fiscal_year} — {file.filename}",
-        document_id=db_doc.id,
-        lines=entry_lines,
-    )
+    items = []
+    for file, company_ref in zip(files, companies):
+        company_id = batch_import.resolve_company_id(db, company_ref)
+        item = {"filename": file.filename, "company": company_ref, "company_id": company_id}
+        if company_id is not None:
+            _, item["file_path"] = storage.company_upload_path(company_id, file.filename)
+            item["content_hash"] = await storage.save_upload(file, item["file_path"])
+        items.append(item)
 
-    try:
-        new_entry = crud.create_entry(db, entry_data)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Erreur création d'écriture : {str(exc)}")
-
-    return {
-        "status": "success",
-        "document_id": db_doc.id,
-        "entries_count": len(entry_lines),
-        "accounts_created": accounts_created,
-        "accounts_matched": len(entry_lines) - accounts_created,
-        "skipped_rows": skipped_rows,
-        "fiscal_year": fiscal_year,
-        "total_debit": round(total_d, 2),
-        "total_credit": round(total_c, 2),
-        "gap": round(gap, 2),
-        "gap_note": gap_note,
-    }
+    reports = await run_in_threadpool(batch_import.run_batch, db, items, incremental=incremental)
+    return batch_import.summarize(reports)
 
 
+@router.get("/import-jobs/{job_id}", response_model=schemas.ImportJob)
+def read_import_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Statut d'un import de balance : phase, lignes lues / écrites.
+    Une fois terminé (status = "done"), `result` contient le rapport d'import
+    (entries_count, gap_note, ...).
+    """
+    job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import introuvable")
+    return job
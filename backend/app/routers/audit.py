@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Literal
-from .. import audit_ia, models
+from typing import Literal, Optional
+from .. import audit_ia
 from ..database import get_db
+from ..money import MINOR_UNITS, AccountTotals, from_minor
+from ..services import balance_snapshot
 
 router = APIRouter(
     prefix="/audit",
@@ -26,29 +27,14 @@ def run_audit_analysis(company_id: int, db: Session = Depends(get_db)):
 # Contrôles de cohérence conformes aux 3 règles OTR
 # ---------------------------------------------------------------------------
 
-def _get_balances(db: Session, company_id: int) -> dict[str, float]:
-    """Return { account_code: debit - credit } for a company."""
-    rows = (
-        db.query(
-            models.Account.code,
-            func.sum(models.EntryLine.debit).label("debit"),
-            func.sum(models.EntryLine.credit).label("credit"),
-        )
-        .join(models.EntryLine, models.EntryLine.account_id == models.Account.id)
-        .join(models.Entry, models.Entry.id == models.EntryLine.entry_id)
-        .filter(models.Account.company_id == company_id)
-        .group_by(models.Account.code)
-        .all()
-    )
-    return {r.code: float(r.debit or 0) - float(r.credit or 0) for r in rows}
+def _get_balances(db: Session, company_id: int, document_id: Optional[int] = None) -> AccountTotals:
+    """Per-account totals (int64 minor units) for a company, or for one imported document — shared snapshot."""
+    return balance_snapshot.account_totals(db, company_id, document_id)
 
 
-def _sum_prefix(balances: dict, *prefixes: str, negate: bool = False) -> float:
-    """Sum all balances whose key starts with any of the given prefixes."""
-    total = sum(
-        v for k, v in balances.items()
-        if any(k.startswith(p) for p in prefixes)
-    )
+def _sum_prefix(balances: AccountTotals, *prefixes: str, negate: bool = False) -> int:
+    """Sum (minor units) of all balances whose code starts with any of the given prefixes — two binary searches per prefix."""
+    total = balances.sum_net(*prefixes)
     return -total if negate else total
 
 
@@ -68,14 +54,15 @@ def _check(
 
 
 @router.get("/coherence/{company_id}")
-def run_coherence_checks(company_id: int, db: Session = Depends(get_db)):
+def run_coherence_checks(company_id: int, document_id: Optional[int] = None, db: Session = Depends(get_db)):
     """
     Exécute les 3 contrôles de cohérence OTR :
       1. Total Actif Net = Total Passif
       2. Résultat Net (Bilan) = Résultat Net (Compte de Résultat)
       3. Trésorerie nette cohérente (Actif - Passif courant BQ)
+    Avec `document_id`, les contrôles portent sur la balance importée par ce document.
     """
-    b = _get_balances(db, company_id)
+    b = _get_balances(db, company_id, document_id)
 
     if not b:
         return {
@@ -85,10 +72,7 @@ def run_coherence_checks(company_id: int, db: Session = Depends(get_db)):
 
     # ---- 1. TOTAL ACTIF NET = TOTAL PASSIF --------------------------------
     # Actif brut = Classe 2 (actif immob.) + Classe 3 (stocks) + Classe 4 déb. + Classe 5 déb.
-    actif_brut = _sum_prefix(b, "2", "3") + sum(
-        v for k, v in b.items()
-        if (k.startswith("4") or k.startswith("5")) and v > 0
-    )
+    actif_brut = _sum_prefix(b, "2", "3") + b.sum_net("4", "5", sign=1)
     # Amortissements & provisions = comptes 28x, 29x, 39x, 49x (créditeurs → négatifs en D-C)
     amort = _sum_prefix(b, "28", "29", "39", "49")  # négatifs normalement
     actif_net = actif_brut + amort  # amort < 0 donc soustrait bien
@@ -96,17 +80,17 @@ def run_coherence_checks(company_id: int, db: Session = Depends(get_db)):
     # Passif = Capitaux propres (1) + Dettes (16, 17) + Passif circulant (4 créd.) + BQ passif (56)
     passif = (
         _sum_prefix(b, "1", "16", "17", negate=True)
-        + sum(-v for k, v in b.items()
-              if (k.startswith("4") or k.startswith("56")) and v < 0)
+        - b.sum_net("4", "56", sign=-1)
     )
 
-    ecart_bilan = round(actif_net - passif, 2)
+    # Montants exacts en unités mineures ; le seuil (moins de 1 FCFA) est l'arrondi de la liasse
+    ecart_bilan = actif_net - passif
     check1 = _check(
         name="Équilibre du Bilan (Actif Net = Passif)",
-        passed=abs(ecart_bilan) < 1.0,
-        detail_ok=f"Le bilan est équilibré. Actif Net ≈ Passif ({round(actif_net, 2):,.0f} FCFA).",
-        detail_fail=f"Déséquilibre de {ecart_bilan:,.2f} FCFA. Vérifiez les écritures de clôture.",
-        values={"actif_net": round(actif_net, 2), "passif": round(passif, 2), "ecart": ecart_bilan},
+        passed=abs(ecart_bilan) < MINOR_UNITS,
+        detail_ok=f"Le bilan est équilibré. Actif Net ≈ Passif ({from_minor(actif_net):,.0f} FCFA).",
+        detail_fail=f"Déséquilibre de {from_minor(ecart_bilan):,.2f} FCFA. Vérifiez les écritures de clôture.",
+        values={"actif_net": from_minor(actif_net), "passif": from_minor(passif), "ecart": from_minor(ecart_bilan)},
     )
 
     # ---- 2. RÉSULTAT NET BILAN = RÉSULTAT NET COMPTE DE RÉSULTAT ----------
@@ -118,17 +102,17 @@ def run_coherence_checks(company_id: int, db: Session = Depends(get_db)):
     charges  = _sum_prefix(b, "6", "81", "82", "83", "84", "89")  # débiteurs
     res_cr = produits - charges
 
-    ecart_res = round(res_bilan - res_cr, 2)
+    ecart_res = res_bilan - res_cr
     check2 = _check(
         name="Cohérence Résultat (Bilan ↔ Compte de Résultat)",
-        passed=abs(ecart_res) < 1.0,
-        detail_ok=f"Le résultat est cohérent ({round(res_bilan, 2):,.0f} FCFA) entre le bilan et le compte de résultat.",
+        passed=abs(ecart_res) < MINOR_UNITS,
+        detail_ok=f"Le résultat est cohérent ({from_minor(res_bilan):,.0f} FCFA) entre le bilan et le compte de résultat.",
         detail_fail=(
-            f"Le résultat du bilan ({round(res_bilan, 2):,.0f} FCFA) diffère du résultat du CR "
-            f"({round(res_cr, 2):,.0f} FCFA). Écart : {ecart_res:,.2f} FCFA. "
+            f"Le résultat du bilan ({from_minor(res_bilan):,.0f} FCFA) diffère du résultat du CR "
+            f"({from_minor(res_cr):,.0f} FCFA). Écart : {from_minor(ecart_res):,.2f} FCFA. "
             "Vérifiez l'affectation du résultat (compte 13) et les écritures de clôture."
         ),
-        values={"resultat_bilan": round(res_bilan, 2), "resultat_cr": round(res_cr, 2), "ecart": ecart_res},
+        values={"resultat_bilan": from_minor(res_bilan), "resultat_cr": from_minor(res_cr), "ecart": from_minor(ecart_res)},
     )
 
     # ---- 3. TRÉSORERIE NETTE (Actif - Concours bancaires) -----------------
@@ -138,22 +122,22 @@ def run_coherence_checks(company_id: int, db: Session = Depends(get_db)):
     # Trésorerie passive : 56 (Crédits de trésorerie, découverts)
     tresorerie_passive = _sum_prefix(b, "56", negate=True)  # créditeur → negate → positif
 
-    tresorerie_nette = round(tresorerie_active - tresorerie_passive, 2)
+    tresorerie_nette = tresorerie_active - tresorerie_passive
 
     # Contrôle : la trésorerie nette doit être de signe cohérent (un découvert global est un signal)
     check3 = _check(
         name="Trésorerie Nette (Comptes 52+57 − Concours 56)",
         passed=True,  # Informatif : on signale juste la valeur, pas d'erreur bloquante
         detail_ok=(
-            f"Trésorerie nette : {tresorerie_nette:,.0f} FCFA "
-            f"(Actif BQ/Caisse : {tresorerie_active:,.0f} | Découverts : {tresorerie_passive:,.0f}). "
+            f"Trésorerie nette : {from_minor(tresorerie_nette):,.0f} FCFA "
+            f"(Actif BQ/Caisse : {from_minor(tresorerie_active):,.0f} | Découverts : {from_minor(tresorerie_passive):,.0f}). "
             + ("⚠ Situation de découvert net." if tresorerie_nette < 0 else "Situation créditrice.")
         ),
         detail_fail="",
         values={
-            "tresorerie_active": round(tresorerie_active, 2),
-            "tresorerie_passive": round(tresorerie_passive, 2),
-            "tresorerie_nette": tresorerie_nette,
+            "tresorerie_active": from_minor(tresorerie_active),
+            "tresorerie_passive": from_minor(tresorerie_passive),
+            "tresorerie_nette": from_minor(tresorerie_nette),
         },
     )
     # Downgrade to WARNING if overdraft
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Dict
-from datetime import datetime, timedelta
+from typing import List, Dict, Literal, Optional
+from datetime import date, datetime, timedelta
 
-from .. import models, schemas
+from .. import crud, models, schemas
 from ..database import get_db
+from ..services import balance_cube
 
 router = APIRouter(
     prefix="/dashboard",
@@ -21,27 +22,12 @@ def get_dashboard_stats(company_id: int, db: Session = Depends(get_db)):
     now = datetime.utcnow()
     last_month = now - timedelta(days=30)
 
-    # 1. Total Activity (Entries count) - filter by company via journal
-    total_entries = db.query(models.Entry).join(models.Journal).filter(
-        models.Journal.company_id == company_id
-    ).count()
+    # 1. Total Activity (Entries count) - company_id stored on the entry
+    total_entries = db.query(func.count(models.Entry.id)).filter(models.Entry.company_id == company_id).scalar()
 
-    # 2. Cash Flow (Trésorerie) - Class 5
-    cash_accounts = db.query(models.Account.id).filter(
-        models.Account.company_id == company_id,
-        models.Account.class_code == 5
-    ).all()
-    cash_account_ids = [acc.id for acc in cash_accounts]
-
-    cash_balance = 0.0
-    if cash_account_ids:
-        kpi_cash = db.query(
-            func.sum(models.EntryLine.debit),
-            func.sum(models.EntryLine.credit)
-        ).filter(models.EntryLine.account_id.in_(cash_account_ids)).first()
-
-        if kpi_cash and kpi_cash[0] is not None:
-            cash_balance = float(kpi_cash[0] or 0) - float(kpi_cash[1] or 0)
+    # 2. Cash Flow (Trésorerie) - Class 5, from the per-account totals of account_balances
+    cash_totals = crud.get_account_totals(db, company_id, class_code=5)
+    cash_balance = sum(d - c for d, c in cash_totals.values())
 
     # 3. Revenue vs Expenses (Last 30 days) - using aggregation, not lazy loading
     revenue_data = db.query(
@@ -53,6 +39,7 @@ def get_dashboard_stats(company_id: int, db: Session = Depends(get_db)):
     ).filter(
         models.Entry.date >= last_month,
         models.Account.company_id == company_id,
+        models.EntryLine.company_id == company_id,
         models.Account.class_code == 7
     ).scalar() or 0.0
 
@@ -65,42 +52,28 @@ def get_dashboard_stats(company_id: int, db: Session = Depends(get_db)):
     ).filter(
         models.Entry.date >= last_month,
         models.Account.company_id == company_id,
+        models.EntryLine.company_id == company_id,
         models.Account.class_code == 6
     ).scalar() or 0.0
 
     # 4. Recent Entries (Last 5)
-    recent_entries = db.query(models.Entry).join(models.Journal).filter(
-        models.Journal.company_id == company_id
+    recent_entries = db.query(models.Entry).filter(
+        models.Entry.company_id == company_id
     ).order_by(models.Entry.date.desc()).limit(5).all()
 
-    # 5. Real monthly chart data - last 7 months
+    # 5. Real monthly chart data - last 7 months, one query on the monthly cube
     MONTH_NAMES = ["Jan", "Fév", "Mar", "Avr", "Mai", "Jun", "Jul", "Aoû", "Sep", "Oct", "Nov", "Déc"]
-    chart_data = []
-    for i in range(6, -1, -1):
-        month_date = now - timedelta(days=30 * i)
-        month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if month_start.month == 12:
-            month_end = month_start.replace(year=month_start.year + 1, month=1)
-        else:
-            month_end = month_start.replace(month=month_start.month + 1)
-
-        month_cash = db.query(
-            func.sum(models.EntryLine.debit) - func.sum(models.EntryLine.credit)
-        ).join(
-            models.Entry, models.Entry.id == models.EntryLine.entry_id
-        ).join(
-            models.Account, models.Account.id == models.EntryLine.account_id
-        ).filter(
-            models.Entry.date >= month_start,
-            models.Entry.date < month_end,
-            models.Account.company_id == company_id,
-            models.Account.class_code == 5
-        ).scalar() or 0.0
-
-        chart_data.append({
+    chart_months = [now - timedelta(days=30 * i) for i in range(6, -1, -1)]
+    month_cash = balance_cube.monthly_balances(
+        db, company_id, [crud.period_of(month_date) for month_date in chart_months], class_code=5
+    )
+    chart_data = [
+        {
             "name": MONTH_NAMES[month_date.month - 1],
-            "solde": round(float(month_cash), 2)
-        })
+            "solde": round(float(month_cash[crud.period_of(month_date)]), 2)
+        }
+        for month_date in chart_months
+    ]
 
     return {
         "kpi": {
@@ -120,3 +93,37 @@ def get_dashboard_stats(company_id: int, db: Session = Depends(get_db)):
         ],
         "chart_data": chart_data
     }
+
+@router.get("/cube/{company_id}")
+def read_balance_cube(
+    company_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    prefix: List[str] = Query(default=[]),
+    class_code: Optional[int] = None,
+    by: List[Literal["period", "account", "class"]] = Query(default=["period"]),
+    db: Session = Depends(get_db),
+):
+    """
+    Totaux Débit / Crédit / Solde du cube société × compte × mois.
+
+    `by` : axes de regroupement (period = mois AAAAMM, account, class), répétable.
+    `prefix` : préfixes de comptes (répétable, ex. ?prefix=70&prefix=71).
+    `date_from` / `date_to` : bornes incluses, au mois près.
+    """
+    return balance_cube.rollup(db, company_id, date_from, date_to, prefix, class_code, by)
+
+@router.get("/comparative/{company_id}")
+def read_comparative(
+    company_id: int,
+    fiscal_year: int,
+    prefix: List[str] = Query(default=[]),
+    class_code: Optional[int] = None,
+    by: List[Literal["account", "class"]] = Query(default=["account"]),
+    db: Session = Depends(get_db),
+):
+    """Soldes de l'exercice N et N-1 et variation, par compte ou par classe."""
+    try:
+        return balance_cube.comparative(db, company_id, fiscal_year, prefix, class_code, by)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
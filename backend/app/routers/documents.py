@@ -2,12 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Respons
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List
-import shutil
 import os
-from datetime import datetime
 
 from .. import schemas, crud, models
 from ..database import get_db
+from ..services import storage
 
 router = APIRouter(
     prefix="/documents",
@@ -15,10 +14,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-BASE_UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "uploads")
-
-if not os.path.exists(BASE_UPLOAD_DIR):
-    os.makedirs(BASE_UPLOAD_DIR)
+if not os.path.exists(storage.BASE_UPLOAD_DIR):
+    os.makedirs(storage.BASE_UPLOAD_DIR)
 
 @router.post("/upload/{company_id}", response_model=schemas.Document)
 async def upload_document(
@@ -28,26 +25,16 @@ async def upload_document(
     file_type: str = "other",
     db: Session = Depends(get_db)
 ):
-    # Ensure company upload dir exists
-    company_dir = os.path.join(BASE_UPLOAD_DIR, str(company_id))
-    if not os.path.exists(company_dir):
-        os.makedirs(company_dir)
-    
-    # Generate safe filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename.replace(' ', '_')}"
-    file_path = os.path.join(company_dir, safe_filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
+    safe_filename, file_path = storage.company_upload_path(company_id, file.filename)
+    content_hash = await storage.save_upload(file, file_path)
+
     # Create DB record
     db_doc = models.Document(
         name=name or file.filename,
         filename=safe_filename,
         file_path=file_path,
         file_type=file_type,
+        content_hash=content_hash,
         company_id=company_id
     )
     db.add(db_doc)
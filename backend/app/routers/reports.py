@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from .. import otr_generator
 from ..database import get_db
 
@@ -16,8 +17,12 @@ def download_liasse_otr(company_id: int, db: Session = Depends(get_db)):
     return FileResponse(path=file_path, filename=f"Liasse_OTR_Auditia.xlsx", media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
 @router.post("/generate/{template_id}/{company_id}")
-def generate_custom_report(template_id: int, company_id: int, db: Session = Depends(get_db)):
-    """Generate a report based on a custom Excel template."""
+def generate_custom_report(template_id: int, company_id: int, document_id: Optional[int] = None,
+                           engine: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Generate a report based on a custom Excel template (optionally from one imported balance document).
+    engine: "openpyxl" or "xml" (direct XML injection), default INJECTION_ENGINE.
+    """
     from .. import models
     from ..services.injector import ExcelInjector
     import json
@@ -39,9 +44,9 @@ def generate_custom_report(template_id: int, company_id: int, db: Session = Depe
     output_path = f"/tmp/{output_filename}" # Use tmp for now
 
     # 4. Run Injector
-    injector = ExcelInjector(db, company_id)
+    injector = ExcelInjector(db, company_id, document_id=document_id)
     try:
-        injector.generate_report(template.file_path, output_path, mapping)
+        injector.generate_report(template.file_path, output_path, mapping, engine=engine)
     except Exception as e:
          return {"error": f"Generation failed: {str(e)}"}
 
@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from ..money import from_minor
 from ..database import get_db
-from ..models import Company, Account, EntryLine, Entry, Journal
+from ..models import Company, Entry
 from ..services.injector import ExcelInjector
+from ..services import balance_snapshot, mapping_rules
+import json
 import os
 from datetime import datetime
 from typing import Optional
@@ -131,8 +134,7 @@ def validate_prerequisites(company_id: int, document_id: Optional[int] = None, d
     # ------------------------------------------------------------------ #
     entry_query = (
         db.query(func.count(Entry.id))
-        .join(Journal, Journal.id == Entry.journal_id)
-        .filter(Journal.company_id == company_id)
+        .filter(Entry.company_id == company_id)
     )
     if document_id:
         entry_query = entry_query.filter(Entry.document_id == document_id)
@@ -154,28 +156,19 @@ def validate_prerequisites(company_id: int, document_id: Optional[int] = None, d
             "detail": f"{nb_entries:,} écriture(s) disponible(s) pour la génération.",
         })
 
+    # Totaux par compte partagés avec la liasse et les contrôles (même instantané) :
+    # account_balances pour tout le dossier, balance importée pour un document
+    totals = balance_snapshot.account_totals(db, company_id, document_id) if nb_entries > 0 else None
+
     # ------------------------------------------------------------------ #
     # 4. Balance équilibrée (Σ Débit = Σ Crédit)                         #
     # ------------------------------------------------------------------ #
-    if nb_entries > 0:
-        q_base = (
-            db.query(
-                func.sum(EntryLine.debit).label("total_debit"),
-                func.sum(EntryLine.credit).label("total_credit"),
-            )
-            .join(Entry, Entry.id == EntryLine.entry_id)
-            .join(Journal, Journal.id == Entry.journal_id)
-            .filter(Journal.company_id == company_id)
-        )
-        if document_id:
-            q_base = q_base.filter(Entry.document_id == document_id)
-
-        row = q_base.first()
-        total_debit  = float(row.total_debit or 0)
-        total_credit = float(row.total_credit or 0)
-        diff = round(abs(total_debit - total_credit), 2)
+    if totals is not None:
+        debit_minor, credit_minor = totals.total_debit(), totals.total_credit()
+        total_debit, total_credit = from_minor(debit_minor), from_minor(credit_minor)
+        diff = from_minor(abs(debit_minor - credit_minor))
 
-        if diff > 0.01:
+        if debit_minor != credit_minor:
             msg = (
                 f"La balance n'est pas équilibrée : Σ Débit = {total_debit:,.2f} / "
                 f"Σ Crédit = {total_credit:,.2f} — Écart : {diff:,.2f} FCFA. "
@@ -193,25 +186,9 @@ def validate_prerequisites(company_id: int, document_id: Optional[int] = None, d
     # ------------------------------------------------------------------ #
     # 5. Comptes clés alimentés (Classes requises)                        #
     # ------------------------------------------------------------------ #
-    if nb_entries > 0:
-        # Get all account codes that have movements for this company
-        populated_codes = {
-            row.code
-            for row in (
-                db.query(Account.code)
-                .join(EntryLine, EntryLine.account_id == Account.id)
-                .join(Entry, Entry.id == EntryLine.entry_id)
-                .join(Journal, Journal.id == Entry.journal_id)
-                .filter(Journal.company_id == company_id)
-                .distinct()
-                .all()
-            )
-        }
-
+    if totals is not None:
         for label, prefixes in REQUIRED_ACCOUNT_CLASSES.items():
-            has_accounts = any(
-                code.startswith(p) for code in populated_codes for p in prefixes
-            )
+            has_accounts = totals.count(*prefixes) > 0
             if not has_accounts:
                 detail = (
                     f"Aucun mouvement trouvé pour les comptes commençant par "
@@ -222,7 +199,7 @@ def validate_prerequisites(company_id: int, document_id: Optional[int] = None, d
                 warnings.append(f"{label} : {detail}")
             else:
                 # Find sample accounts
-                samples = [c for c in sorted(populated_codes) if any(c.startswith(p) for p in prefixes)][:3]
+                samples = totals.matching_codes(*prefixes)[:3]
                 checks.append({
                     "name": label,
                     "status": "OK",
@@ -246,7 +223,7 @@ def validate_prerequisites(company_id: int, document_id: Optional[int] = None, d
 #
 # Structure : { "Nom_Feuille!Cellule": "règle" }
 #
-# Syntaxe des règles (ExcelInjector._get_value_for_mapping) :
+# Syntaxe des règles (compilées par services/mapping_rules) :
 #   "701*"           → Somme Débit-Crédit de tous les comptes commençant par 701
 #   "-70*"           → Negate : les produits (créditeurs) sortent positifs
 #   "ABS(281*)"      → Valeur absolue (amortissements = soldes créditeurs)
@@ -482,11 +459,12 @@ def debug_injection(company_id: int, document_id: Optional[int] = None, db: Sess
     balances_non_nuls = {k: v for k, v in injector.balances.items() if v != 0}
 
     # ── Évaluation du mapping ──
+    values = mapping_rules.compile_mapping(OTR_MAPPING).evaluate(injector.totals)
     mapping_hits = []
     mapping_zeros = []
     for cell_ref, rule in OTR_MAPPING.items():
-        val = injector._get_value_for_mapping(rule)
-        entry = {"cell": cell_ref, "rule": rule, "value": round(val, 2)}
+        val = values[cell_ref]
+        entry = {"cell": cell_ref, "rule": rule, "value": val}
         if val != 0:
             mapping_hits.append(entry)
         else:
@@ -544,9 +522,13 @@ def debug_injection(company_id: int, document_id: Optional[int] = None, db: Sess
 async def generate_liasse(
     company_id: int,
     document_id: Optional[int] = None,
+    engine: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Generate the fiscal liasse (OTR/SYSCOHADA) by injecting account balances into the template."""
+    """
+    Generate the fiscal liasse (OTR/SYSCOHADA) by injecting account balances into the template.
+    engine: "openpyxl" or "xml" (direct XML injection), default INJECTION_ENGINE.
+    """
     company = db.query(Company).filter(Company.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Société introuvable")
@@ -568,6 +550,7 @@ async def generate_liasse(
             template_path=TEMPLATE_PATH,
             output_path=output_path,
             mapping_config=OTR_MAPPING,
+            engine=engine,
         )
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
@@ -586,10 +569,11 @@ async def generate_liasse(
 async def generate_smt(
     company_id: int,
     document_id: Optional[int] = None,
+    engine: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Generate the Synthèse des Moyens de Trésorerie (SMT) — reuses OTR engine."""
-    return await generate_liasse(company_id, document_id, db)
+    return await generate_liasse(company_id, document_id, engine, db)
 
 
 # ---------------------------------------------------------------------------
@@ -611,7 +595,16 @@ def update_template_mapping(template_id: int, payload: dict, db: Session = Depen
     tmpl = db.query(models.ReportTemplate).filter(models.ReportTemplate.id == template_id).first()
     if not tmpl:
         raise HTTPException(status_code=404, detail="Modèle introuvable")
-    tmpl.mapping_config = payload.get("mapping_config", tmpl.mapping_config)
+    mapping_config = payload.get("mapping_config", tmpl.mapping_config)
+    # Règles invalides refusées à l'enregistrement plutôt qu'à la génération
+    try:
+        mapping = json.loads(mapping_config or "{}")
+        if not isinstance(mapping, dict):
+            raise ValueError("mapping_config doit être un objet JSON { cellule: règle }")
+        mapping_rules.compile_mapping(mapping)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    tmpl.mapping_config = mapping_config
     db.commit()
     db.refresh(tmpl)
     return tmpl
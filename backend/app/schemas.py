@@ -115,6 +115,20 @@ class Entry(EntryBase):
     class Config:
         from_attributes = True
 
+# --- PERIOD LOCK SCHEMAS ---
+class PeriodLock(BaseModel):
+    id: int
+    company_id: int
+    closing_date: datetime
+    previous_hash: str
+    chain_hash: str
+    entries_count: int
+    lines_count: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # --- USER SCHEMAS ---
 class UserBase(BaseModel):
     email: str
@@ -183,9 +197,30 @@ class Document(DocumentBase):
     id: int
     filename: str
     file_path: str
+    content_hash: Optional[str] = None
     created_at: datetime
     company_id: int
     
     class Config:
         from_attributes = True
 
+
+# --- IMPORT JOB SCHEMAS ---
+class ImportJob(BaseModel):
+    id: int
+    company_id: int
+    document_id: Optional[int] = None
+    filename: str
+    incremental: bool = False
+    status: str
+    phase: str
+    rows_parsed: int
+    rows_written: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,155 @@
+import os
+import traceback
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app import models
+from app.money import from_minor, to_minor_array
+from app.services import balance_import
+
+try:
+    import pyarrow  # noqa: F401 — Parquet engine for pandas
+except ImportError:  # pragma: no cover — the cache is simply disabled
+    pyarrow = None
+
+
+# ---------------------------------------------------------------------------
+# PARSED BALANCE CACHE
+#
+# Les lignes normalisées d'une balance importée (code, libellé, débit, crédit,
+# y compris la ligne d'équilibrage 4799) sont conservées en Parquet, un
+# fichier par contenu : <BALANCE_CACHE_DIR>/<sha256>.parquet.
+# Liasse, debug d'injection, contrôles de cohérence et validation lisent ce
+# fichier quand un document_id est donné, au lieu d'agréger entry_lines.
+# Cache perdu ou évincé → reconstruit depuis l'upload d'origine s'il existe.
+# Le cache n'est utilisé que si son empreinte (nombre de lignes, totaux Débit /
+# Crédit en unités mineures) est celle enregistrée sur le document dans la
+# transaction qui a écrit ses lignes : une seule ligne lue, pas d'agrégat sur
+# entry_lines. Écriture ajoutée au document, réimport incrémental sur un autre
+# document → empreinte vidée, lecture en base.
+# ---------------------------------------------------------------------------
+
+BALANCE_CACHE_DIR = os.getenv(
+    "BALANCE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cache", "balances"),
+)
+# Au-delà, les fichiers les moins récemment lus sont supprimés
+BALANCE_CACHE_MAX_BYTES = int(os.getenv("BALANCE_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+CACHE_COLUMNS = ["code", "label", "debit", "credit"]
+
+
+def enabled() -> bool:
+    return pyarrow is not None
+
+
+def _cache_path(content_hash: str) -> str:
+    return os.path.join(BALANCE_CACHE_DIR, f"{content_hash}.parquet")
+
+
+def ledger_lines(lines: pd.DataFrame) -> pd.DataFrame:
+    """Parsed lines + the 4799 line write_balance adds for a gap: what lands in entry_lines."""
+    debit_minor, credit_minor = balance_import.balance_totals(lines)
+    if debit_minor == credit_minor:
+        return lines[CACHE_COLUMNS]
+    gap = from_minor(debit_minor - credit_minor)
+    return pd.concat([lines[CACHE_COLUMNS], pd.DataFrame([balance_import.suspense_line(gap)])[CACHE_COLUMNS]],
+                     ignore_index=True)
+
+
+def store(content_hash: str, lines: pd.DataFrame):
+    """
+    Write the cache file for a balance: parsed lines; the 4799 line is added here via ledger_lines.
+    Never raises: a failed cache write must not fail the import.
+    """
+    if not enabled() or not content_hash:
+        return
+    try:
+        os.makedirs(BALANCE_CACHE_DIR, exist_ok=True)
+        path = _cache_path(content_hash)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        ledger_lines(lines).to_parquet(tmp_path, index=False, compression="zstd")
+        os.replace(tmp_path, path)  # readers never see a half-written file
+        evict()
+    except Exception:
+        traceback.print_exc()
+
+
+def evict(max_bytes: int = None):
+    """Drop least recently used files until the cache fits in max_bytes."""
+    max_bytes = BALANCE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        entries = [e for e in os.scandir(BALANCE_CACHE_DIR) if e.name.endswith(".parquet")]
+    except FileNotFoundError:
+        return
+    stats = [(e.path, e.stat()) for e in entries]
+    total = sum(st.st_size for _, st in stats)
+    for path, st in sorted(stats, key=lambda item: item[1].st_mtime):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= st.st_size
+        except FileNotFoundError:
+            pass
+
+
+def fingerprint(lines: pd.DataFrame) -> str:
+    """"count:Σdebit:Σcredit" (minor units) of ledger lines, as stored in Document.ledger_fingerprint."""
+    return f"{len(lines)}:{int(to_minor_array(lines['debit']).sum())}:{int(to_minor_array(lines['credit']).sum())}"
+
+
+def load_lines(db: Session, company_id: int, document_id: int) -> Optional[pd.DataFrame]:
+    """
+    Cached lines (code | label | debit | credit) of a balance document, or None
+    when the caller should read entry_lines instead (no cache for this document,
+    or the ledger no longer matches the imported file).
+    """
+    if not enabled() or not document_id:
+        return None
+
+    document = (
+        db.query(models.Document)
+        .filter(models.Document.id == document_id, models.Document.company_id == company_id)
+        .first()
+    )
+    if not document or not document.content_hash or not document.ledger_fingerprint:
+        return None
+
+    path = _cache_path(document.content_hash)
+    lines = None
+    if os.path.exists(path):
+        try:
+            lines = pd.read_parquet(path, columns=CACHE_COLUMNS)
+            os.utime(path)  # LRU: mark as recently used
+        except Exception:
+            traceback.print_exc()
+    if lines is None and document.file_path and os.path.exists(document.file_path):
+        # Evicted: the original upload is still there, parse it again once
+        try:
+            parsed, _, _ = balance_import.parse_balance_file(document.file_path, document.filename or document.file_path)
+        except ValueError:
+            return None
+        store(document.content_hash, parsed)
+        lines = ledger_lines(parsed)
+    if lines is None:
+        return None
+
+    # Same line count and same totals to the minor unit as the lines written for the document
+    if fingerprint(lines) != document.ledger_fingerprint:
+        return None
+    return lines
+
+
+def account_totals(db: Session, company_id: int, document_id: int) -> Optional[dict[str, tuple[float, float]]]:
+    """{ code: (debit_total, credit_total) } from the cache, or None (see load_lines)."""
+    lines = load_lines(db, company_id, document_id)
+    if lines is None:
+        return None
+    grouped = lines.groupby("code", sort=False)[["debit", "credit"]].sum()
+    return {
+        code: (float(debit), float(credit))
+        for code, debit, credit in zip(grouped.index, grouped["debit"], grouped["credit"])
+    }
@@ -0,0 +1,125 @@
+from datetime import date
+from typing import Optional, Sequence
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.money import from_minor, to_minor
+
+
+# ---------------------------------------------------------------------------
+# CUBE SOCIÉTÉ × COMPTE × MOIS
+#
+# account_monthly_balances contient les totaux Débit / Crédit de chaque compte
+# par mois calendaire (AAAAMM), tenus à jour dans la transaction de chaque
+# écriture (crud.record_account_balances). Les graphiques, comparatifs N / N-1
+# et tendances agrègent ici quelques centaines de lignes au lieu de parcourir
+# entry_lines. La granularité est le mois : une borne de dates inclut tout son
+# mois.
+# ---------------------------------------------------------------------------
+
+# Axes de regroupement : mois, compte, classe SYSCOHADA
+DIMENSIONS = {
+    "period": models.AccountMonthlyBalance.period,
+    "account": models.Account.code,
+    "class": models.Account.class_code,
+}
+
+
+def rollup(
+    db: Session,
+    company_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    prefixes: Sequence[str] = (),
+    class_code: Optional[int] = None,
+    by: Sequence[str] = ("period",),
+) -> list[dict]:
+    """
+    Totals of the cube, grouped along `by` (any of "period", "account", "class";
+    empty = one grand total), for the months of [date_from, date_to], the
+    accounts starting with one of `prefixes` and / or of class `class_code`.
+
+    Returns one dict per group, sorted by its keys:
+      { <dimension>: value, ..., "debit": float, "credit": float, "balance": float }
+    """
+    unknown = [name for name in by if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Axe(s) de regroupement inconnu(s) : {', '.join(unknown)}")
+
+    keys = [DIMENSIONS[name] for name in by]
+    cube = models.AccountMonthlyBalance
+    query = (
+        db.query(*keys, func.sum(cube.debit), func.sum(cube.credit), func.sum(cube.debit - cube.credit))
+        .join(models.Account, models.Account.id == cube.account_id)
+        .filter(cube.company_id == company_id, cube.line_count > 0)
+    )
+    if date_from:
+        query = query.filter(cube.period >= crud.period_of(date_from))
+    if date_to:
+        query = query.filter(cube.period <= crud.period_of(date_to))
+    if prefixes:
+        query = query.filter(or_(*(models.Account.code.startswith(p) for p in prefixes)))
+    if class_code is not None:
+        query = query.filter(models.Account.class_code == class_code)
+    if keys:
+        query = query.group_by(*keys).order_by(*keys)
+
+    # Exact sums: the cube stores minor units (app/money.py)
+    return [
+        {
+            **dict(zip(by, row[:-3])),
+            "debit": row[-3] or 0.0,
+            "credit": row[-2] or 0.0,
+            "balance": row[-1] or 0.0,
+        }
+        for row in query.all()
+    ]
+
+
+def monthly_balances(db: Session, company_id: int, periods: Sequence[int], **filters) -> dict[int, float]:
+    """{ AAAAMM: debit - credit } for each requested month (0.0 when nothing was posted)."""
+    if not periods:
+        return {}
+    rows = rollup(
+        db, company_id,
+        date_from=date(min(periods) // 100, min(periods) % 100, 1),
+        date_to=date(max(periods) // 100, max(periods) % 100, 1),
+        by=("period",),
+        **filters,
+    )
+    found = {row["period"]: row["balance"] for row in rows}
+    return {period: found.get(period, 0.0) for period in periods}
+
+
+def comparative(
+    db: Session,
+    company_id: int,
+    fiscal_year: int,
+    prefixes: Sequence[str] = (),
+    class_code: Optional[int] = None,
+    by: Sequence[str] = ("account",),
+) -> list[dict]:
+    """
+    Exercice N vs N-1 along `by` (default: per account).
+    One dict per group present in either year:
+      { <dimension>: value, ..., "balance_n", "balance_n1", "variation" }
+    """
+    if "period" in by:
+        raise ValueError("Le comparatif N / N-1 ne se regroupe pas par mois")
+
+    def year_totals(year: int) -> dict[tuple, float]:
+        rows = rollup(db, company_id, date(year, 1, 1), date(year, 12, 31), prefixes, class_code, by)
+        return {tuple(row[name] for name in by): row["balance"] for row in rows}
+
+    current, previous = year_totals(fiscal_year), year_totals(fiscal_year - 1)
+    return [
+        {
+            **dict(zip(by, key)),
+            "balance_n": current.get(key, 0.0),
+            "balance_n1": previous.get(key, 0.0),
+            "variation": from_minor(to_minor(current.get(key, 0.0)) - to_minor(previous.get(key, 0.0))),
+        }
+        for key in sorted(current.keys() | previous.keys(), key=lambda k: tuple(str(v) for v in k))
+    ]
@@ -0,0 +1,808 @@
+import itertools
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.money import from_minor, to_minor, to_minor_array
+from app.services import balance_cache, period_lock
+
+
+# ---------------------------------------------------------------------------
+# BALANCE IMPORT PIPELINE
+#
+# Lecture → détection des en-têtes → identification des colonnes → parsing.
+# Le parsing travaille sur des colonnes entières (pandas) et non ligne à ligne :
+# nettoyage des codes, filtrage des sous-totaux et conversion des montants au
+# format français ("1 250 000,50") se font en quelques opérations vectorisées.
+# ---------------------------------------------------------------------------
+
+HEADER_KEYWORDS = {"compte", "account", "numero", "numéro", "code", "libellé", "intitulé"}
+
+ACCOUNT_KEYS  = ["compte", "account", "numéro", "numero", "code"]
+LABEL_KEYS    = ["libellé", "intitulé", "label", "description", "libelle", "intitule"]
+# Prefer solde columns over mouvement columns
+DEBIT_KEYS    = ["solde_debit", "solde débit", "sd", "débit", "debit"]
+CREDIT_KEYS   = ["solde_credit", "solde crédit", "sc", "crédit", "credit"]
+BALANCE_KEYS  = ["solde", "balance"]
+
+# Codes that mark total / empty rows rather than accounts
+SKIP_CODES = {"nan", "", "total", "totaux"}
+
+DEFAULT_LABEL = "Solde Initial"
+MAX_LABEL_LENGTH = 120
+
+# Compte d'attente used to absorb a Débit/Crédit gap
+SUSPENSE_CODE = "4799"
+SUSPENSE_NAME = "Compte d'attente — Écart de balance"
+
+
+# Rows handed to the column-mapping stage at a time when streaming an .xlsx balance
+XLSX_CHUNK_ROWS = 20_000
+
+
+# on_progress(phase, **counters) — e.g. on_progress("parsing", rows_parsed=1200)
+ProgressCallback = Callable[..., None]
+
+
+def detect_fiscal_year(filename: str) -> int:
+    """Exercice deviné depuis le nom de fichier (ex: "Balance_2025.xlsx"), sinon l'année courante."""
+    year_match = re.search(r"20\d{2}", filename)
+    return int(year_match.group()) if year_match else datetime.now().year
+
+
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _zip_part_path(target: str) -> str:
+    """Relationship target (relative to xl/ or absolute) → zip member name."""
+    return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+
+
+def _column_index(cell_ref: str) -> int:
+    """'AB12' → 27 (0-based column index)."""
+    idx = 0
+    for ch in cell_ref:
+        if ch.isdigit():
+            break
+        idx = idx * 26 + (ord(ch.upper()) - 64)
+    return idx - 1
+
+
+def iter_xlsx_rows(file_path: str) -> Iterator[tuple]:
+    """
+    Stream the rows of the FIRST sheet of an .xlsx as tuples of raw values.
+
+    Only workbook.xml, its relationships, the shared strings and the first
+    sheet's XML are read — other sheets, styles and drawings are never parsed.
+    Rows are yielded from row 1 / column A like openpyxl's read-only mode
+    (missing rows come out empty) with trailing empty cells trimmed.
+    Numbers come back as int/float, text as str, booleans as bool; date cells
+    keep their serial number (no style lookup).
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        wb_root = ET.fromstring(zf.read("xl/workbook.xml"))
+        ns = wb_root.tag[: wb_root.tag.index("}") + 1]
+        first_sheet = wb_root.find(f"{ns}sheets/{ns}sheet")
+        rel_id = first_sheet.get(f"{_REL_NS}id") or next(
+            v for k, v in first_sheet.attrib.items() if k.endswith("}id")
+        )
+
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        sheet_part, strings_part = None, None
+        for rel in rels.iter(f"{_PKG_REL_NS}Relationship"):
+            if rel.get("Id") == rel_id:
+                sheet_part = _zip_part_path(rel.get("Target"))
+            elif rel.get("Type", "").endswith("/sharedStrings"):
+                strings_part = _zip_part_path(rel.get("Target"))
+
+        shared: list[str] = []
+        if strings_part and strings_part in zf.namelist():
+            with zf.open(strings_part) as fh:
+                for _, elem in ET.iterparse(fh):
+                    if elem.tag == f"{ns}si":
+                        # Plain <t> or rich-text runs <r><t>; phonetic <rPh> ignored
+                        parts = [t.text or "" for t in elem.iterfind(f"{ns}t")]
+                        parts += [t.text or "" for t in elem.iterfind(f"{ns}r/{ns}t")]
+                        shared.append("".join(parts))
+                        elem.clear()
+
+        row_tag, c_tag, v_tag = f"{ns}row", f"{ns}c", f"{ns}v"
+        is_t_path = f"{ns}is/{ns}t"
+        next_row = 1
+        with zf.open(sheet_part) as fh:
+            for _, elem in ET.iterparse(fh):
+                if elem.tag != row_tag:
+                    continue
+
+                row_num = int(elem.get("r") or next_row)
+                while next_row < row_num:
+                    yield ()
+                    next_row += 1
+                next_row = row_num + 1
+
+                values: list = []
+                for cell in elem.iter(c_tag):
+                    ref = cell.get("r")
+                    col = _column_index(ref) if ref else len(values)
+                    cell_type = cell.get("t", "n")
+                    if cell_type == "inlineStr":
+                        value = "".join(t.text or "" for t in cell.iterfind(is_t_path))
+                    else:
+                        raw = cell.findtext(v_tag)
+                        if raw is None:
+                            value = None
+                        elif cell_type == "s":
+                            value = shared[int(raw)]
+                        elif cell_type == "n":
+                            value = float(raw) if ("." in raw or "E" in raw or "e" in raw) else int(raw)
+                        elif cell_type == "b":
+                            value = raw == "1"
+                        else:  # "str" (formula text), "e" (#N/A...), "d" (ISO date)
+                            value = raw
+                    if col > len(values):
+                        values.extend([None] * (col - len(values)))
+                    values.append(value)
+                elem.clear()
+
+                while values and (values[-1] is None or values[-1] == ""):
+                    values.pop()
+                yield tuple(values)
+
+
+def read_xlsx_frame(file_path: str) -> pd.DataFrame:
+    """
+    Read the whole first sheet of an .xlsx balance through iter_xlsx_rows.
+
+    Rows go straight into an object DataFrame, with no per-cell conversion.
+    It has the same shape as pd.read_excel(header=None): trailing empty rows
+    are trimmed, blank rows in the middle are kept and short rows are padded.
+    The import itself streams the sheet instead (parse_xlsx_balance).
+    """
+    return pd.DataFrame(list(_without_trailing_blanks(iter_xlsx_rows(file_path))), dtype=object)
+
+
+def _without_trailing_blanks(rows: Iterator[tuple]) -> Iterator[tuple]:
+    """rows minus the empty rows at the end; empty rows between data rows are kept."""
+    blanks = 0
+    for row in rows:
+        if not row:
+            blanks += 1
+            continue
+        yield from itertools.repeat((), blanks)
+        blanks = 0
+        yield row
+
+
+def _chunk_frame(rows: list[tuple], columns: list[str]) -> pd.DataFrame:
+    """Object DataFrame of raw rows, cut or padded to the detected columns."""
+    frame = pd.DataFrame(rows, dtype=object)
+    width = len(columns)
+    frame = frame.iloc[:, :width] if frame.shape[1] > width else frame.reindex(columns=range(width))
+    frame.columns = columns
+    return frame
+
+
+def parse_xlsx_balance(file_path: str) -> tuple[pd.DataFrame, int, int, dict[str, str]]:
+    """
+    Streaming read → detect → parse of an .xlsx balance.
+
+    Rows come from iter_xlsx_rows and go to the column-mapping stage
+    XLSX_CHUNK_ROWS at a time. Header and columns are detected on the first
+    chunk, and each chunk is reduced to its typed code | label | debit |
+    credit lines before the next one is read. The sheet is never held as a
+    whole. Rows wider than the first chunk are cut to its width.
+    Returns (lines, skipped_rows, rows_read, col_map) like _read_and_parse.
+    """
+    rows = _without_trailing_blanks(iter_xlsx_rows(file_path))
+    head = list(itertools.islice(rows, XLSX_CHUNK_ROWS))
+    df, col_map = detect_columns(pd.DataFrame(head, dtype=object))
+    columns = list(df.columns)
+    del head
+
+    lines, skipped_rows = parse_balance_lines(df, col_map)
+    chunks, rows_read = [lines], len(df)
+    del df
+    while chunk := list(itertools.islice(rows, XLSX_CHUNK_ROWS)):
+        lines, skipped = parse_balance_lines(_chunk_frame(chunk, columns), col_map)
+        chunks.append(lines)
+        skipped_rows += skipped
+        rows_read += len(chunk)
+
+    non_empty = [lines for lines in chunks if not lines.empty]
+    if len(non_empty) > 1:
+        lines = pd.concat(non_empty, ignore_index=True)
+    else:
+        lines = non_empty[0] if non_empty else chunks[0]
+    return lines, skipped_rows, rows_read, col_map
+
+
+def read_balance_frame(file_path: str, filename: str) -> pd.DataFrame:
+    """
+    Read a raw balance file (Excel or CSV) into a DataFrame of raw cell values, no header.
+    Raises on unreadable files — callers turn that into a 400.
+    """
+    name = filename.lower()
+    if name.endswith(".csv"):
+        # Try semicolon first (French locale), then comma
+        try:
+            df_raw = pd.read_csv(file_path, sep=";", header=None, dtype=str)
+            if df_raw.shape[1] < 3:
+                df_raw = pd.read_csv(file_path, sep=",", header=None, dtype=str)
+        except Exception:
+            df_raw = pd.read_csv(file_path, header=None, dtype=str)
+        return df_raw
+    if name.endswith((".xlsx", ".xlsm")) and zipfile.is_zipfile(file_path):
+        return read_xlsx_frame(file_path)
+    # Legacy .xls and anything else pandas knows how to open
+    return pd.read_excel(file_path, header=None, dtype=str)
+
+
+def read_balance_head(file_path: str, filename: str, n_rows: int) -> pd.DataFrame:
+    """
+    First `n_rows` raw rows only, same layout as read_balance_frame.
+    Enough for header / column detection without reading the whole file.
+    """
+    name = filename.lower()
+    if name.endswith(".csv"):
+        try:
+            df_raw = pd.read_csv(file_path, sep=";", header=None, dtype=str, nrows=n_rows)
+            if df_raw.shape[1] < 3:
+                df_raw = pd.read_csv(file_path, sep=",", header=None, dtype=str, nrows=n_rows)
+        except Exception:
+            df_raw = pd.read_csv(file_path, header=None, dtype=str, nrows=n_rows)
+        return df_raw
+    if name.endswith((".xlsx", ".xlsm")) and zipfile.is_zipfile(file_path):
+        return pd.DataFrame(list(itertools.islice(iter_xlsx_rows(file_path), n_rows)), dtype=object)
+    return pd.read_excel(file_path, header=None, dtype=str, nrows=n_rows)
+
+
+def detect_columns(df_raw: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, str]]:
+    """
+    Locate the header row (first 5 rows scanned) and map the key columns.
+
+    Returns (df, col_map) where df holds the data rows only and col_map is
+    { "account" | "label" | "debit" | "credit" | "balance": column_name }.
+    Raises ValueError when no account column can be found.
+    """
+    header_row_idx = None
+    for i in range(min(5, len(df_raw))):
+        row_vals = {str(v).strip().lower() for v in df_raw.iloc[i].tolist()}
+        if row_vals & HEADER_KEYWORDS:
+            header_row_idx = i
+            break
+
+    if header_row_idx is not None:
+        df = df_raw.iloc[header_row_idx + 1:].reset_index(drop=True)
+        df.columns = [str(v).strip().lower() for v in df_raw.iloc[header_row_idx].tolist()]
+    else:
+        df = df_raw.copy()
+        # Generate positional column names
+        num_cols = df.shape[1]
+        col_names = [f"col_{i}" for i in range(num_cols)]
+        # ── Standard SYSCOHADA balance layouts ──
+        # 4-col : Compte | Libellé | Débit | Crédit
+        # 6-col : Compte | Libellé | Débit Mvt | Crédit Mvt | Solde D | Solde C
+        # 8-col : Compte | Libellé | Débit Mvt | Crédit Mvt | AN D | AN C | Solde D | Solde C
+        if num_cols >= 2:
+            col_names[0] = "compte"
+            col_names[1] = "libellé"
+        if num_cols == 4:
+            col_names[2] = "solde_debit"
+            col_names[3] = "solde_credit"
+        elif num_cols == 6:
+            col_names[2] = "mvt_debit"
+            col_names[3] = "mvt_credit"
+            col_names[4] = "solde_debit"
+            col_names[5] = "solde_credit"
+        elif num_cols >= 8:
+            # Use last two numeric columns as soldes
+            col_names[num_cols - 2] = "solde_debit"
+            col_names[num_cols - 1] = "solde_credit"
+        df.columns = col_names
+
+    df.columns = [str(c).strip().lower() for c in df.columns]
+
+    col_map: dict[str, str] = {}
+    for col in df.columns:
+        col_l = col.lower()
+        if not col_map.get("account") and any(k in col_l for k in ACCOUNT_KEYS):
+            col_map["account"] = col
+        if not col_map.get("label") and any(k in col_l for k in LABEL_KEYS):
+            col_map["label"] = col
+        if not col_map.get("debit") and any(k in col_l for k in DEBIT_KEYS):
+            col_map["debit"] = col
+        if not col_map.get("credit") and any(k in col_l for k in CREDIT_KEYS):
+            col_map["credit"] = col
+        if not col_map.get("balance") and any(k in col_l for k in BALANCE_KEYS):
+            col_map["balance"] = col
+
+    if "account" not in col_map:
+        raise ValueError(
+            "Impossible de trouver la colonne 'Compte' dans le fichier. "
+            "Vérifiez que votre fichier contient bien les colonnes : "
+            "Compte | Libellé | Débit | Crédit (ou Solde Débiteur | Solde Créditeur)."
+        )
+
+    return df, col_map
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    """First column carrying `name` (headers such as 'Débit' are often repeated)."""
+    return df.iloc[:, list(df.columns).index(name)]
+
+
+def _as_text(col: pd.Series) -> pd.Series:
+    """str(v) for every cell — empty cells read as "nan", like str(float("nan"))."""
+    return col.fillna("nan").astype(str)
+
+
+def _to_amounts(col: pd.Series) -> pd.Series:
+    """
+    Whole-column equivalent of float(str(v).replace(" ", "").replace(",", ".")).
+    Empty or non-numeric cells become 0.0.
+    """
+    cleaned = (
+        _as_text(col)
+        .str.replace(" ", "", regex=False)
+        .str.replace("\xa0", "", regex=False)
+        .str.replace(",", ".", regex=False)
+    )
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0.0).astype(float)
+
+
+def parse_balance_lines(df: pd.DataFrame, col_map: dict[str, str]) -> tuple[pd.DataFrame, int]:
+    """
+    Turn the data rows of a balance into normalized account lines.
+
+    Returns (lines, skipped_rows) where lines has the columns
+    code | label | debit | credit (amounts rounded to 2 decimals, labels
+    truncated to 120 chars), in file order.
+    Rows are skipped when the code is empty / a total, does not start with at
+    least two digits, or when both amounts are zero.
+    """
+    # Remove trailing decimals e.g. "411.0" → "411"
+    codes = (
+        _as_text(_column(df, col_map["account"]))
+        .str.strip()
+        .str.split(".", n=1)
+        .str[0]
+        .str.strip()
+    )
+    keep = ~codes.str.lower().isin(SKIP_CODES) & codes.str.match(r"^\d{2,}")
+
+    if "label" in col_map:
+        labels = _as_text(_column(df, col_map["label"])).str.strip()
+    else:
+        labels = pd.Series(DEFAULT_LABEL, index=df.index)
+    missing_label = (labels == "") | (labels.str.lower() == "nan")
+    labels = labels.where(~missing_label, "Compte " + codes)
+
+    if "debit" in col_map and "credit" in col_map:
+        debit = _to_amounts(_column(df, col_map["debit"]))
+        credit = _to_amounts(_column(df, col_map["credit"]))
+    elif "balance" in col_map:
+        bal = _to_amounts(_column(df, col_map["balance"]))
+        debit = bal.where(bal > 0, 0.0)
+        credit = (-bal).where(bal < 0, 0.0)
+    else:
+        return pd.DataFrame(columns=["code", "label", "debit", "credit"]), len(df)
+
+    keep &= ~((debit == 0.0) & (credit == 0.0))
+
+    lines = pd.DataFrame({
+        "code": codes[keep],
+        "label": labels[keep].str.slice(0, MAX_LABEL_LENGTH),
+        "debit": debit[keep].round(2),
+        "credit": credit[keep].round(2),
+    }).reset_index(drop=True)
+
+    return lines, len(df) - len(lines)
+
+
+def balance_totals(lines: pd.DataFrame) -> tuple[int, int]:
+    """Exact Σ Débit, Σ Crédit of parsed lines, in minor units."""
+    return int(to_minor_array(lines["debit"]).sum()), int(to_minor_array(lines["credit"]).sum())
+
+
+def suspense_line(gap: float) -> dict:
+    """4799 line that balances a Débit/Crédit gap: Debit > Credit → credit line, and vice versa."""
+    return {
+        "code": SUSPENSE_CODE,
+        "debit": abs(gap) if gap < 0 else 0.0,
+        "credit": gap if gap > 0 else 0.0,
+        "label": f"Équilibrage automatique — Écart {abs(gap):,.2f}",
+    }
+
+
+def gap_note(gap: float) -> str:
+    return (
+        f"⚠ La balance importée présentait un écart de {abs(gap):,.2f} FCFA "
+        f"({'Débit > Crédit' if gap > 0 else 'Crédit > Débit'}). "
+        f"Il a été passé automatiquement en compte d'attente {SUSPENSE_CODE}. "
+        "Vérifiez et corrigez si nécessaire avant de générer la liasse."
+    )
+
+
+def write_balance(
+    db: Session,
+    company_id: int,
+    document: models.Document,
+    lines: pd.DataFrame,
+    skipped_rows: int,
+    fiscal_year: int,
+    source_name: str,
+    on_progress: Optional[ProgressCallback] = None,
+    incremental: bool = False,
+) -> dict:
+    """
+    Persist a parsed balance as one BG-<fiscal_year> entry in the OD journal.
+
+    Everything — Document, OD journal, missing accounts (one INSERT ... RETURNING),
+    entry header and lines (one bulk statement, COPY on PostgreSQL) — is written
+    in a single transaction: either the whole ledger lands or nothing does.
+
+    With `incremental=True`, an existing BG-<fiscal_year> entry is updated in
+    place instead: only added, changed and removed lines are written (see
+    _apply_line_diff) and the entry is re-attached to the new document, the
+    previous one being kept for history. Without such an entry, it falls back
+    to a full import.
+    Raises ValueError when there is no valid line to import or when the fiscal
+    year is already locked (see period_lock).
+    """
+    if lines.empty:
+        raise ValueError(
+            f"Aucune ligne comptable valide trouvée ({skipped_rows} lignes ignorées). "
+            "Vérifiez le format du fichier et que les colonnes Compte / Débit / Crédit sont présentes."
+        )
+    period_lock.ensure_open(db, company_id, datetime(fiscal_year, 12, 31))
+
+    debit_minor, credit_minor = balance_totals(lines)
+    total_d, total_c = from_minor(debit_minor), from_minor(credit_minor)
+    gap = from_minor(debit_minor - credit_minor)
+    needs_suspense = debit_minor != credit_minor
+
+    if on_progress:
+        on_progress("writing")
+
+    try:
+        db.add(document)
+
+        # Journal OD propre à la société
+        od_journal = (
+            db.query(models.Journal)
+            .filter(models.Journal.company_id == company_id, models.Journal.code == "OD")
+            .first()
+        )
+        if not od_journal:
+            od_journal = models.Journal(code="OD", name="Opérations Diverses", company_id=company_id)
+            db.add(od_journal)
+        db.flush()
+
+        # Missing accounts — one per new code, named after its first line
+        account_ids = crud.get_account_ids_by_code(db, company_id)
+        new_accounts = lines[~lines["code"].isin(account_ids.keys())].drop_duplicates("code")
+        to_create = [
+            {"code": code, "name": label, "class_code": int(code[0])}
+            for code, label in zip(new_accounts["code"], new_accounts["label"])
+        ]
+        if needs_suspense and SUSPENSE_CODE not in account_ids and SUSPENSE_CODE not in set(new_accounts["code"]):
+            to_create.append({"code": SUSPENSE_CODE, "name": SUSPENSE_NAME, "class_code": 4})
+        account_ids.update(crud.bulk_create_accounts(db, to_create, company_id))
+        accounts_created = len(to_create)
+
+        entry = _find_balance_entry(db, od_journal.id, fiscal_year) if incremental else None
+        reimport = entry is not None
+        previous_document_id = entry.document_id if reimport else None
+        if not reimport:
+            entry = models.Entry(
+                date=datetime(fiscal_year, 12, 31),   # Close of fiscal year
+                reference=f"BG-{fiscal_year}",
+                label=f"Balance Générale {fiscal_year} — {source_name}",
+                journal_id=od_journal.id,
+                company_id=company_id,
+                document_id=document.id,
+                validated=False,
+            )
+            db.add(entry)
+            db.flush()
+        else:
+            if entry.validated:
+                raise ValueError(
+                    f"L'écriture BG-{fiscal_year} est validée et ne peut plus être modifiée. "
+                    "Réimport incrémental impossible."
+                )
+            entry.label = f"Balance Générale {fiscal_year} — {source_name}"
+            entry.document_id = document.id
+
+        rows = [
+            {"entry_id": entry.id, "company_id": company_id, "account_id": account_ids[code],
+             "debit": debit, "credit": credit, "label": label}
+            for code, label, debit, credit in lines.itertuples(index=False, name=None)
+        ]
+
+        # Équilibrage automatique via compte d'attente 4799
+        note = None
+        if needs_suspense:
+            adjustment = suspense_line(gap)
+            rows.append({
+                "entry_id": entry.id,
+                "company_id": company_id,
+                "account_id": account_ids[adjustment.pop("code")],
+                **adjustment,
+            })
+            note = gap_note(gap)
+
+        if reimport:
+            diff = _apply_line_diff(db, company_id, entry, rows)
+            rows_written = diff["lines_added"] + diff["lines_updated"] + diff["lines_removed"]
+        else:
+            crud.bulk_create_entry_lines(db, rows)
+            crud.record_account_balances(db, company_id, (
+                (row["account_id"], entry.date, row["debit"], row["credit"], 1) for row in rows
+            ))
+            diff = None
+            rows_written = len(rows)
+
+        # Cache fingerprint, in the transaction that writes the lines (see balance_cache.load_lines)
+        document.ledger_fingerprint = balance_cache.fingerprint(balance_cache.ledger_lines(lines))
+        if reimport and previous_document_id != document.id:
+            crud.clear_ledger_fingerprints(db, [previous_document_id])
+        db.commit()
+        if on_progress:
+            on_progress("writing", rows_written=rows_written)
+    except Exception:
+        db.rollback()
+        raise
+
+    balance_cache.store(document.content_hash, lines)
+
+    result = {
+        "status": "success",
+        "document_id": document.id,
+        "entries_count": len(rows),
+        "accounts_created": accounts_created,
+        "accounts_matched": len(rows) - accounts_created,
+        "skipped_rows": skipped_rows,
+        "fiscal_year": fiscal_year,
+        "total_debit": total_d,
+        "total_credit": total_c,
+        "gap": gap,
+        "gap_note": note,
+    }
+    if reimport:
+        result.update(diff, entry_id=entry.id, previous_document_id=previous_document_id)
+    return result
+
+
+def _find_balance_entry(db: Session, journal_id: int, fiscal_year: int) -> Optional[models.Entry]:
+    """Most recent BG-<fiscal_year> entry of the OD journal, if any."""
+    return (
+        db.query(models.Entry)
+        .filter(models.Entry.journal_id == journal_id, models.Entry.reference == f"BG-{fiscal_year}")
+        .order_by(models.Entry.id.desc())
+        .first()
+    )
+
+
+def _apply_line_diff(db: Session, company_id: int, entry: models.Entry, rows: list[dict]) -> dict:
+    """
+    Bring the lines of `entry` in line with `rows`, account by account.
+
+    For each account, existing lines and new rows are paired in order: identical
+    pairs are left alone, differing pairs become one UPDATE, surplus rows are
+    inserted and surplus lines deleted. A corrected balance therefore touches
+    only the accounts that actually changed — and only their account_balances rows.
+    """
+    existing: dict[int, list] = {}
+    for line in (
+        db.query(models.EntryLine.id, models.EntryLine.account_id, models.EntryLine.debit,
+                 models.EntryLine.credit, models.EntryLine.label)
+        .filter(models.EntryLine.entry_id == entry.id)
+        .order_by(models.EntryLine.id)
+    ):
+        existing.setdefault(line.account_id, []).append(line)
+
+    incoming: dict[int, list] = {}
+    for row in rows:
+        incoming.setdefault(row["account_id"], []).append(row)
+
+    to_insert, to_update, to_delete = [], [], []
+    balance_moves = []  # (account_id, entry_date, debit, credit, sign)
+    unchanged = 0
+    for account_id in existing.keys() | incoming.keys():
+        old_lines = existing.get(account_id, [])
+        new_rows = incoming.get(account_id, [])
+        for old, new in zip(old_lines, new_rows):
+            if (
+                to_minor(old.debit) == to_minor(new["debit"])
+                and to_minor(old.credit) == to_minor(new["credit"])
+                and old.label == new["label"]
+            ):
+                unchanged += 1
+            else:
+                to_update.append({"id": old.id, "debit": new["debit"], "credit": new["credit"], "label": new["label"]})
+                balance_moves.append((account_id, entry.date, old.debit, old.credit, -1))
+                balance_moves.append((account_id, entry.date, new["debit"], new["credit"], 1))
+        for new in new_rows[len(old_lines):]:
+            to_insert.append(new)
+            balance_moves.append((account_id, entry.date, new["debit"], new["credit"], 1))
+        for old in old_lines[len(new_rows):]:
+            to_delete.append(old.id)
+            balance_moves.append((account_id, entry.date, old.debit, old.credit, -1))
+
+    if to_update:
+        db.execute(update(models.EntryLine), to_update)
+    if to_delete:
+        db.execute(delete(models.EntryLine).where(models.EntryLine.id.in_(to_delete)))
+    crud.bulk_create_entry_lines(db, to_insert)
+    crud.record_account_balances(db, company_id, balance_moves)
+
+    return {
+        "lines_added": len(to_insert),
+        "lines_updated": len(to_update),
+        "lines_removed": len(to_delete),
+        "lines_unchanged": unchanged,
+    }
+
+
+def parse_balance_file(file_path: str, filename: str) -> tuple[pd.DataFrame, int, int]:
+    """
+    Read → detect → parse, without touching the database.
+    Returns (lines, skipped_rows, rows_read). Plain picklable values, so it can
+    run in a worker process (see services/batch_import).
+    Raises ValueError for unreadable files or a missing account column.
+    """
+    lines, skipped_rows, rows_read, _ = _read_and_parse(file_path, filename)
+    return lines, skipped_rows, rows_read
+
+
+def _read_and_parse(file_path: str, filename: str) -> tuple[pd.DataFrame, int, int, dict[str, str]]:
+    if filename.lower().endswith((".xlsx", ".xlsm")) and zipfile.is_zipfile(file_path):
+        try:
+            return parse_xlsx_balance(file_path)
+        except ValueError:
+            raise
+        except Exception as exc:
+            raise ValueError(f"Fichier illisible : {str(exc)}")
+
+    try:
+        df_raw = read_balance_frame(file_path, filename)
+    except Exception as exc:
+        raise ValueError(f"Fichier illisible : {str(exc)}")
+
+    df, col_map = detect_columns(df_raw)
+    lines, skipped_rows = parse_balance_lines(df, col_map)
+    return lines, skipped_rows, len(df), col_map
+
+
+# Rows read for the fail-fast check: header search window + a few data rows
+PREVIEW_HEAD_ROWS = 50
+
+
+def preview_balance_file(
+    db: Session,
+    company_id: int,
+    file_path: str,
+    filename: str,
+    sample_size: int = 20,
+) -> dict:
+    """
+    Dry run of import_balance_file: what would be imported, nothing is written.
+
+    The first PREVIEW_HEAD_ROWS rows are read and checked first (readable file,
+    account column found), so an unusable file is rejected without reading the
+    rest. The file is then parsed exactly as the import would parse it, for
+    the totals. The database is only read: existing accounts, and an existing
+    BG-<fiscal_year> entry for an incremental re-import.
+    Raises ValueError like import_balance_file.
+    """
+    fiscal_year = detect_fiscal_year(filename)
+
+    try:
+        df_head = read_balance_head(file_path, filename, PREVIEW_HEAD_ROWS)
+    except Exception as exc:
+        raise ValueError(f"Fichier illisible : {str(exc)}")
+    detect_columns(df_head)
+
+    lines, skipped_rows, rows_read, col_map = _read_and_parse(file_path, filename)
+    if lines.empty:
+        raise ValueError(
+            f"Aucune ligne comptable valide trouvée ({skipped_rows} lignes ignorées). "
+            "Vérifiez le format du fichier et que les colonnes Compte / Débit / Crédit sont présentes."
+        )
+
+    debit_minor, credit_minor = balance_totals(lines)
+    total_d, total_c = from_minor(debit_minor), from_minor(credit_minor)
+    gap = from_minor(debit_minor - credit_minor)
+    needs_suspense = debit_minor != credit_minor
+
+    existing_codes = crud.get_account_ids_by_code(db, company_id).keys()
+    codes = set(lines["code"])
+    new_codes = codes - existing_codes
+    if needs_suspense and SUSPENSE_CODE not in existing_codes:
+        new_codes.add(SUSPENSE_CODE)
+
+    existing_entry = (
+        db.query(models.Entry.id)
+        .join(models.Journal)
+        .filter(
+            models.Journal.company_id == company_id,
+            models.Journal.code == "OD",
+            models.Entry.reference == f"BG-{fiscal_year}",
+        )
+        .order_by(models.Entry.id.desc())
+        .first()
+    )
+
+    return {
+        "status": "preview",
+        "filename": filename,
+        "fiscal_year": fiscal_year,
+        "col_map": col_map,
+        "rows_read": rows_read,
+        "lines_count": len(lines),
+        "skipped_rows": skipped_rows,
+        "sample_lines": lines.head(sample_size).to_dict(orient="records"),
+        "total_debit": total_d,
+        "total_credit": total_c,
+        "gap": gap,
+        "suspense_adjustment": suspense_line(gap) if needs_suspense else None,
+        "gap_note": gap_note(gap) if needs_suspense else None,
+        "accounts_to_create": len(new_codes),
+        "accounts_matched": len(codes & existing_codes),
+        "existing_entry_id": existing_entry.id if existing_entry else None,
+    }
+
+
+def new_balance_document(
+    company_id: int, file_path: str, fiscal_year: int, content_hash: Optional[str] = None
+) -> models.Document:
+    """Document row (not yet added to the session) for an imported balance file."""
+    return models.Document(
+        name=f"Balance Générale {fiscal_year} — Import {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+        filename=os.path.basename(file_path),
+        file_path=file_path,
+        file_type="balance",
+        content_hash=content_hash,
+        company_id=company_id,
+    )
+
+
+def import_balance_file(
+    db: Session,
+    company_id: int,
+    file_path: str,
+    filename: str,
+    on_progress: Optional[ProgressCallback] = None,
+    content_hash: Optional[str] = None,
+    incremental: bool = False,
+) -> dict:
+    """
+    Full import of a balance already saved under uploads/: read → detect → parse → write.
+    `filename` is the user's original file name (format and fiscal year detection),
+    `content_hash` the SHA-256 computed while the upload was streamed to disk,
+    `incremental` re-imports over an existing BG-<fiscal_year> entry (see write_balance).
+    Raises ValueError for unusable files (unreadable, no account column, no valid line).
+    """
+    fiscal_year = detect_fiscal_year(filename)
+
+    if on_progress:
+        on_progress("parsing")
+    lines, skipped_rows, rows_read = parse_balance_file(file_path, filename)
+    if on_progress:
+        on_progress("parsing", rows_parsed=rows_read)
+
+    document = new_balance_document(company_id, file_path, fiscal_year, content_hash)
+    return write_balance(
+        db, company_id, document, lines, skipped_rows, fiscal_year, filename, on_progress, incremental
+    )
@@ -0,0 +1,74 @@
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.money import AccountTotals
+from app.services import balance_cache
+
+
+# ---------------------------------------------------------------------------
+# SOLDES PAR COMPTE — UN INSTANTANÉ PAR TRANSACTION
+#
+# Liasse (ExcelInjector), contrôles de cohérence, prérequis de la liasse et
+# audit IA lisent les mêmes totaux par compte : account_balances pour tout le
+# dossier, ou la balance d'un document (cache Parquet, sinon entry_lines).
+# Ils sont chargés une fois par (société, document) et par transaction de la
+# session, sous forme d'index trié (AccountTotals) partagé par tous les
+# appelants. L'instantané est oublié dès que la session écrit (flush) ou
+# termine sa transaction (commit, rollback).
+# ---------------------------------------------------------------------------
+
+SESSION_KEY = "balance_snapshots"
+
+
+class Snapshot(NamedTuple):
+    totals: AccountTotals
+    source: str  # "account_balances", "cache" ou "entry_lines"
+
+
+def _document_totals(db: Session, company_id: int, document_id: int) -> dict[str, tuple[float, float]]:
+    query = (
+        db.query(
+            models.Account.code,
+            func.coalesce(func.sum(models.EntryLine.debit), 0).label("debit"),
+            func.coalesce(func.sum(models.EntryLine.credit), 0).label("credit"),
+        )
+        .join(models.EntryLine, models.EntryLine.account_id == models.Account.id)
+        .join(models.Entry, models.Entry.id == models.EntryLine.entry_id)
+        .filter(models.EntryLine.company_id == company_id)
+        .filter(models.Entry.document_id == document_id)
+        .group_by(models.Account.code)
+    )
+    return {row.code: (float(row.debit), float(row.credit)) for row in query.all()}
+
+
+def load(db: Session, company_id: int, document_id: Optional[int] = None) -> Snapshot:
+    """
+    Per-account totals of the company (whole ledger), or of one imported
+    document, loaded once per transaction of `db`.
+    """
+    snapshots = db.info.setdefault(SESSION_KEY, {})
+    key = (company_id, document_id or None)
+    if key not in snapshots:
+        if not document_id:
+            totals, source = crud.get_account_totals(db, company_id), "account_balances"
+        else:
+            totals, source = balance_cache.account_totals(db, company_id, document_id), "cache"
+            if totals is None:
+                totals, source = _document_totals(db, company_id, document_id), "entry_lines"
+        snapshots[key] = Snapshot(AccountTotals.from_amounts(totals), source)
+    return snapshots[key]
+
+
+def account_totals(db: Session, company_id: int, document_id: Optional[int] = None) -> AccountTotals:
+    """Shared sorted index of the snapshot (see load)."""
+    return load(db, company_id, document_id).totals
+
+
+@event.listens_for(Session, "after_flush")
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget(session, *args):
+    session.info.pop(SESSION_KEY, None)
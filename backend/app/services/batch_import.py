@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import balance_import
+
+
+# ---------------------------------------------------------------------------
+# PORTFOLIO BATCH IMPORT
+#
+# Plusieurs balances, plusieurs sociétés, un seul appel.
+# Le parsing (CPU) tourne dans un pool de processus — le débit suit le nombre
+# de cœurs. Chaque fichier est écrit dès que son parsing est terminé, dans sa
+# propre transaction (balance_import.write_balance) : l'échec d'un dossier
+# n'annule pas les autres.
+# ---------------------------------------------------------------------------
+
+BATCH_IMPORT_WORKERS = int(os.getenv("BATCH_IMPORT_WORKERS", str(os.cpu_count() or 2)))
+
+
+def resolve_company_id(db: Session, company_ref: str) -> Optional[int]:
+    """Company from a NIF (tax_id) or a numeric id. NIF wins when both could match."""
+    ref = str(company_ref).strip()
+    company = db.query(models.Company.id).filter(models.Company.tax_id == ref).first()
+    if not company and ref.isdigit():
+        company = db.query(models.Company.id).filter(models.Company.id == int(ref)).first()
+    return company.id if company else None
+
+
+def _error_report(item: dict, message: str) -> dict:
+    return {
+        "file": item["filename"],
+        "company": item["company"],
+        "company_id": item.get("company_id"),
+        "status": "error",
+        "error": message,
+    }
+
+
+def run_batch(
+    db: Session, items: list[dict], max_workers: Optional[int] = None, incremental: bool = False
+) -> list[dict]:
+    """
+    Import many balance files.
+
+    `items`: [{ "filename", "file_path", "company", "company_id", "content_hash" }]
+    where `company` is the reference given by the user (NIF or id) and
+    `company_id` its resolved id (None if unknown). An item may carry an
+    "error" already (e.g. missing file) — it is reported as is.
+    Returns one report per item, in input order: the usual import result
+    ("status": "success", entries_count, gap_note, ...) or
+    { "status": "error", "error": ... }.
+    `incremental`: re-import over existing BG-<fiscal_year> entries (see write_balance).
+    """
+    reports: list[Optional[dict]] = [None] * len(items)
+
+    pending = []
+    for i, item in enumerate(items):
+        if item.get("error"):
+            reports[i] = _error_report(item, item["error"])
+        elif item.get("company_id") is None:
+            reports[i] = _error_report(item, f"Société introuvable : {item['company']}")
+        else:
+            pending.append(i)
+
+    if pending:
+        workers = max(1, min(max_workers or BATCH_IMPORT_WORKERS, len(pending)))
+        # spawn: the API process runs threads (import jobs), fork would be unsafe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {
+                pool.submit(balance_import.parse_balance_file, items[i]["file_path"], items[i]["filename"]): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                item = items[i]
+                try:
+                    lines, skipped_rows, _ = future.result()
+                    fiscal_year = balance_import.detect_fiscal_year(item["filename"])
+                    document = balance_import.new_balance_document(
+                        item["company_id"], item["file_path"], fiscal_year, item.get("content_hash")
+                    )
+                    result = balance_import.write_balance(
+                        db, item["company_id"], document, lines, skipped_rows, fiscal_year, item["filename"],
+                        incremental=incremental,
+                    )
+                    reports[i] = {"file": item["filename"], "company": item["company"], "company_id": item["company_id"], **result}
+                except ValueError as exc:
+                    reports[i] = _error_report(item, str(exc))
+                except Exception as exc:
+                    reports[i] = _error_report(item, f"Erreur d'import : {str(exc)}")
+
+    return reports
+
+
+def summarize(reports: list[dict]) -> dict:
+    """Batch response: counters + per-file reports."""
+    succeeded = sum(1 for r in reports if r["status"] == "success")
+    return {
+        "files": len(reports),
+        "succeeded": succeeded,
+        "failed": len(reports) - succeeded,
+        "reports": reports,
+    }
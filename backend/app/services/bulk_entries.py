@@ -0,0 +1,108 @@
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.money import from_minor, to_minor
+from app.services import period_lock
+
+
+# ---------------------------------------------------------------------------
+# BULK JOURNAL ENTRIES
+#
+# Intégrations banque / caisse : des milliers d'écritures par appel.
+# Tout est contrôlé en une passe (équilibre, journal, comptes, document) avec
+# trois requêtes de référence, puis les écritures valides sont insérées en
+# quelques requêtes multi-lignes, dans une seule transaction.
+# ---------------------------------------------------------------------------
+
+
+def validate_entries(db: Session, entries: list[schemas.EntryCreate]) -> list[str | None]:
+    """
+    One error message per entry (None when the entry can be written):
+    Débit = Crédit, at least two lines, known journal, accounts and document
+    belonging to the journal's company, entry not pointing at another company,
+    date after the company's locked periods.
+    """
+    journal_ids = {e.journal_id for e in entries}
+    account_ids = {line.account_id for e in entries for line in e.lines}
+    document_ids = {e.document_id for e in entries if e.document_id}
+
+    journal_company = dict(
+        db.query(models.Journal.id, models.Journal.company_id).filter(models.Journal.id.in_(journal_ids))
+    ) if journal_ids else {}
+    account_company = dict(
+        db.query(models.Account.id, models.Account.company_id).filter(models.Account.id.in_(account_ids))
+    ) if account_ids else {}
+    document_company = dict(
+        db.query(models.Document.id, models.Document.company_id).filter(models.Document.id.in_(document_ids))
+    ) if document_ids else {}
+    closings = {company_id: period_lock.locked_until(db, company_id) for company_id in set(journal_company.values())}
+
+    errors: list[str | None] = []
+    for entry in entries:
+        # Exact comparison in minor units, as POST /accounting/entries/
+        total_debit = sum(to_minor(line.debit) for line in entry.lines)
+        total_credit = sum(to_minor(line.credit) for line in entry.lines)
+        company_id = journal_company.get(entry.journal_id)
+
+        if len(entry.lines) < 2:
+            errors.append("Une écriture doit comporter au moins deux lignes.")
+        elif total_debit != total_credit:
+            errors.append(
+                f"Unbalanced Entry: Debit ({from_minor(total_debit)}) != Credit ({from_minor(total_credit)})"
+            )
+        elif company_id is None:
+            errors.append(f"Journal introuvable : {entry.journal_id}")
+        elif entry.company_id and entry.company_id != company_id:
+            errors.append(f"Le journal {entry.journal_id} n'appartient pas à la société {entry.company_id}.")
+        elif period_lock.is_locked(closings[company_id], entry.date):
+            errors.append(f"Période clôturée jusqu'au {closings[company_id].strftime('%d/%m/%Y')}.")
+        elif entry.document_id and document_company.get(entry.document_id) != company_id:
+            errors.append(f"Document introuvable pour cette société : {entry.document_id}")
+        else:
+            unknown = sorted({
+                line.account_id for line in entry.lines if account_company.get(line.account_id) != company_id
+            })
+            errors.append(
+                f"Compte(s) introuvable(s) pour cette société : {', '.join(map(str, unknown))}" if unknown else None
+            )
+    return errors
+
+
+def create_entries(db: Session, entries: list[schemas.EntryCreate], atomic: bool = False) -> dict:
+    """
+    Validate then insert a batch of entries in one transaction.
+
+    Invalid entries are reported and skipped; with `atomic=True` a single
+    invalid entry rejects the whole batch (nothing is written).
+    Returns { received, created, failed, results: [{ index, status, entry_id | error }] }.
+    """
+    errors = validate_entries(db, entries)
+    valid = [i for i, error in enumerate(errors) if error is None]
+
+    entry_ids: dict[int, int] = {}
+    if valid and not (atomic and len(valid) < len(entries)):
+        try:
+            ids = crud.bulk_create_entries(db, [entries[i] for i in valid])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        entry_ids = dict(zip(valid, ids))
+
+    results = []
+    for i, error in enumerate(errors):
+        if i in entry_ids:
+            results.append({"index": i, "status": "created", "entry_id": entry_ids[i]})
+        else:
+            results.append({
+                "index": i,
+                "status": "error",
+                "error": error or "Lot rejeté : au moins une écriture est invalide (mode atomique).",
+            })
+
+    return {
+        "received": len(entries),
+        "created": len(entry_ids),
+        "failed": len(entries) - len(entry_ids),
+        "results": results,
+    }
@@ -0,0 +1,228 @@
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import Float, Integer, and_, exists, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+# ---------------------------------------------------------------------------
+# RECHERCHE PLEIN TEXTE — LIBELLÉS ET RÉFÉRENCES
+#
+# « Le paiement BTCI de mars » : recherche par fragments dans Entry.label,
+# Entry.reference et EntryLine.label, servie par un index trigramme :
+#   - PostgreSQL : pg_trgm, index GIN sur (libellé ‖ référence) des écritures
+#     et sur le libellé des lignes ; ILIKE '%fragment%' par terme, classement
+#     par word_similarity ;
+#   - SQLite     : tables FTS5 (tokenizer trigram) tenues à jour par
+#     triggers ; une ligne n'est indexée que si son libellé diffère de celui
+#     de son écriture (cas général : il le recopie), y compris après un
+#     changement du libellé de l'écriture ; classement bm25.
+# Tous les termes doivent figurer dans l'en-tête d'une écriture (libellé,
+# référence) ou dans le libellé d'une même ligne. Les filtres (journal,
+# dates, montant) s'appliquent ensuite aux seules écritures trouvées.
+# ---------------------------------------------------------------------------
+
+MIN_TERM_LENGTH = 3  # Un trigramme
+MAX_RESULTS = 200
+
+LINE_OWN_LABEL = "new.label IS NOT NULL AND new.label IS NOT (SELECT label FROM entries WHERE id = new.entry_id)"
+SQLITE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+    "label, reference, content='entries', content_rowid='id', tokenize='trigram')",
+    # Lignes : seuls les libellés distincts de celui de l'écriture sont indexés
+    # (les autres sont déjà couverts par entries_fts) — table FTS5 autonome,
+    # supprimable par rowid même pour une ligne non indexée
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entry_lines_fts USING fts5(label, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS entries_fts_ai AFTER INSERT ON entries BEGIN "
+    "INSERT INTO entries_fts(rowid, label, reference) VALUES (new.id, new.label, new.reference); END",
+    "CREATE TRIGGER IF NOT EXISTS entries_fts_ad AFTER DELETE ON entries BEGIN "
+    "INSERT INTO entries_fts(entries_fts, rowid, label, reference) VALUES ('delete', old.id, old.label, old.reference); END",
+    "CREATE TRIGGER IF NOT EXISTS entries_fts_au AFTER UPDATE OF label, reference ON entries BEGIN "
+    "INSERT INTO entries_fts(entries_fts, rowid, label, reference) VALUES ('delete', old.id, old.label, old.reference); "
+    "INSERT INTO entries_fts(rowid, label, reference) VALUES (new.id, new.label, new.reference); END",
+    # Libellé d'écriture modifié : les lignes qui recopiaient l'ancien sont indexées,
+    # celles qui recopient le nouveau sortent de l'index (couvertes par entries_fts)
+    "CREATE TRIGGER IF NOT EXISTS entries_fts_lines_au AFTER UPDATE OF label ON entries "
+    "WHEN old.label IS NOT new.label BEGIN "
+    "DELETE FROM entry_lines_fts WHERE rowid IN "
+    "(SELECT id FROM entry_lines WHERE entry_id = new.id AND label = new.label); "
+    "INSERT INTO entry_lines_fts(rowid, label) SELECT id, label FROM entry_lines "
+    "WHERE entry_id = new.id AND label = old.label; END",
+    "CREATE TRIGGER IF NOT EXISTS entry_lines_fts_ai AFTER INSERT ON entry_lines "
+    f"WHEN {LINE_OWN_LABEL} BEGIN "
+    "INSERT INTO entry_lines_fts(rowid, label) VALUES (new.id, new.label); END",
+    "CREATE TRIGGER IF NOT EXISTS entry_lines_fts_ad AFTER DELETE ON entry_lines BEGIN "
+    "DELETE FROM entry_lines_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS entry_lines_fts_au AFTER UPDATE OF label ON entry_lines BEGIN "
+    "DELETE FROM entry_lines_fts WHERE rowid = old.id; "
+    f"INSERT INTO entry_lines_fts(rowid, label) SELECT new.id, new.label WHERE {LINE_OWN_LABEL}; END",
+]
+SQLITE_REBUILD = [
+    "INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')",
+    "DELETE FROM entry_lines_fts",
+    "INSERT INTO entry_lines_fts(rowid, label) SELECT l.id, l.label FROM entry_lines l "
+    "JOIN entries e ON e.id = l.entry_id WHERE l.label IS NOT NULL AND l.label IS NOT e.label",
+]
+
+ENTRY_TEXT_PG = "(coalesce(label, '') || ' ' || coalesce(reference, ''))"
+POSTGRES_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_entries_search_trgm ON entries USING gin ({ENTRY_TEXT_PG} gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_entry_lines_label_trgm ON entry_lines USING gin (label gin_trgm_ops)",
+]
+
+
+def ensure_search_index(engine, rebuild: bool = False) -> None:
+    """
+    Create the search index of the engine's dialect if missing (idempotent).
+    On SQLite, the FTS5 tables are filled from entries / entry_lines when
+    they are created, or on demand with `rebuild=True`.
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            for statement in POSTGRES_STATEMENTS:
+                conn.execute(text(statement))
+        elif conn.dialect.name == "sqlite":
+            created = not conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries_fts'")
+            ).first()
+            for statement in SQLITE_STATEMENTS:
+                conn.execute(text(statement))
+            if created or rebuild:
+                for statement in SQLITE_REBUILD:
+                    conn.execute(text(statement))
+
+
+def search_terms(q: str) -> list[str]:
+    """Lower-cased words of the query that an index lookup can serve (3 characters or more)."""
+    terms = [term for term in re.findall(r"\w+", q.lower()) if len(term) >= MIN_TERM_LENGTH]
+    if not terms:
+        raise ValueError(f"La recherche doit contenir au moins un terme de {MIN_TERM_LENGTH} caractères.")
+    return terms
+
+
+# Les deux branches ne gardent que les écritures / lignes de la société avant
+# regroupement et classement : les autres dossiers ne sont jamais classés.
+# CROSS JOIN : SQLite garde l'index FTS en boucle externe (sinon il parcourt
+# toutes les écritures de la société et évalue MATCH ligne à ligne).
+def _sqlite_hits(terms: list[str], company_id: int):
+    match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+    return text(
+        "SELECT e.id AS entry_id, -bm25(entries_fts) AS score FROM entries_fts "
+        "CROSS JOIN entries e ON e.id = entries_fts.rowid "
+        "WHERE entries_fts MATCH :match AND e.company_id = :company_id "
+        "UNION ALL "
+        "SELECT l.entry_id, -bm25(entry_lines_fts) FROM entry_lines_fts "
+        "CROSS JOIN entry_lines l ON l.id = entry_lines_fts.rowid "
+        "WHERE entry_lines_fts MATCH :match AND l.company_id = :company_id"
+    ).bindparams(match=match, company_id=company_id).columns(entry_id=Integer, score=Float)
+
+
+def _postgres_hits(terms: list[str], company_id: int):
+    patterns = {f"t{i}": "%" + term.replace("\\", "\\\\").replace("_", "\\_") + "%" for i, term in enumerate(terms)}
+    entry_match = " AND ".join(f"{ENTRY_TEXT_PG} ILIKE :{name}" for name in patterns)
+    line_match = " AND ".join(f"label ILIKE :{name}" for name in patterns)
+    return text(
+        f"SELECT id AS entry_id, word_similarity(:q, {ENTRY_TEXT_PG}) AS score FROM entries "
+        f"WHERE company_id = :company_id AND {entry_match} "
+        "UNION ALL "
+        f"SELECT entry_id, word_similarity(:q, label) FROM entry_lines "
+        f"WHERE company_id = :company_id AND {line_match}"
+    ).bindparams(q=" ".join(terms), company_id=company_id, **patterns).columns(entry_id=Integer, score=Float)
+
+
+def search_entries(
+    db: Session,
+    company_id: int,
+    q: str,
+    journal_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    amount_min: Optional[float] = None,
+    amount_max: Optional[float] = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Entries of the company matching every term of `q`, best match first.
+
+    `amount_min` / `amount_max` keep entries having at least one line whose
+    debit or credit lies in the range. Returns one dict per entry:
+      { entry_id, date, journal_id, journal_code, reference, label, total_debit, score }
+    Raises ValueError when no term is long enough or the database has no search index.
+    """
+    terms = search_terms(q)
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        hits = _sqlite_hits(terms, company_id).subquery("hits")
+    elif dialect == "postgresql":
+        hits = _postgres_hits(terms, company_id).subquery("hits")
+    else:
+        raise ValueError(f"Recherche plein texte non disponible pour la base {dialect}.")
+
+    ranked = (
+        select(hits.c.entry_id, func.max(hits.c.score).label("score"))
+        .group_by(hits.c.entry_id)
+        .subquery("ranked")
+    )
+    query = (
+        select(
+            models.Entry.id,
+            models.Entry.date,
+            models.Journal.id,
+            models.Journal.code,
+            models.Entry.reference,
+            models.Entry.label,
+            ranked.c.score,
+        )
+        .join(ranked, ranked.c.entry_id == models.Entry.id)
+        .join(models.Journal, models.Journal.id == models.Entry.journal_id)
+        .where(models.Entry.company_id == company_id)
+    )
+    if journal_id:
+        query = query.where(models.Entry.journal_id == journal_id)
+    if date_from:
+        query = query.where(models.Entry.date >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.where(models.Entry.date < datetime.combine(date_to + timedelta(days=1), time.min))
+    if amount_min is not None or amount_max is not None:
+        def in_range(column):
+            bounds = []
+            if amount_min is not None:
+                bounds.append(column >= amount_min)
+            if amount_max is not None:
+                bounds.append(column <= amount_max)
+            return and_(*bounds)
+
+        query = query.where(exists().where(
+            models.EntryLine.entry_id == models.Entry.id,
+            or_(in_range(models.EntryLine.debit), in_range(models.EntryLine.credit)),
+        ))
+
+    rows = db.execute(
+        query.order_by(ranked.c.score.desc(), models.Entry.date.desc(), models.Entry.id.desc())
+        .limit(min(limit, MAX_RESULTS))
+    ).all()
+
+    # Montant des seules écritures retournées : une requête sur leurs lignes
+    totals = dict(
+        db.query(models.EntryLine.entry_id, func.sum(models.EntryLine.debit))
+        .filter(models.EntryLine.entry_id.in_([row[0] for row in rows]))
+        .group_by(models.EntryLine.entry_id)
+    ) if rows else {}
+
+    return [
+        {
+            "entry_id": entry_id,
+            "date": day,
+            "journal_id": journal,
+            "journal_code": journal_code,
+            "reference": reference,
+            "label": label,
+            "total_debit": totals.get(entry_id) or 0.0,
+            "score": round(score, 4),
+        }
+        for entry_id, day, journal, journal_code, reference, label, score in rows
+    ]
@@ -0,0 +1,163 @@
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+
+from app import models
+from app.database import SessionLocal
+from app.services import balance_import
+
+
+# ---------------------------------------------------------------------------
+# BACKGROUND IMPORT JOBS
+#
+# La file d'attente est la table import_jobs elle-même : pas de broker externe,
+# fonctionne avec PostgreSQL comme avec SQLite. Chaque worker uvicorn possède
+# un petit pool de threads qui exécute les imports hors de la boucle asyncio.
+# Un job n'est exécuté qu'une fois : il est « réclamé » par un UPDATE
+# conditionnel (status queued → running) avant tout traitement. Tant qu'il
+# tourne, son thread rafraîchit heartbeat_at : un job « running » dont le
+# heartbeat est trop ancien appartient à un worker disparu.
+# ---------------------------------------------------------------------------
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+HEARTBEAT_SECONDS = int(os.getenv("IMPORT_HEARTBEAT_SECONDS", "30"))
+# A 'running' job without a heartbeat for this long belongs to a worker that died
+# (generous: on SQLite the heartbeat waits while the import holds the write lock)
+STALE_JOB_MINUTES = int(os.getenv("IMPORT_STALE_JOB_MINUTES", "10"))
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import-job")
+
+
+def _update_job(job_id: int, **values):
+    """Write job progress in its own short transaction, visible to status polls."""
+    db = SessionLocal()
+    try:
+        db.execute(update(models.ImportJob).where(models.ImportJob.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _finish_job(job_id: int, **values):
+    """Record the outcome of a job this worker still owns (status 'running')."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(models.ImportJob)
+            .where(models.ImportJob.id == job_id, models.ImportJob.status == "running")
+            .values(finished_at=datetime.utcnow(), **values)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _heartbeat(job_id: int, stop: threading.Event):
+    """Refresh heartbeat_at every HEARTBEAT_SECONDS until stop is set."""
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            _update_job(job_id, heartbeat_at=datetime.utcnow())
+        except Exception as exc:
+            # e.g. SQLite busy during the import transaction: the next beat retries
+            print(f"[import_jobs] WARN: heartbeat du job {job_id} : {exc}")
+
+
+def _claim_job(job_id: int) -> bool:
+    """queued → running, atomically. False if another worker already took it."""
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(models.ImportJob)
+            .where(models.ImportJob.id == job_id, models.ImportJob.status == "queued")
+            .values(status="running", started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        return claimed == 1
+    finally:
+        db.close()
+
+
+def run_import_job(job_id: int):
+    """Worker entry point: run one queued balance import and record its outcome."""
+    if not _claim_job(job_id):
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stop), name=f"import-job-{job_id}-heartbeat", daemon=True).start()
+    db = SessionLocal()
+    try:
+        job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+        company_id, file_path, filename, content_hash = job.company_id, job.file_path, job.filename, job.content_hash
+        incremental = bool(job.incremental)
+        db.rollback()  # don't hold a read transaction open during the import
+
+        def on_progress(phase: str, **counters):
+            _update_job(job_id, phase=phase, **counters)
+
+        result = balance_import.import_balance_file(
+            db, company_id, file_path, filename, on_progress, content_hash=content_hash, incremental=incremental
+        )
+        _finish_job(job_id, status="done", phase="done", result=result, document_id=result["document_id"])
+    except ValueError as exc:
+        _finish_job(job_id, status="failed", error=str(exc))
+    except Exception as exc:
+        traceback.print_exc()
+        _finish_job(job_id, status="failed", error=f"Erreur création d'écriture : {str(exc)}")
+    finally:
+        stop.set()
+        db.close()
+
+
+def enqueue_import(
+    db, company_id: int, file_path: str, filename: str, content_hash: str = None, incremental: bool = False
+) -> models.ImportJob:
+    """Record a queued job for an uploaded balance and hand it to the worker pool."""
+    job = models.ImportJob(
+        company_id=company_id,
+        file_path=file_path,
+        filename=filename,
+        content_hash=content_hash,
+        incremental=incremental,
+        status="queued",
+        phase="queued",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _executor.submit(run_import_job, job.id)
+    return job
+
+
+def resume_pending_jobs():
+    """
+    Startup hook: re-submit jobs still queued, and fail jobs left 'running' by a
+    worker that died — no heartbeat for STALE_JOB_MINUTES (its import transaction
+    was rolled back, nothing was written). Jobs of live sibling workers keep beating.
+    """
+    stale_before = datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(models.ImportJob)
+            .where(
+                models.ImportJob.status == "running",
+                # Jobs claimed before heartbeat_at existed: started_at
+                func.coalesce(models.ImportJob.heartbeat_at, models.ImportJob.started_at) < stale_before,
+            )
+            .values(
+                status="failed",
+                error="Import interrompu (redémarrage du serveur). Veuillez relancer l'import.",
+                finished_at=datetime.utcnow(),
+            )
+        )
+        db.commit()
+        queued = [job_id for (job_id,) in db.query(models.ImportJob.id).filter(models.ImportJob.status == "queued")]
+    finally:
+        db.close()
+
+    for job_id in queued:
+        _executor.submit(run_import_job, job_id)
@@ -1,10 +1,16 @@
-import openpyxl
+from openpyxl.cell.cell import MergedCell
 from openpyxl.utils import column_index_from_string, get_column_letter
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app import models
+from app.money import AccountTotals
+from app.services import balance_snapshot, mapping_rules, template_cache, xlsx_patch
 import os
 
+# "openpyxl" : classeur chargé puis réécrit en entier ; "xml" : cellules écrites
+# directement dans le XML des feuilles (services/xlsx_patch), repli sur openpyxl
+# pour les modèles qu'il ne sait pas modifier
+INJECTION_ENGINES = ("openpyxl", "xml")
+INJECTION_ENGINE = os.getenv("INJECTION_ENGINE", "openpyxl")
+
 
 class ExcelInjector:
     """
@@ -16,16 +22,20 @@ class ExcelInjector:
         "-70*"          → negate result (revenues are credit-heavy → flip positive)
         "ABS(280*)"     → absolute value (amortissements are credit → force positive)
         "601*, -603*"   → sum multiple patterns (achats + variation de stocks)
+    Rules are compiled once (services/mapping_rules): an invalid cell address
+    or rule fails the whole generation before the template is opened.
     """
 
     def __init__(self, db: Session, company_id: int, document_id: int = None):
         self.db = db
         self.company_id = company_id
         self.document_id = document_id
-        # { account_code: (debit_total, credit_total) }
-        self.raw: dict[str, tuple[float, float]] = {}
+        # Per-account totals as int64 minor units, sorted by code — all rule sums are exact
+        self.totals = AccountTotals([], [], [])
         # { account_code: net_balance (debit - credit) }
         self.balances: dict[str, float] = {}
+        # Merged cells of the loaded workbook by sheet title: (row, col) → master (see _merged_masters)
+        self._merged: dict[str, dict[tuple[int, int], tuple[int, int]]] = {}
         self._log: list[str] = []
 
     # ------------------------------------------------------------------
@@ -34,38 +44,18 @@ class ExcelInjector:
 
     def _fetch_balances(self):
         """
-        Computes per-account totals from EntryLine table.
-        Filters by company_id, optionally by document_id.
-        Populates self.balances { code: debit - credit }.
+        Loads the per-account totals of the company: account_balances for the
+        whole ledger, or for one document_id — the parsed balance cache
+        (services/balance_cache) when valid, else EntryLine. The index is the
+        one shared by the other readers of the same snapshot (services/balance_snapshot).
+        Populates self.totals (int64 minor units) and self.balances { code: debit - credit }.
         """
-        query = (
-            self.db.query(
-                models.Account.code,
-                func.coalesce(func.sum(models.EntryLine.debit), 0).label("debit"),
-                func.coalesce(func.sum(models.EntryLine.credit), 0).label("credit"),
-            )
-            .join(models.EntryLine, models.EntryLine.account_id == models.Account.id)
-            .join(models.Entry, models.Entry.id == models.EntryLine.entry_id)
-            .join(models.Journal, models.Journal.id == models.Entry.journal_id)
-            .filter(models.Account.company_id == self.company_id)
-            .filter(models.Journal.company_id == self.company_id)
-        )
-
-        if self.document_id:
-            query = query.filter(models.Entry.document_id == self.document_id)
-
-        query = query.group_by(models.Account.code)
-
-        self.raw = {}
-        self.balances = {}
-        for row in query.all():
-            d = float(row.debit)
-            c = float(row.credit)
-            self.raw[row.code] = (d, c)
-            self.balances[row.code] = d - c
+        snapshot = balance_snapshot.load(self.db, self.company_id, self.document_id)
+        self.totals = snapshot.totals
+        self.balances = self.totals.as_amounts()
 
         self._log.append(
-            f"_fetch_balances: {len(self.balances)} accounts loaded "
+            f"_fetch_balances: {len(self.balances)} accounts loaded from {snapshot.source} "
             f"(document_id={self.document_id})"
         )
 
@@ -75,7 +65,7 @@ class ExcelInjector:
 
     def _get_value_for_mapping(self, rule: str) -> float:
         """
-        Parse a mapping rule string and compute the value.
+        Compute the value of one mapping rule.
 
         Examples:
             "241*"         → Σ net balance for all 241xx accounts
@@ -83,36 +73,7 @@ class ExcelInjector:
             "ABS(284*)"    → absolute value (amortissements stored as negative net)
             "601*, -603*"  → multi-pattern: achats + variation stocks
         """
-        rule = rule.strip()
-
-        # Handle ABS() wrapper
-        is_abs = False
-        if rule.upper().startswith("ABS(") and rule.endswith(")"):
-            is_abs = True
-            rule = rule[4:-1]
-
-        total = 0.0
-        patterns = [p.strip() for p in rule.split(",") if p.strip()]
-
-        for pattern in patterns:
-            multiplier = 1.0
-            if pattern.startswith("-"):
-                multiplier = -1.0
-                pattern = pattern[1:].strip()
-
-            component = 0.0
-            if pattern.endswith("*"):
-                prefix = pattern[:-1]
-                for code, bal in self.balances.items():
-                    if code.startswith(prefix):
-                        component += bal
-            else:
-                component = self.balances.get(pattern, 0.0)
-
-            total += component * multiplier
-
-        result = abs(total) if is_abs else total
-        return round(result, 2)
+        return mapping_rules.evaluate_rule(mapping_rules.compile_rule(rule), self.totals)
 
     # ------------------------------------------------------------------
     # 3. CELL WRITING (merged-cell safe, formula-safe)
@@ -129,6 +90,16 @@ class ExcelInjector:
                 row_digits += ch
         return int(row_digits), column_index_from_string(col_letters)
 
+    def _merged_masters(self, ws) -> dict[tuple[int, int], tuple[int, int]]:
+        """
+        { (row, col): (master_row, master_col) } of the merged cells of ws —
+        from the template cache, or built on first use for this worksheet.
+        """
+        masters = self._merged.get(ws.title)
+        if masters is None:
+            masters = self._merged[ws.title] = template_cache.merged_index(ws)
+        return masters
+
     def _write_cell(self, ws, cell_addr: str, value: float):
         """
         Write value to cell_addr in worksheet ws.
@@ -136,20 +107,22 @@ class ExcelInjector:
         Always replaces any existing formula (= string) with the numeric value.
         """
         target_row, target_col = self._parse_cell_addr(cell_addr)
+        cell = ws.cell(row=target_row, column=target_col)
 
-        # Check if this cell is inside a merged range
-        for merged_range in ws.merged_cells.ranges:
-            if (merged_range.min_row <= target_row <= merged_range.max_row and
-                    merged_range.min_col <= target_col <= merged_range.max_col):
+        # Covered cell of a merged range (openpyxl MergedCell): its master in one lookup.
+        # A master or a plain cell is written in place.
+        if isinstance(cell, MergedCell):
+            position = self._merged_masters(ws).get((target_row, target_col))
+            if position is not None:
                 # Write to the top-left master cell of the merged range
-                master = ws.cell(row=merged_range.min_row, column=merged_range.min_col)
+                master_row, master_col = position
+                master = ws.cell(row=master_row, column=master_col)
                 master.value = value
                 self._log.append(f"  MERGED → {ws.title}!{cell_addr} → master "
-                                  f"({get_column_letter(merged_range.min_col)}{merged_range.min_row}) = {value}")
+                                  f"({get_column_letter(master_col)}{master_row}) = {value}")
                 return
 
         # Normal (non-merged) cell
-        cell = ws.cell(row=target_row, column=target_col)
         old_val = cell.value
         cell.value = value
         self._log.append(
@@ -166,11 +139,20 @@ class ExcelInjector:
         template_path: str,
         output_path: str,
         mapping_config: dict,
+        engine: str = None,
     ) -> str:
         """
         Copy the template, inject computed values, save to output_path.
+        engine: "openpyxl" or "xml" (default: INJECTION_ENGINE).
         Returns output_path.
         """
+        engine = engine or INJECTION_ENGINE
+        if engine not in INJECTION_ENGINES:
+            raise ValueError(f"Moteur d'injection inconnu : {engine} (attendu : {', '.join(INJECTION_ENGINES)})")
+
+        # Syntax errors are reported for every cell at once, before any data is read
+        compiled = mapping_rules.compile_mapping(mapping_config)
+
         self._fetch_balances()
 
         if not self.balances:
@@ -179,36 +161,68 @@ class ExcelInjector:
                 "Veuillez d'abord importer une balance générale."
             )
 
-        # Load template — keep_vba=False, read_only=False, data_only=False
-        # (do NOT use data_only=True — we want to replace formulas with values)
-        wb = openpyxl.load_workbook(template_path, keep_vba=False)
+        values = compiled.evaluate(self.totals)
+
+        if engine == "xml":
+            try:
+                return self._inject_xml(template_path, output_path, compiled, values)
+            except xlsx_patch.UnsupportedTemplate as exc:
+                msg = f"[ExcelInjector] XML engine not applicable ({exc}) — falling back to openpyxl"
+                self._log.append(msg)
+                print(msg)
+        return self._inject_openpyxl(template_path, output_path, compiled, values)
+
+    def _inject_openpyxl(self, template_path: str, output_path: str, compiled, values: dict) -> str:
+        # Private copy of the parsed template (services/template_cache) — keep_vba=False,
+        # read_only=False, data_only=False (do NOT use data_only=True — we want to replace formulas with values)
+        wb, merged = template_cache.checkout(template_path)
+        self._merged = dict(merged)
 
         injected = 0
         skipped_sheet = []
-        skipped_zero = []
 
-        for cell_ref, rule in mapping_config.items():
-            if "!" in cell_ref:
-                sheet_name, cell_addr = cell_ref.split("!", 1)
-            else:
-                sheet_name = wb.active.title
-                cell_addr = cell_ref
+        for cell in compiled.cells:
+            sheet_name = cell.sheet if cell.sheet is not None else wb.active.title
 
             if sheet_name not in wb.sheetnames:
-                skipped_sheet.append(cell_ref)
+                skipped_sheet.append(cell.ref)
                 continue
 
             ws = wb[sheet_name]
+            value = values[cell.ref]
             try:
-                value = self._get_value_for_mapping(rule)
                 # Write ALL values including 0 (so template zeros aren't kept as formulas)
-                self._write_cell(ws, cell_addr, value)
+                self._write_cell(ws, cell.address, value)
                 if value != 0:
                     injected += 1
             except Exception as exc:
-                self._log.append(f"  ERROR  → {cell_ref} ({rule}): {exc}")
-                print(f"[ExcelInjector] WARN: {cell_ref} ({rule}) → {exc}")
+                self._log.append(f"  ERROR  → {cell.ref} ({cell.rule.source}): {exc}")
+                print(f"[ExcelInjector] WARN: {cell.ref} ({cell.rule.source}) → {exc}")
+
+        self._summary(output_path, injected, skipped_sheet)
+        wb.save(output_path)
+        return output_path
+
+    def _inject_xml(self, template_path: str, output_path: str, compiled, values: dict) -> str:
+        # Only the <c> elements of the mapped cells are rewritten; every other part is copied as is
+        result = xlsx_patch.patch_workbook(template_path, output_path, compiled, values)
+
+        for cell in result.cells:
+            if cell.master:
+                self._log.append(f"  MERGED → {cell.sheet}!{cell.address} → master ({cell.master}) = {cell.value}")
+            else:
+                self._log.append(
+                    f"  WRITE  → {cell.sheet}!{cell.address} = {cell.value}"
+                    + (f"  [replaced formula: {cell.formula[:30]}]" if cell.formula else "")
+                )
+        self._log.append(
+            f"  XML    → {result.replaced_formulas} formulas replaced, {result.copied_parts} parts copied unchanged"
+        )
+
+        self._summary(output_path, sum(1 for cell in result.cells if cell.value != 0), result.skipped_sheet)
+        return output_path
 
+    def _summary(self, output_path: str, injected: int, skipped_sheet: list[str]):
         if skipped_sheet:
             msg = f"[ExcelInjector] Sheets absent du template: {set(skipped_sheet)}"
             self._log.append(msg)
@@ -216,10 +230,6 @@ class ExcelInjector:
 
         print(f"[ExcelInjector] {injected} non-zero values injected into '{output_path}'")
         print(f"[ExcelInjector] {len(skipped_sheet)} cells skipped (sheet not found)")
-        print(f"[ExcelInjector] {len(skipped_zero)} cells skipped (zero value)")
-
-        wb.save(output_path)
-        return output_path
 
     @property
     def log(self) -> list[str]:
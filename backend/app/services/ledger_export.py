@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+
+from app import models
+from app.database import SessionLocal
+
+
+# ---------------------------------------------------------------------------
+# GRAND LIVRE — EXPORT EN FLUX
+#
+# Une seule requête : le solde progressif par compte est calculé par la base
+# (SUM(...) OVER (PARTITION BY compte ORDER BY date, écriture, ligne)), les
+# lignes sont lues par lots via un curseur serveur (stream_results) et
+# sérialisées au fil de l'eau. La mémoire reste constante quel que soit le
+# volume et les premiers octets partent dès le premier lot.
+# ---------------------------------------------------------------------------
+
+EXPORT_BATCH_SIZE = 2000
+
+LEDGER_COLUMNS = [
+    "date", "account_code", "account_name", "journal_code", "reference",
+    "entry_label", "line_label", "debit", "credit", "running_balance",
+]
+
+
+def ledger_query(
+    company_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    account_prefix: Optional[str] = None,
+):
+    """
+    Grand-livre lines of a company, per account then chronologically.
+
+    The running balance (Σ débit − crédit) is computed over every line up to
+    `date_to`, then lines before `date_from` are filtered out: the first line
+    of the period already carries the opening balance of its account.
+    """
+    debit = func.coalesce(models.EntryLine.debit, 0)
+    credit = func.coalesce(models.EntryLine.credit, 0)
+
+    inner = (
+        select(
+            models.Entry.date.label("date"),
+            models.Account.code.label("account_code"),
+            models.Account.name.label("account_name"),
+            models.Journal.code.label("journal_code"),
+            models.Entry.reference.label("reference"),
+            models.Entry.label.label("entry_label"),
+            models.EntryLine.label.label("line_label"),
+            debit.label("debit"),
+            credit.label("credit"),
+            func.sum(debit - credit).over(
+                partition_by=models.EntryLine.account_id,
+                order_by=(models.Entry.date, models.Entry.id, models.EntryLine.id),
+                rows=(None, 0),
+            ).label("running_balance"),
+            models.Entry.id.label("entry_id"),
+            models.EntryLine.id.label("line_id"),
+        )
+        .join(models.Entry, models.Entry.id == models.EntryLine.entry_id)
+        .join(models.Journal, models.Journal.id == models.Entry.journal_id)
+        .join(models.Account, models.Account.id == models.EntryLine.account_id)
+        .where(models.EntryLine.company_id == company_id)
+    )
+    if date_to:
+        inner = inner.where(models.Entry.date < datetime.combine(date_to + timedelta(days=1), time.min))
+    if account_prefix:
+        inner = inner.where(models.Account.code.startswith(account_prefix))
+    inner = inner.subquery()
+
+    query = select(*(inner.c[name] for name in LEDGER_COLUMNS))
+    if date_from:
+        query = query.where(inner.c.date >= datetime.combine(date_from, time.min))
+    return query.order_by(inner.c.account_code, inner.c.date, inner.c.entry_id, inner.c.line_id)
+
+
+def _iter_batches(query) -> Iterator[list]:
+    """Rows in batches, through a server-side cursor, with a session of its own."""
+    db = SessionLocal()
+    try:
+        result = db.connection().execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(query)
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def _row_values(row) -> list:
+    # Positional unpacking: named access on Row objects dominates the export time
+    day, code, name, journal_code, reference, entry_label, line_label, debit, credit, running = row
+    return [
+        day.date().isoformat() if day else "",
+        code,
+        name,
+        journal_code,
+        reference,
+        entry_label,
+        line_label,
+        debit,  # exact: Money columns and sums come back as 2-decimal amounts
+        credit,
+        running,
+    ]
+
+
+def stream_csv(query) -> Iterator[str]:
+    """CSV (;-separated, UTF-8 BOM for Excel), one chunk per batch of rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    writer.writerow(LEDGER_COLUMNS)
+    yield "\ufeff" + buf.getvalue()
+    for batch in _iter_batches(query):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(_row_values(row) for row in batch)
+        yield buf.getvalue()
+
+
+def stream_ndjson(query) -> Iterator[str]:
+    """One JSON object per line, one chunk per batch of rows."""
+    for batch in _iter_batches(query):
+        yield "".join(
+            json.dumps(dict(zip(LEDGER_COLUMNS, _row_values(row))), ensure_ascii=False) + "\n"
+            for row in batch
+        )
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Optional
+
+from app.money import AccountTotals, from_minor
+
+
+# ---------------------------------------------------------------------------
+# RÈGLES DE MAPPAGE COMPILÉES (LIASSE / MODÈLES EXCEL)
+#
+# Une règle de mappage ("601*, -603*", "ABS(281*)", "-13*", "4711") est
+# analysée une seule fois en une liste de termes (code, préfixe ?, signe),
+# avec la grammaire tolérante de l'ancien évaluateur ("*" seul : tous les
+# comptes ; un motif sans compte correspondant vaut 0), pour que les mappages
+# déjà enregistrés restent valides. Adresses de cellule invalides et règles
+# non textuelles sont signalées à la compilation, cellule par cellule, au lieu
+# d'être avalées pendant l'injection. Un mappage complet est compilé puis mis
+# en cache par empreinte SHA-256 de son contenu.
+# L'évaluation lit les soldes dans l'index trié des codes de comptes
+# (AccountTotals) : chaque préfixe distinct du mappage est résolu par deux
+# recherches dichotomiques, tous préfixes confondus en un appel.
+# ---------------------------------------------------------------------------
+
+MAPPING_CACHE_SIZE = 32
+
+CELL_ADDRESS = re.compile(r"^[A-Za-z]{1,3}[1-9][0-9]*$")
+
+
+class RuleSyntaxError(ValueError):
+    """One or more invalid mapping rules; `errors` lists one message per offending cell."""
+
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        super().__init__("Règles de mappage invalides : " + " ; ".join(errors))
+
+
+class Term(NamedTuple):
+    code: str
+    prefix: bool  # "70*" : tous les comptes commençant par 70 ; "701" : ce compte seul
+    sign: int
+
+
+class Rule(NamedTuple):
+    source: str
+    terms: tuple[Term, ...]
+    absolute: bool
+
+
+class MappedCell(NamedTuple):
+    ref: str  # "BILAN ACTIF!E13" tel qu'écrit dans le mappage
+    sheet: Optional[str]  # None : feuille active du modèle
+    address: str
+    rule: Rule
+
+
+@lru_cache(maxsize=4096)
+def compile_rule(source: str) -> Rule:
+    """
+    Parse one mapping rule with the grammar of the original evaluator:
+    ABS(...) wrapper, comma-separated [-]pattern, a trailing * for a prefix
+    ("*" alone: every account). Any other text is an exact code, and an
+    empty rule has no terms (value 0) — stored mappings keep their values.
+    """
+    body = source.strip()
+    absolute = body.upper().startswith("ABS(") and body.endswith(")")
+    if absolute:
+        body = body[4:-1]
+
+    terms = []
+    for pattern in (p.strip() for p in body.split(",")):
+        if not pattern:
+            continue
+        sign = 1
+        if pattern.startswith("-"):
+            sign, pattern = -1, pattern[1:].strip()
+        if pattern.endswith("*"):
+            terms.append(Term(pattern[:-1], True, sign))
+        else:
+            terms.append(Term(pattern, False, sign))
+    return Rule(source, tuple(terms), absolute)
+
+
+def _lookup(totals: AccountTotals, prefixes: list[str], codes: list[str]) -> dict[tuple[str, bool], int]:
+    """{ (code, is_prefix): Σ net } for the given prefixes and exact codes."""
+    sums = {(code, True): int(v) for code, v in zip(prefixes, totals.sum_prefixes(prefixes))}
+    sums.update({(code, False): int(v) for code, v in zip(codes, totals.net_of_codes(codes))})
+    return sums
+
+
+def _value(rule: Rule, sums: dict[tuple[str, bool], int]) -> float:
+    total = sum(term.sign * sums[term.code, term.prefix] for term in rule.terms)
+    return from_minor(abs(total) if rule.absolute else total)
+
+
+def evaluate_rule(rule: Rule, totals: AccountTotals) -> float:
+    """Value of one compiled rule against the account totals (decimal amount)."""
+    sums = _lookup(
+        totals,
+        [term.code for term in rule.terms if term.prefix],
+        [term.code for term in rule.terms if not term.prefix],
+    )
+    return _value(rule, sums)
+
+
+class CompiledMapping:
+    """
+    A whole mapping config, validated: its cells in mapping order and the
+    distinct prefixes / exact codes its rules read.
+    """
+
+    def __init__(self, cells: list[MappedCell]):
+        self.cells = cells
+        terms = {term for cell in cells for term in cell.rule.terms}
+        self.prefixes = sorted({term.code for term in terms if term.prefix})
+        self.codes = sorted({term.code for term in terms if not term.prefix})
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def evaluate(self, totals: AccountTotals) -> dict[str, float]:
+        """{ cell_ref: value } for every cell, all lookups batched in two searches."""
+        sums = _lookup(totals, self.prefixes, self.codes)
+        return {cell.ref: _value(cell.rule, sums) for cell in self.cells}
+
+
+_compiled: "OrderedDict[str, CompiledMapping]" = OrderedDict()
+_lock = threading.Lock()  # requests compile mappings from FastAPI's threadpool
+
+
+def _mapping_key(mapping: Mapping[str, str]) -> str:
+    """SHA-256 of the mapping content, in mapping order (the order cells are written in)."""
+    payload = json.dumps(list(mapping.items()), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def compile_mapping(mapping: Mapping[str, str]) -> CompiledMapping:
+    """
+    Compile { "Feuille!Cellule": règle } once per distinct content (LRU of
+    MAPPING_CACHE_SIZE mappings). Raises RuleSyntaxError listing every
+    invalid cell reference or rule.
+    """
+    key = _mapping_key(mapping)
+    with _lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    cells, errors = [], []
+    for ref, source in mapping.items():
+        sheet, address = ref.split("!", 1) if "!" in ref else (None, ref)
+        address = address.strip().replace("$", "")
+        if not CELL_ADDRESS.match(address):
+            errors.append(f"{ref} : adresse de cellule invalide")
+            continue
+        if not isinstance(source, str):
+            errors.append(f"{ref} : règle non textuelle ({source!r})")
+            continue
+        try:
+            cells.append(MappedCell(ref, sheet, address.upper(), compile_rule(source)))
+        except RuleSyntaxError as exc:
+            errors.extend(f"{ref} : {message}" for message in exc.errors)
+    if errors:
+        raise RuleSyntaxError(errors)
+
+    compiled = CompiledMapping(cells)
+    with _lock:
+        _compiled[key] = compiled
+        _compiled.move_to_end(key)
+        if len(_compiled) > MAPPING_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
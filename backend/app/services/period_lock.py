@@ -0,0 +1,218 @@
+import hashlib
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import BigInteger, func, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+# ---------------------------------------------------------------------------
+# CLÔTURE DE PÉRIODE — CHAÎNAGE SHA-256 (LOI ANTI-FRAUDE)
+#
+# Verrouiller une période valide en une seule requête UPDATE toutes les
+# écritures de la société jusqu'à la date de clôture, puis les relit dans
+# l'ordre (date, id) par lots via un curseur serveur. Chaque écriture est
+# hachée avec ses lignes à la suite de la précédente :
+#     h(n) = SHA-256(h(n-1) ‖ en-tête ‖ lignes)
+# La tête de chaîne est conservée dans period_locks ; chaque clôture repart
+# de la tête de la précédente. La vérification recalcule la chaîne période
+# par période, avec la même lecture par lots : la mémoire reste constante
+# quel que soit le volume.
+# ---------------------------------------------------------------------------
+
+GENESIS_HASH = "0" * 64
+CHAIN_BATCH_SIZE = 5000
+
+FIELD_SEP, RECORD_SEP = "\x1f", "\x1e"
+
+
+def locked_until(db: Session, company_id: int) -> Optional[datetime]:
+    """Closing date of the company's last locked period (None if nothing is locked)."""
+    return db.query(func.max(models.PeriodLock.closing_date)).filter(
+        models.PeriodLock.company_id == company_id
+    ).scalar()
+
+
+def is_locked(closing: Optional[datetime], entry_date: Optional[datetime]) -> bool:
+    return closing is not None and entry_date is not None and entry_date.date() <= closing.date()
+
+
+def ensure_open(db: Session, company_id: int, entry_date: Optional[datetime]) -> None:
+    """Raises ValueError when `entry_date` falls in a locked period of the company."""
+    closing = locked_until(db, company_id)
+    if is_locked(closing, entry_date):
+        raise ValueError(
+            f"Période clôturée jusqu'au {closing.strftime('%d/%m/%Y')} : "
+            f"aucune écriture ne peut être passée au {entry_date.strftime('%d/%m/%Y')}."
+        )
+
+
+def _period_filter(company_id: int, start: Optional[datetime], end: datetime) -> list:
+    """Entries of the company dated in [start, end)."""
+    conditions = [models.Entry.company_id == company_id, models.Entry.date < end]
+    if start is not None:
+        conditions.append(models.Entry.date >= start)
+    return conditions
+
+
+def _chain_rows(company_id: int, start: Optional[datetime], end: datetime):
+    """Locked entries of the period with their lines, in chain order (date, entry, line)."""
+    return (
+        select(
+            models.Entry.id,
+            models.Entry.date,
+            models.Journal.code,
+            models.Entry.reference,
+            models.Entry.label,
+            models.EntryLine.id,
+            models.Account.code,
+            # Montants bruts en unités mineures : le hachage ne dépend d'aucun arrondi
+            type_coerce(models.EntryLine.debit, BigInteger),
+            type_coerce(models.EntryLine.credit, BigInteger),
+            models.EntryLine.label,
+        )
+        .select_from(models.Entry)
+        .join(models.Journal, models.Journal.id == models.Entry.journal_id)
+        .outerjoin(models.EntryLine, models.EntryLine.entry_id == models.Entry.id)
+        .outerjoin(models.Account, models.Account.id == models.EntryLine.account_id)
+        .where(*_period_filter(company_id, start, end), models.Entry.validated.is_(True))
+        .order_by(models.Entry.date, models.Entry.id, models.EntryLine.id)
+    )
+
+
+def _iter_batches(db: Session, query) -> Iterator[list]:
+    result = db.connection().execution_options(stream_results=True, yield_per=CHAIN_BATCH_SIZE).execute(query)
+    yield from result.partitions()
+
+
+def chain_hash(db: Session, company_id: int, start: Optional[datetime], end: datetime, previous_hash: str):
+    """
+    (chain head, entries, lines) of the locked entries dated in [start, end),
+    chained after `previous_hash`. Rows are streamed in batches.
+    """
+    digest = bytes.fromhex(previous_hash)
+    hasher, current_id = None, None
+    entries = lines = 0
+    for batch in _iter_batches(db, _chain_rows(company_id, start, end)):
+        for entry_id, day, journal_code, reference, label, line_id, account_code, debit, credit, line_label in batch:
+            if entry_id != current_id:
+                if hasher is not None:
+                    digest = hasher.digest()
+                hasher = hashlib.sha256(digest)
+                hasher.update(
+                    f"{entry_id}{FIELD_SEP}{day.isoformat() if day else ''}{FIELD_SEP}{journal_code or ''}"
+                    f"{FIELD_SEP}{reference or ''}{FIELD_SEP}{label or ''}{RECORD_SEP}".encode()
+                )
+                current_id = entry_id
+                entries += 1
+            if line_id is not None:
+                hasher.update(
+                    f"{line_id}{FIELD_SEP}{account_code or ''}{FIELD_SEP}{debit or 0}{FIELD_SEP}{credit or 0}"
+                    f"{FIELD_SEP}{line_label or ''}{RECORD_SEP}".encode()
+                )
+                lines += 1
+    if hasher is not None:
+        digest = hasher.digest()
+    return digest.hex(), entries, lines
+
+
+def _bounds(previous: Optional[models.PeriodLock], closing: datetime) -> tuple[Optional[datetime], datetime]:
+    start = previous.closing_date + timedelta(days=1) if previous else None
+    return start, closing + timedelta(days=1)
+
+
+def lock_period(db: Session, company_id: int, closing_date: date) -> models.PeriodLock:
+    """
+    Validate every entry of the company dated up to `closing_date` (included)
+    and append them to the company's hash chain, in one transaction.
+    Raises ValueError for an unknown company or a date already locked.
+    """
+    # Verrou sur la société (PostgreSQL) : deux clôtures simultanées ne peuvent pas partir de la même tête
+    company = db.query(models.Company).filter(models.Company.id == company_id).with_for_update().first()
+    if not company:
+        raise ValueError("Société introuvable")
+
+    previous = (
+        db.query(models.PeriodLock)
+        .filter(models.PeriodLock.company_id == company_id)
+        .order_by(models.PeriodLock.closing_date.desc())
+        .first()
+    )
+    closing = datetime.combine(closing_date, time.min)
+    if previous and closing <= previous.closing_date:
+        raise ValueError(f"Période déjà clôturée jusqu'au {previous.closing_date.strftime('%d/%m/%Y')}.")
+
+    start, end = _bounds(previous, closing)
+    previous_hash = previous.chain_hash if previous else GENESIS_HASH
+    try:
+        db.execute(
+            update(models.Entry)
+            .where(*_period_filter(company_id, start, end))
+            .values(validated=True)
+            .execution_options(synchronize_session=False)
+        )
+        head, entries, lines = chain_hash(db, company_id, start, end, previous_hash)
+        lock = models.PeriodLock(
+            company_id=company_id,
+            closing_date=closing,
+            previous_hash=previous_hash,
+            chain_hash=head,
+            entries_count=entries,
+            lines_count=lines,
+        )
+        db.add(lock)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(lock)
+    return lock
+
+
+def verify_chain(db: Session, company_id: int, lock_id: Optional[int] = None) -> dict:
+    """
+    Recompute the hash chain, one pass per locked period (or only `lock_id`),
+    and compare it with the stored heads. A period is valid when its
+    recomputed head and counts match, it starts from the previous period's
+    head and none of its entries has lost the validated flag.
+    Returns { company_id, valid, periods: [...] }.
+    """
+    locks = (
+        db.query(models.PeriodLock)
+        .filter(models.PeriodLock.company_id == company_id)
+        .order_by(models.PeriodLock.closing_date)
+        .all()
+    )
+    if lock_id is not None and lock_id not in {lock.id for lock in locks}:
+        raise ValueError("Clôture introuvable pour cette société")
+
+    periods = []
+    previous = None
+    for lock in locks:
+        if lock_id is None or lock.id == lock_id:
+            start, end = _bounds(previous, lock.closing_date)
+            head, entries, lines = chain_hash(db, company_id, start, end, lock.previous_hash)
+            unlocked = db.query(func.count(models.Entry.id)).filter(
+                *_period_filter(company_id, start, end), models.Entry.validated.isnot(True)
+            ).scalar()
+            linked = lock.previous_hash == (previous.chain_hash if previous else GENESIS_HASH)
+            periods.append({
+                "lock_id": lock.id,
+                "period_start": start,
+                "closing_date": lock.closing_date,
+                "entries_count": entries,
+                "lines_count": lines,
+                "chain_hash": lock.chain_hash,
+                "recomputed_hash": head,
+                "linked": linked,
+                "unlocked_entries": unlocked,
+                "valid": (
+                    linked and not unlocked and head == lock.chain_hash
+                    and entries == lock.entries_count and lines == lock.lines_count
+                ),
+            })
+        previous = lock
+
+    return {"company_id": company_id, "valid": all(p["valid"] for p in periods), "periods": periods}
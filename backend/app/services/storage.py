@@ -0,0 +1,66 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from datetime import datetime
+
+from fastapi import UploadFile
+
+BASE_UPLOAD_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "uploads"
+)
+
+# 1 MiB per read: memory per upload stays bounded whatever the file size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def company_upload_path(company_id: int, filename: str) -> tuple[str, str]:
+    """
+    (safe_filename, file_path) under uploads/<company_id>/, prefixed with a
+    timestamp and a random tag: two uploads of the same name in the same
+    second never share a path.
+    """
+    company_dir = os.path.join(BASE_UPLOAD_DIR, str(company_id))
+    os.makedirs(company_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{filename.replace(' ', '_')}"
+    return safe_filename, os.path.join(company_dir, safe_filename)
+
+
+async def save_upload(file: UploadFile, file_path: str) -> str:
+    """
+    Stream an upload to disk chunk by chunk, hashing it on the way.
+    Returns the SHA-256 hex digest of the content.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "wb") as buf:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            sha256.update(chunk)
+            buf.write(chunk)
+    return sha256.hexdigest()
+
+
+def store_local_file(company_id: int, src_path: str) -> tuple[str, str]:
+    """
+    Copy a file from the local disk into uploads/<company_id>/ (CLI imports),
+    chunk by chunk with its SHA-256. Returns (file_path, content_hash).
+    """
+    _, file_path = company_upload_path(company_id, os.path.basename(src_path))
+    sha256 = hashlib.sha256()
+    with open(src_path, "rb") as src, open(file_path, "wb") as buf:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            sha256.update(chunk)
+            buf.write(chunk)
+    return file_path, sha256.hexdigest()
+
+
+async def save_temporary_upload(file: UploadFile) -> str:
+    """
+    Stream an upload to a temporary file outside uploads/ (previews, nothing is kept).
+    The extension is preserved for format detection; the caller removes the file.
+    """
+    fd, file_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1])
+    os.close(fd)
+    await save_upload(file, file_path)
+    return file_path
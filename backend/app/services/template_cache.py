@@ -0,0 +1,111 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import openpyxl
+
+
+# ---------------------------------------------------------------------------
+# CACHE DES MODÈLES EXCEL PRÉ-ANALYSÉS
+#
+# openpyxl.load_workbook sur la liasse OTR complète prend plusieurs secondes
+# à chaque génération. Chaque modèle (chemin) n'est analysé qu'une fois : le
+# classeur est conservé sérialisé (pickle) avec l'index de ses cellules
+# fusionnées, et chaque requête reçoit sa propre copie désérialisée —
+# indépendante, plusieurs fois plus rapide à obtenir qu'une nouvelle analyse.
+# Invalidation : (mtime, taille) du fichier ; s'ils changent, l'empreinte
+# SHA-256 du contenu décide (un fichier recopié à l'identique reste en cache).
+# Au plus TEMPLATE_CACHE_SIZE modèles résidents (LRU).
+# ---------------------------------------------------------------------------
+
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "4"))
+
+
+class CachedTemplate(NamedTuple):
+    signature: tuple[int, int]  # (st_mtime_ns, st_size)
+    content_hash: str
+    snapshot: bytes  # classeur openpyxl sérialisé
+    merged: dict  # { titre de feuille: { (ligne, colonne): (ligne maître, colonne maître) } }
+
+
+_entries: "OrderedDict[str, CachedTemplate]" = OrderedDict()
+_lock = threading.Lock()
+_path_locks: dict[str, threading.Lock] = {}
+
+
+def _signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _content_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def merged_index(ws) -> dict[tuple[int, int], tuple[int, int]]:
+    """
+    { (row, col): (master_row, master_col) } for every cell of the merged
+    ranges of ws, with a single pass over the ranges: one dict lookup per write.
+    """
+    masters = {}
+    for merged_range in ws.merged_cells.ranges:
+        master = (merged_range.min_row, merged_range.min_col)
+        for row in range(merged_range.min_row, merged_range.max_row + 1):
+            for col in range(merged_range.min_col, merged_range.max_col + 1):
+                masters[row, col] = master
+    return masters
+
+
+def _parse(path: str, signature: tuple[int, int], content_hash: str) -> CachedTemplate:
+    wb = openpyxl.load_workbook(path, keep_vba=False)
+    merged = {ws.title: merged_index(ws) for ws in wb.worksheets}
+    return CachedTemplate(signature, content_hash, pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL), merged)
+
+
+def _entry(path: str) -> CachedTemplate:
+    with _lock:
+        path_lock = _path_locks.setdefault(path, threading.Lock())
+    # Un seul chargement à la fois par modèle ; les autres modèles restent servis
+    with path_lock:
+        signature = _signature(path)
+        with _lock:
+            cached = _entries.get(path)
+        if cached is not None and cached.signature != signature:
+            content_hash = _content_hash(path)
+            cached = cached._replace(signature=signature) if content_hash == cached.content_hash else None
+        if cached is None:
+            cached = _parse(path, signature, _content_hash(path))
+            print(f"[template_cache] Parsed '{path}' ({len(cached.snapshot) / 1e6:.1f} MB snapshot)")
+        with _lock:
+            _entries[path] = cached
+            _entries.move_to_end(path)
+            while len(_entries) > TEMPLATE_CACHE_SIZE:
+                _entries.popitem(last=False)
+        return cached
+
+
+def checkout(path: str):
+    """
+    (workbook, merged index) for the template at `path`: a private copy of
+    the cached parse that the caller may modify and save. The merged index
+    is shared — read it, do not modify it.
+    """
+    path = os.path.abspath(path)
+    cached = _entry(path)
+    return pickle.loads(cached.snapshot), cached.merged
+
+
+def invalidate(path: str = None):
+    """Drop one template (or all of them) from the cache."""
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            _entries.pop(os.path.abspath(path), None)
@@ -0,0 +1,445 @@
+import bisect
+import math
+import posixpath
+import re
+import shutil
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import NamedTuple, Optional
+from xml.sax.saxutils import unescape
+
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from app.services.mapping_rules import CompiledMapping
+
+
+# ---------------------------------------------------------------------------
+# INJECTION DIRECTE DANS LE XML DU CLASSEUR (MOTEUR « xml »)
+#
+# Une liasse n'écrit qu'une centaine de valeurs numériques ; openpyxl, lui,
+# analyse puis resérialise tout le classeur (styles, mises en forme
+# conditionnelles, validations…) et perd au passage ce qu'il ne gère pas.
+# Ce moteur traite le .xlsx comme l'archive ZIP qu'il est :
+#   - les parties non concernées sont recopiées en flux, sans être
+#     analysées (contenu identique au modèle) ;
+#   - dans chaque sheetN.xml ciblé, seuls les éléments <c> des cellules du
+#     mappage sont réécrits (cellule maîtresse si la cellule est fusionnée),
+#     en conservant leur style ; formule et valeur en cache sont supprimées ;
+#   - si une formule a été remplacée, calcChain.xml est retiré (Excel le
+#     reconstruit), et le classeur est marqué pour un recalcul complet à
+#     l'ouverture (fullCalcOnLoad), les formules dépendantes ayant des
+#     valeurs en cache périmées.
+# Les modèles que ce moteur ne sait pas modifier sans risque (formule
+# partagée ou matricielle sur une cellule cible, lignes ou cellules sans
+# référence…) lèvent UnsupportedTemplate : l'appelant repasse par openpyxl.
+# ---------------------------------------------------------------------------
+
+ATTR = re.compile(r"""([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+CELL_REF = re.compile(r"^\$?([A-Z]{1,3})\$?(\d+)$")
+SHEET_DATA = re.compile(r"<(\w+:)?sheetData\b([^>]*?)(/?)>")
+ROW_TAG = re.compile(r"<(?:\w+:)?row\b([^>]*?)(/?)>")
+CELL = re.compile(r"<(?:\w+:)?c\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)", re.S)
+FORMULA = re.compile(r"<(?:\w+:)?f\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?f>)", re.S)
+ARRAY_FORMULA = re.compile(r"""<(?:\w+:)?f\b([^>]*\bt\s*=\s*["'](?:array|dataTable)["'][^>]*)>""")
+MERGE_REF = re.compile(r"""<(?:\w+:)?mergeCell\b[^>]*?\bref\s*=\s*["']\$?([A-Z]{1,3})\$?(\d+):\$?([A-Z]{1,3})\$?(\d+)["']""")
+DIMENSION = re.compile(r"<(?:\w+:)?dimension\b([^>]*?)/?>")
+EXT_LST = re.compile(r"<(?:\w+:)?extLst\b")
+SPANS = re.compile(r"""\s+spans\s*=\s*(?:"[^"]*"|'[^']*')""")
+CALC_PR = re.compile(r"<(\w+:)?calcPr\b([^>]*?)(/?)>")
+FULL_CALC = re.compile(r"""\bfullCalcOnLoad\s*=\s*(?:"[^"]*"|'[^']*')""")
+WORKBOOK_TAG = re.compile(r"<(\w+:)?workbook\b")
+RELATIONSHIP = re.compile(r"<(?:\w+:)?Relationship\b([^>]*)>")
+OVERRIDE = re.compile(r"<(?:\w+:)?Override\b([^>]*)>")
+# Éléments de CT_Workbook qui suivent calcPr (insertion d'un calcPr absent)
+AFTER_CALC_PR = re.compile(
+    r"<(?:\w+:)?(?:oleSize|customWorkbookViews|pivotCaches|smartTagPr|smartTagTypes|webPublishing"
+    r"|fileRecoveryPr|webPublishObjects|extLst)\b|</(?:\w+:)?workbook>"
+)
+
+CONTENT_TYPES = "[Content_Types].xml"
+COPY_CHUNK = 1 << 20
+
+
+class UnsupportedTemplate(ValueError):
+    """The template cannot be patched in place; generate it with openpyxl instead."""
+
+
+class PatchedCell(NamedTuple):
+    ref: str  # référence du mappage
+    sheet: str
+    address: str  # cellule demandée
+    master: Optional[str]  # cellule maîtresse écrite, si `address` est couverte par une fusion
+    value: float
+    formula: Optional[str]  # formule remplacée ("=SUM(…)"), sinon None
+
+
+class PatchResult(NamedTuple):
+    cells: list[PatchedCell]
+    skipped_sheet: list[str]  # références dont la feuille n'existe pas dans le modèle
+    replaced_formulas: int
+    copied_parts: int  # parties recopiées sans modification
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _attrs(text: str) -> dict[str, str]:
+    return {m.group(1): m.group(2) if m.group(2) is not None else m.group(3) for m in ATTR.finditer(text)}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _cell_ref(ref: str) -> tuple[int, int]:
+    """'E13' → (13, 5)."""
+    match = CELL_REF.match(ref.upper())
+    if not match:
+        raise UnsupportedTemplate(f"référence de cellule illisible « {ref} »")
+    return int(match.group(2)), column_index_from_string(match.group(1))
+
+
+def _range_ref(ref: str) -> tuple[int, int, int, int]:
+    """'B2:D5' (or 'B2') → (min_row, min_col, max_row, max_col)."""
+    first, _, last = ref.partition(":")
+    (r1, c1), (r2, c2) = _cell_ref(first), _cell_ref(last or first)
+    return min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2)
+
+
+def _address(row: int, col: int) -> str:
+    return f"{get_column_letter(col)}{row}"
+
+
+def _number(value: float) -> str:
+    """xsd:double text of value, integers without a trailing '.0'."""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"valeur non numérique : {value}")
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _read_xml(zf: zipfile.ZipFile, part: str) -> str:
+    try:
+        return zf.read(part).decode("utf-8")
+    except KeyError:
+        raise UnsupportedTemplate(f"partie absente de l'archive : {part}")
+
+
+def _rels_part(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _relationships(zf: zipfile.ZipFile, part: str) -> list[dict]:
+    """Relationships of `part` ('' for the package) with their targets resolved to part names."""
+    rels_part = _rels_part(part) if part else "_rels/.rels"
+    root = ET.fromstring(_read_xml(zf, rels_part))
+    rels = []
+    for rel in root:
+        if _local(rel.tag) != "Relationship" or rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        target = target[1:] if target.startswith("/") else posixpath.normpath(
+            posixpath.join(posixpath.dirname(part), target)
+        )
+        rels.append({"id": rel.get("Id"), "type": rel.get("Type", ""), "target": target})
+    return rels
+
+
+# ---------------------------------------------------------------------------
+# Sheet XML
+# ---------------------------------------------------------------------------
+
+def _cell_xml(p: str, ref: str, style: Optional[str], value: str) -> str:
+    style_attr = f' s="{style}"' if style is not None else ""
+    return f'<{p}c r="{ref}"{style_attr}><{p}v>{value}</{p}v></{p}c>'
+
+
+def _row_xml(p: str, row: int, cells: list[tuple[int, str]]) -> str:
+    body = "".join(_cell_xml(p, _address(row, col), None, value) for col, value in cells)
+    return f'<{p}row r="{row}">{body}</{p}row>'
+
+
+def _merged_masters(xml: str, targets: list[tuple[int, int]]) -> dict[tuple[int, int], tuple[int, int]]:
+    """{ (row, col): (master_row, master_col) } for the targets covered by a merged range (not masters)."""
+    first = xml.find("mergeCell")
+    if first < 0:
+        return {}
+    cols_by_row: dict[int, set[int]] = {}
+    for row, col in targets:
+        cols_by_row.setdefault(row, set()).add(col)
+    rows = sorted(cols_by_row)
+    masters = {}
+    # Lignes comparées d'abord : les colonnes ne sont converties que pour les plages qui croisent une cible
+    for col1, row1, col2, row2 in MERGE_REF.findall(xml, xml.rfind("<", 0, first)):
+        min_row, max_row = sorted((int(row1), int(row2)))
+        lo = bisect.bisect_left(rows, min_row)
+        if lo == len(rows) or rows[lo] > max_row:
+            continue
+        min_col, max_col = sorted((column_index_from_string(col1), column_index_from_string(col2)))
+        for row in rows[lo:bisect.bisect_right(rows, max_row)]:
+            for col in cols_by_row[row]:
+                if min_col <= col <= max_col and (row, col) != (min_row, min_col):
+                    masters[row, col] = (min_row, min_col)
+    return masters
+
+
+def _check_formula(ref: str, body: Optional[str], array_ranges: list) -> Optional[str]:
+    """Replaced formula as '=…' (None if the cell has none); raises on a formula other cells depend on."""
+    row, col = _cell_ref(ref)
+    for min_row, min_col, max_row, max_col in array_ranges:
+        if (min_row <= row <= max_row and min_col <= col <= max_col
+                and (min_row, min_col, max_row, max_col) != (row, col, row, col)):
+            raise UnsupportedTemplate(f"{ref} appartient à une formule matricielle")
+    match = FORMULA.search(body or "")
+    if not match:
+        return None
+    attrs = _attrs(match.group(1))
+    if attrs.get("t") == "shared" and "ref" in attrs:
+        raise UnsupportedTemplate(f"{ref} porte une formule partagée par d'autres cellules")
+    return "=" + unescape(match.group(2) or "")
+
+
+def _patch_row(xml: str, row_match, p: str, cells: list[tuple[int, str]], array_ranges: list,
+               replaced: dict) -> list[tuple[int, int, str]]:
+    """Edits (start, end, text) writing `cells` [(col, value)] into an existing <row>."""
+    if row_match.group(2):  # <row …/> : aucune cellule
+        tag = SPANS.sub("", row_match.group(1))
+        body = "".join(_cell_xml(p, _address(int(_attrs(tag)["r"]), col), None, value) for col, value in cells)
+        return [(row_match.start(), row_match.end(), f"<{p}row{tag}>{body}</{p}row>")]
+
+    start = row_match.end()
+    end = xml.find(f"</{p}row>", start)
+    if end < 0:
+        raise UnsupportedTemplate("ligne non fermée")
+    row = int(_attrs(row_match.group(1))["r"])
+    out, pos, k, inserted = [], start, 0, False
+    for cell in CELL.finditer(xml, start, end):
+        if k == len(cells):
+            break
+        attrs = _attrs(cell.group(1))
+        if "r" not in attrs:
+            raise UnsupportedTemplate(f"cellule sans référence à la ligne {row}")
+        _, col = _cell_ref(attrs["r"])
+        while k < len(cells) and cells[k][0] < col:
+            out += [xml[pos:cell.start()], _cell_xml(p, _address(row, cells[k][0]), None, cells[k][1])]
+            pos, k, inserted = cell.start(), k + 1, True
+        if k < len(cells) and cells[k][0] == col:
+            replaced[row, col] = _check_formula(attrs["r"], cell.group(2), array_ranges)
+            out += [xml[pos:cell.start()], _cell_xml(p, attrs["r"], attrs.get("s"), cells[k][1])]
+            pos, k = cell.end(), k + 1
+    if k < len(cells):
+        # Après la dernière cellule, avant un éventuel <extLst> de la ligne
+        ext = EXT_LST.search(xml, pos, end)
+        at = ext.start() if ext else end
+        out.append(xml[pos:at])
+        out += [_cell_xml(p, _address(row, col), None, value) for col, value in cells[k:]]
+        pos, inserted = at, True
+    out.append(xml[pos:end])
+
+    edits = [(start, end, "".join(out))]
+    if inserted and SPANS.search(row_match.group(1)):
+        # spans est une indication facultative : la retirer plutôt que la recalculer
+        edits.append((row_match.start(), row_match.end(), f"<{p}row{SPANS.sub('', row_match.group(1))}>"))
+    return edits
+
+
+def patch_sheet(xml: str, writes: dict[tuple[int, int], str]) -> tuple[str, dict[tuple[int, int], Optional[str]]]:
+    """
+    Write { (row, col): xsd:double text } into one worksheet part (targets
+    already resolved to merged masters). Returns the new XML and
+    { (row, col): replaced formula or None } for the cells that existed.
+    """
+    sheet_data = SHEET_DATA.search(xml)
+    if not sheet_data:
+        raise UnsupportedTemplate("feuille sans <sheetData>")
+    p = sheet_data.group(1) or ""
+    by_row: dict[int, list[tuple[int, str]]] = {}
+    for (row, col), value in sorted(writes.items()):
+        by_row.setdefault(row, []).append((col, value))
+    pending = sorted(by_row)
+    array_ranges = [
+        _range_ref(_attrs(m.group(1))["ref"]) for m in ARRAY_FORMULA.finditer(xml) if "ref" in _attrs(m.group(1))
+    ] if "array" in xml or "dataTable" in xml else []
+
+    edits, replaced = [], {}
+    if sheet_data.group(3):  # <sheetData/>
+        body = "".join(_row_xml(p, row, by_row[row]) for row in pending)
+        edits.append((sheet_data.start(), sheet_data.end(), f"<{p}sheetData{sheet_data.group(2)}>{body}</{p}sheetData>"))
+    else:
+        data_end = xml.find(f"</{p}sheetData>", sheet_data.end())
+        if data_end < 0:
+            raise UnsupportedTemplate("<sheetData> non fermé")
+        i = 0
+        for row_match in ROW_TAG.finditer(xml, sheet_data.end(), data_end):
+            if i == len(pending):
+                break
+            r = _attrs(row_match.group(1)).get("r")
+            if r is None:
+                raise UnsupportedTemplate("ligne sans numéro (attribut r)")
+            row = int(r)
+            while i < len(pending) and pending[i] < row:
+                edits.append((row_match.start(), row_match.start(), _row_xml(p, pending[i], by_row[pending[i]])))
+                i += 1
+            if i < len(pending) and pending[i] == row:
+                edits += _patch_row(xml, row_match, p, by_row[row], array_ranges, replaced)
+                i += 1
+        edits += [(data_end, data_end, _row_xml(p, row, by_row[row])) for row in pending[i:]]
+
+    # La dimension déclarée doit couvrir les cellules ajoutées
+    dimension = DIMENSION.search(xml, 0, sheet_data.start())
+    if dimension and "ref" in _attrs(dimension.group(1)):
+        min_row, min_col, max_row, max_col = _range_ref(_attrs(dimension.group(1))["ref"])
+        rows, cols = [row for row, _ in writes], [col for _, col in writes]
+        bounds = (min(min_row, *rows), min(min_col, *cols), max(max_row, *rows), max(max_col, *cols))
+        if bounds != (min_row, min_col, max_row, max_col):
+            new_ref = f"{_address(bounds[0], bounds[1])}:{_address(bounds[2], bounds[3])}"
+            tag = re.sub(r"""\bref\s*=\s*(?:"[^"]*"|'[^']*')""", f'ref="{new_ref}"', dimension.group(0))
+            edits.append((dimension.start(), dimension.end(), tag))
+
+    out, pos = [], 0
+    for start, end, text in sorted(edits, key=lambda edit: edit[0]):
+        out += [xml[pos:start], text]
+        pos = end
+    out.append(xml[pos:])
+    return "".join(out), replaced
+
+
+# ---------------------------------------------------------------------------
+# Package
+# ---------------------------------------------------------------------------
+
+def _full_calc_on_load(xml: str) -> str:
+    """workbook.xml with calcPr/@fullCalcOnLoad="1" (calcPr created if absent)."""
+    calc_pr = CALC_PR.search(xml)
+    if calc_pr:
+        attrs = calc_pr.group(2)
+        attrs = FULL_CALC.sub('fullCalcOnLoad="1"', attrs) if FULL_CALC.search(attrs) else attrs + ' fullCalcOnLoad="1"'
+        tag = f"<{calc_pr.group(1) or ''}calcPr{attrs}{calc_pr.group(3)}>"
+        return xml[:calc_pr.start()] + tag + xml[calc_pr.end():]
+    root = WORKBOOK_TAG.search(xml)
+    after = AFTER_CALC_PR.search(xml, root.end() if root else 0)
+    if not after:
+        raise UnsupportedTemplate("workbook.xml illisible")
+    p = root.group(1) or "" if root else ""
+    return xml[:after.start()] + f'<{p}calcPr fullCalcOnLoad="1"/>' + xml[after.start():]
+
+
+def _without(xml: str, pattern: re.Pattern, keep) -> str:
+    """xml without the elements matched by pattern whose attributes fail keep(attrs)."""
+    return pattern.sub(lambda m: m.group(0) if keep(_attrs(m.group(1))) else "", xml)
+
+
+def _entry(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    """New archive entry with the name, date, compression and attributes of the template's."""
+    entry = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    entry.compress_type = info.compress_type
+    entry.external_attr = info.external_attr
+    entry.file_size = info.file_size  # ZIP64 décidé à l'ouverture en écriture
+    return entry
+
+
+def patch_workbook(template_path: str, output_path: str, compiled: CompiledMapping,
+                   values: dict[str, float]) -> PatchResult:
+    """
+    Write the evaluated mapping into a copy of the template without loading
+    it: only the <c> elements of the mapped cells change. Raises
+    UnsupportedTemplate (before output_path is created) when the template
+    needs the full openpyxl round trip.
+    """
+    try:
+        src = zipfile.ZipFile(template_path)
+    except zipfile.BadZipFile as exc:
+        raise UnsupportedTemplate(f"archive illisible : {exc}")
+
+    with src:
+        workbook_part = next(
+            (rel["target"] for rel in _relationships(src, "") if rel["type"].endswith("/officeDocument")), None
+        )
+        if workbook_part is None:
+            raise UnsupportedTemplate("aucun classeur dans le paquet")
+        workbook_xml = _read_xml(src, workbook_part)
+        workbook_rels = _relationships(src, workbook_part)
+        worksheets = {rel["id"]: rel["target"] for rel in workbook_rels if rel["type"].endswith("/worksheet")}
+
+        root = ET.fromstring(workbook_xml)
+        sheets = [
+            (el.get("name"), worksheets.get(next((v for k, v in el.attrib.items() if _local(k) == "id"), None)))
+            for el in root.iter() if _local(el.tag) == "sheet"
+        ]
+        view = next((el for el in root.iter() if _local(el.tag) == "workbookView"), None)
+        active = int(view.get("activeTab", 0)) if view is not None else 0
+        parts = dict(sheets)
+        active_name = sheets[active][0] if active < len(sheets) else (sheets[0][0] if sheets else None)
+
+        # 1. Cellules par partie de feuille, maîtres des fusions résolus ensuite par feuille
+        per_sheet: dict[str, list] = {}
+        skipped_sheet = []
+        for cell in compiled.cells:
+            sheet = cell.sheet if cell.sheet is not None else active_name
+            part = parts.get(sheet)
+            if part is None:  # feuille absente, ou feuille graphique
+                skipped_sheet.append(cell.ref)
+                continue
+            per_sheet.setdefault(sheet, []).append(cell)
+
+        patched: dict[str, bytes] = {}
+        written, replaced_formulas = [], 0
+        for sheet, cells in per_sheet.items():
+            part = parts[sheet]
+            xml = _read_xml(src, part)
+            positions = [_cell_ref(cell.address) for cell in cells]
+            masters = _merged_masters(xml, positions)
+
+            writes, resolved = {}, []
+            for cell, position in zip(cells, positions):
+                target = masters.get(position, position)
+                value = values[cell.ref]
+                # Plusieurs cellules d'une même fusion : la dernière écrite l'emporte, comme avec openpyxl
+                writes[target] = _number(value)
+                resolved.append((cell, target, position, value))
+
+            xml, replaced = patch_sheet(xml, writes)
+            patched[part] = xml.encode("utf-8")
+            replaced_formulas += sum(1 for formula in replaced.values() if formula)
+            written += [
+                PatchedCell(cell.ref, sheet, cell.address, _address(*target) if target != position else None,
+                            value, replaced.get(target))
+                for cell, target, position, value in resolved
+            ]
+
+        # 2. Parties du classeur : recalcul complet à l'ouverture, calcChain retiré si une formule a disparu
+        dropped = set()
+        if patched:
+            patched[workbook_part] = _full_calc_on_load(workbook_xml).encode("utf-8")
+        calc_chain = next((rel["target"] for rel in workbook_rels if rel["type"].endswith("/calcChain")), None)
+        if replaced_formulas and calc_chain:
+            dropped.add(calc_chain)
+            rels_part = _rels_part(workbook_part)
+            patched[rels_part] = _without(
+                _read_xml(src, rels_part), RELATIONSHIP, lambda a: not a.get("Type", "").endswith("/calcChain")
+            ).encode("utf-8")
+            patched[CONTENT_TYPES] = _without(
+                _read_xml(src, CONTENT_TYPES), OVERRIDE, lambda a: a.get("PartName", "").lstrip("/") != calc_chain
+            ).encode("utf-8")
+
+        # 3. Nouvelle archive, dans l'ordre du modèle : parties modifiées écrites, les autres recopiées
+        # en flux (décompressées puis recompressées avec la même méthode : petites devant les feuilles)
+        copied = 0
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                if info.filename in dropped:
+                    continue
+                if info.filename in patched:
+                    entry = _entry(info)
+                    entry.compress_type = zipfile.ZIP_DEFLATED
+                    dst.writestr(entry, patched[info.filename])
+                else:
+                    with src.open(info) as part, dst.open(_entry(info), "w") as out:
+                        shutil.copyfileobj(part, out, COPY_CHUNK)
+                    copied += 1
+
+    return PatchResult(written, skipped_sheet, replaced_formulas, copied)
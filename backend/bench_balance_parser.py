@@ -0,0 +1,124 @@
+"""
+Benchmark — parsing d'une Balance Générale : boucle iterrows() historique
+vs. parsing vectorisé (app/services/balance_import.parse_balance_lines).
+
+Les deux implémentations reçoivent le même DataFrame brut (tout en str, comme
+pd.read_excel(dtype=str)) et doivent produire exactement les mêmes lignes,
+le même nombre de lignes ignorées et le même écart Débit/Crédit.
+
+Exécuter :
+  cd backend
+  python bench_balance_parser.py            # 40 000 lignes
+  python bench_balance_parser.py 200000
+"""
+
+import math
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+from app.services.balance_import import detect_columns, parse_balance_lines
+
+
+def make_raw_balance(n_lines: int, seed: int = 42) -> pd.DataFrame:
+    """6-column balance with a header row, subtotal rows and French-formatted amounts."""
+    rng = random.Random(seed)
+    rows = [["Compte", "Libellé", "Débit Mouvements", "Crédit Mouvements", "Solde Débiteur", "Solde Créditeur"]]
+    for i in range(n_lines):
+        if i % 500 == 499:
+            rows.append([f"Total classe {rng.randint(1, 7)}", None, None, None, None, None])
+            continue
+        code = f"{rng.randint(1, 8)}{rng.randint(0, 9)}{rng.randint(0, 9)}{i:06d}"
+        amount = rng.randint(1, 50_000_000) + rng.choice([0, 0, 0, 0.5, 0.25])
+        txt = f"{amount:,.2f}".replace(",", " ").replace(".", ",")
+        if rng.random() < 0.5:
+            sd, sc = txt, None
+        else:
+            sd, sc = None, txt
+        if i % 97 == 0:
+            sd = sc = None  # zero line
+        label = None if i % 211 == 0 else f"Compte auxiliaire {i}"
+        rows.append([f"{code}.0" if i % 3 == 0 else code, label, txt, txt, sd, sc])
+    return pd.DataFrame(rows, dtype=str)
+
+
+def legacy_parse(df: pd.DataFrame, col_map: dict) -> tuple[list, int]:
+    """Row loop as it was in routers/accounting.import_balance (DB calls removed)."""
+    lines = []
+    skipped_rows = 0
+
+    def _to_float(val) -> float:
+        if val is None or (isinstance(val, float) and math.isnan(val)):
+            return 0.0
+        try:
+            return float(str(val).replace(" ", "").replace("\xa0", "").replace(",", "."))
+        except (ValueError, TypeError):
+            return 0.0
+
+    for _, row in df.iterrows():
+        code_raw = str(row.get(col_map["account"], "")).split(".")[0].strip().lstrip("0")
+        code_raw = str(row.get(col_map["account"], "")).strip()
+        code_raw = code_raw.split(".")[0].strip()
+
+        if not code_raw or code_raw.lower() in {"nan", "", "total", "totaux"}:
+            skipped_rows += 1
+            continue
+        if not re.match(r"^\d{2,}", code_raw):
+            skipped_rows += 1
+            continue
+
+        label_raw = str(row.get(col_map.get("label", ""), "Solde Initial")).strip()
+        if not label_raw or label_raw.lower() == "nan":
+            label_raw = f"Compte {code_raw}"
+
+        if "debit" in col_map and "credit" in col_map:
+            debit = _to_float(row.get(col_map["debit"]))
+            credit = _to_float(row.get(col_map["credit"]))
+        elif "balance" in col_map:
+            bal = _to_float(row.get(col_map["balance"]))
+            debit = bal if bal > 0 else 0.0
+            credit = abs(bal) if bal < 0 else 0.0
+        else:
+            skipped_rows += 1
+            continue
+
+        if debit == 0.0 and credit == 0.0:
+            skipped_rows += 1
+            continue
+
+        lines.append((code_raw, label_raw[:120], round(debit, 2), round(credit, 2)))
+
+    return lines, skipped_rows
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 40_000
+    df_raw = make_raw_balance(n_lines)
+    df, col_map = detect_columns(df_raw)
+    print(f"Balance synthétique : {n_lines:,} lignes — colonnes {col_map}")
+
+    t0 = time.perf_counter()
+    old_lines, old_skipped = legacy_parse(df, col_map)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new_df, new_skipped = parse_balance_lines(df, col_map)
+    t_new = time.perf_counter() - t0
+
+    new_lines = list(new_df.itertuples(index=False, name=None))
+    assert new_skipped == old_skipped, f"skipped: {new_skipped} != {old_skipped}"
+    assert new_lines == old_lines, "Les lignes parsées diffèrent"
+    old_gap = round(round(sum(l[2] for l in old_lines), 2) - round(sum(l[3] for l in old_lines), 2), 2)
+    new_gap = round(round(float(new_df["debit"].sum()), 2) - round(float(new_df["credit"].sum()), 2), 2)
+    assert old_gap == new_gap, f"gap: {new_gap} != {old_gap}"
+
+    print(f"  iterrows()  : {t_old * 1000:>9.1f} ms")
+    print(f"  vectorisé   : {t_new * 1000:>9.1f} ms   (x{t_old / t_new:.1f})")
+    print(f"  {len(new_lines):,} lignes retenues, {new_skipped:,} ignorées, écart {new_gap:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
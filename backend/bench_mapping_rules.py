@@ -0,0 +1,93 @@
+"""
+Benchmark — règles de mappage de la liasse : analyse à chaque cellule vs
+mappage compilé (app/services/mapping_rules.py).
+
+Balance auxiliaire synthétique (comptes à 8 chiffres sur toutes les classes
+SYSCOHADA), évaluation complète de OTR_MAPPING :
+  1. ancien moteur : chaque règle ré-analysée, un masque startswith sur tous
+     les comptes par motif ;
+  2. moteur compilé : compilation (une fois, puis cache) + index trié des
+     codes (AccountTotals), tous les préfixes résolus par searchsorted ;
+  3. contrôle : les deux moteurs donnent les mêmes valeurs.
+
+Exécuter :
+  cd backend
+  python bench_mapping_rules.py
+  python bench_mapping_rules.py 200000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app.money import AccountTotals, from_minor
+from app.routers.templates import OTR_MAPPING
+from app.services import mapping_rules
+
+
+def generate_balance(n_accounts: int, seed: int = 21):
+    rng = np.random.default_rng(seed)
+    codes = np.unique(np.char.add(
+        rng.integers(1, 9, size=n_accounts).astype(str),
+        np.char.zfill(rng.integers(0, 10**7, size=n_accounts).astype(str), 7),
+    ))
+    rng.shuffle(codes)  # ordre quelconque, comme les soldes lus en base
+    debit = rng.integers(0, 50_000_000_00, size=len(codes))
+    credit = rng.integers(0, 50_000_000_00, size=len(codes))
+    return codes, debit - credit
+
+
+def legacy_value(codes: np.ndarray, net: np.ndarray, rule: str) -> float:
+    """Former ExcelInjector._get_value_for_mapping: parse, then one mask over every account per pattern."""
+    rule = rule.strip()
+    is_abs = rule.upper().startswith("ABS(") and rule.endswith(")")
+    if is_abs:
+        rule = rule[4:-1]
+    total = 0
+    for pattern in (p.strip() for p in rule.split(",") if p.strip()):
+        sign = -1 if pattern.startswith("-") else 1
+        pattern = pattern.lstrip("-").strip()
+        mask = np.char.startswith(codes, pattern[:-1]) if pattern.endswith("*") else codes == pattern
+        total += sign * int(net[mask].sum())
+    return from_minor(abs(total) if is_abs else total)
+
+
+def timed(fn, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def main():
+    n_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    codes, net = generate_balance(n_accounts)
+
+    old_values, t_legacy = timed(lambda: {ref: legacy_value(codes, net, rule) for ref, rule in OTR_MAPPING.items()})
+
+    t0 = time.perf_counter()
+    compiled = mapping_rules.compile_mapping(OTR_MAPPING)
+    t_compile = time.perf_counter() - t0
+    _, t_cached = timed(lambda: mapping_rules.compile_mapping(OTR_MAPPING))
+    totals, t_index = timed(lambda: AccountTotals(codes, net.clip(min=0), (-net).clip(min=0)))
+    new_values, t_eval = timed(lambda: compiled.evaluate(totals))
+
+    mismatches = [ref for ref in OTR_MAPPING if old_values[ref] != new_values[ref]]
+
+    print(f"\n{len(totals):,} comptes, {len(compiled)} cellules, "
+          f"{len(compiled.prefixes)} préfixes et {len(compiled.codes)} comptes exacts distincts")
+    print(f"  Ancien moteur (analyse + masque par motif) : {t_legacy * 1000:>9.2f} ms")
+    print(f"  Compilation du mappage                     : {t_compile * 1000:>9.2f} ms"
+          f"   (en cache : {t_cached * 1e6:.1f} µs)")
+    print(f"  Index trié des codes                       : {t_index * 1000:>9.2f} ms")
+    print(f"  Évaluation du mappage compilé              : {t_eval * 1000:>9.2f} ms"
+          f"   (x{t_legacy / max(t_index + t_eval, 1e-9):.0f} index compris)")
+    print(f"  Cellules différentes entre les deux moteurs : {len(mismatches)}"
+          + (f"  {mismatches[:5]}" if mismatches else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark — écriture des cellules fusionnées par ExcelInjector : parcours de
+toutes les plages fusionnées à chaque cellule vs index (ligne, colonne) →
+cellule maîtresse construit une fois par feuille.
+
+Modèle synthétique : les onglets de OTR_MAPPING, chacun avec plusieurs
+milliers de plages fusionnées (libellés sur 2 à 4 colonnes, blocs de
+montants), dont une partie couvre les cellules du mappage. Mesures :
+  1. recherche de la cellule maîtresse, par cellule du mappage : parcours
+     des plages vs index (construit une fois par feuille chargée) ;
+  2. écriture des cellules du mappage (hors chargement / sauvegarde), avec
+     l'index du cache des modèles (services/template_cache : construit une
+     fois par modèle, pas par génération) ;
+  3. génération complète (generate_report) ;
+  4. contrôle : les deux classeurs générés ont les mêmes valeurs partout.
+
+Exécuter :
+  cd backend
+  python bench_merged_cells.py
+  python bench_merged_cells.py 10000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+from app.money import AccountTotals
+from app.routers.templates import OTR_MAPPING
+from app.services import mapping_rules, template_cache
+from app.services.injector import ExcelInjector
+
+
+class SyntheticInjector(ExcelInjector):
+    """Injector fed with generated balances instead of the database."""
+
+    def __init__(self, totals: AccountTotals):
+        super().__init__(db=None, company_id=0)
+        self._synthetic = totals
+
+    def _fetch_balances(self):
+        self.totals = self._synthetic
+        self.balances = self.totals.as_amounts()
+
+
+class LegacyInjector(SyntheticInjector):
+    def _write_cell(self, ws, cell_addr: str, value: float):
+        """Former _write_cell: scan of every merged range for each written cell."""
+        target_row, target_col = self._parse_cell_addr(cell_addr)
+        for merged_range in ws.merged_cells.ranges:
+            if (merged_range.min_row <= target_row <= merged_range.max_row and
+                    merged_range.min_col <= target_col <= merged_range.max_col):
+                master = ws.cell(row=merged_range.min_row, column=merged_range.min_col)
+                master.value = value
+                self._log.append(f"  MERGED → {ws.title}!{cell_addr} → master "
+                                  f"({get_column_letter(merged_range.min_col)}{merged_range.min_row}) = {value}")
+                return
+        cell = ws.cell(row=target_row, column=target_col)
+        cell.value = value
+        self._log.append(f"  WRITE  → {ws.title}!{cell_addr} = {value}")
+
+
+def build_template(path: str, merges_per_sheet: int, rng) -> int:
+    """Template with the OTR sheets; every other mapped cell sits in a merged block."""
+    wb = openpyxl.Workbook()
+    sheets = list(dict.fromkeys(ref.split("!", 1)[0] for ref in OTR_MAPPING))
+    wb.active.title = sheets[0]
+    for name in sheets[1:]:
+        wb.create_sheet(name)
+
+    mapped = {}
+    for i, ref in enumerate(OTR_MAPPING):
+        sheet, address = ref.split("!", 1)
+        row, col = openpyxl.utils.cell.coordinate_to_tuple(address)
+        mapped.setdefault(sheet, []).append((row, col, i % 2 == 0))
+
+    total = 0
+    for name in sheets:
+        ws = wb[name]
+        used = set()
+        for row, col, merge in mapped.get(name, []):
+            ws.cell(row=row, column=col, value=f"=SUM(Z{row}:Z{row + 1})")
+            if merge and (row, col) not in used and (row, col + 1) not in used:
+                # Cellule du mappage à l'intérieur d'un bloc : le maître est à sa gauche
+                ws.merge_cells(start_row=row, start_column=col - 1, end_row=row, end_column=col)
+                used.update({(row, col - 1), (row, col)})
+            used.add((row, col))
+        # Libellés fusionnés sous la zone du mappage (colonnes A–L, lignes 200+)
+        row = 200
+        for _ in range(merges_per_sheet):
+            start = int(rng.integers(1, 9))
+            width = int(rng.integers(1, 4))
+            ws.cell(row=row, column=start, value=f"Libellé {row}")
+            ws.merge_cells(start_row=row, start_column=start, end_row=row + int(rng.integers(0, 2)),
+                           end_column=start + width)
+            row += 2
+        total += len(ws.merged_cells.ranges)
+    wb.save(path)
+    return total
+
+
+def write_all(injector: ExcelInjector, wb, compiled, values, merged: dict = None) -> float:
+    injector._merged = dict(merged or {})
+    t0 = time.perf_counter()
+    for cell in compiled.cells:
+        injector._write_cell(wb[cell.sheet], cell.address, values[cell.ref])
+    return time.perf_counter() - t0
+
+
+def lookups(wb, compiled) -> tuple[float, float, float]:
+    """(index build, scan per cell, index lookup per cell), in seconds."""
+    targets = [
+        (wb[cell.sheet], *openpyxl.utils.cell.coordinate_to_tuple(cell.address)) for cell in compiled.cells
+    ]
+    injector = ExcelInjector(db=None, company_id=0)
+    t0 = time.perf_counter()
+    for ws in wb.worksheets:
+        injector._merged_masters(ws)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for ws, row, col in targets:
+        next((r for r in ws.merged_cells.ranges
+              if r.min_row <= row <= r.max_row and r.min_col <= col <= r.max_col), None)
+    t_scan = (time.perf_counter() - t0) / len(targets)
+
+    t0 = time.perf_counter()
+    for ws, row, col in targets:
+        injector._merged_masters(ws).get((row, col))
+    t_index = (time.perf_counter() - t0) / len(targets)
+    return t_build, t_scan, t_index
+
+
+def workbook_values(path: str) -> dict:
+    wb = openpyxl.load_workbook(path)
+    values = {
+        (ws.title, cell.coordinate): cell.value
+        for ws in wb.worksheets for row in ws.iter_rows() for cell in row if cell.value is not None
+    }
+    merges = {(ws.title, str(r)) for ws in wb.worksheets for r in ws.merged_cells.ranges}
+    return values, merges
+
+
+def main():
+    merges_per_sheet = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    rng = np.random.default_rng(23)
+    codes = np.array([f"{c}{n:05d}" for c in range(1, 9) for n in rng.integers(0, 10**5, size=500)])
+    net = rng.integers(-10**9, 10**9, size=len(codes))
+    totals = AccountTotals(codes, net.clip(min=0), (-net).clip(min=0))
+    compiled = mapping_rules.compile_mapping(OTR_MAPPING)
+    values = compiled.evaluate(totals)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.xlsx")
+        n_merges = build_template(template, merges_per_sheet, rng)
+
+        legacy, indexed = LegacyInjector(totals), SyntheticInjector(totals)
+        wb_legacy, wb_indexed = openpyxl.load_workbook(template), openpyxl.load_workbook(template)
+        t_build, t_scan, t_lookup = lookups(wb_indexed, compiled)
+        t_write_legacy = min(write_all(legacy, wb_legacy, compiled, values) for _ in range(3))
+        merged = {ws.title: template_cache.merged_index(ws) for ws in wb_indexed.worksheets}
+        t_write_indexed = min(write_all(indexed, wb_indexed, compiled, values, merged) for _ in range(3))
+
+        out_legacy, out_indexed = os.path.join(tmp, "legacy.xlsx"), os.path.join(tmp, "indexed.xlsx")
+        t0 = time.perf_counter()
+        LegacyInjector(totals).generate_report(template, out_legacy, OTR_MAPPING)
+        t_full_legacy = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        SyntheticInjector(totals).generate_report(template, out_indexed, OTR_MAPPING)
+        t_full_indexed = time.perf_counter() - t0
+
+        identical = workbook_values(out_legacy) == workbook_values(out_indexed)
+
+    print(f"\n{n_merges:,} plages fusionnées, {len(compiled)} cellules écrites")
+    print(f"  Maître d'une cellule    parcours : {t_scan * 1e6:>9.1f} µs   index : {t_lookup * 1e6:>9.1f} µs"
+          f"   (index construit en {t_build * 1000:.1f} ms pour le classeur)")
+    print(f"  Écriture des cellules   parcours : {t_write_legacy * 1000:>9.2f} ms   index : "
+          f"{t_write_indexed * 1000:>9.2f} ms   (x{t_write_legacy / max(t_write_indexed, 1e-9):.0f})")
+    print(f"  Génération complète     parcours : {t_full_legacy * 1000:>9.0f} ms   index : {t_full_indexed * 1000:>9.0f} ms")
+    print(f"  Classeurs générés identiques : {'oui' if identical else 'NON'}")
+
+
+if __name__ == "__main__":
+    main()
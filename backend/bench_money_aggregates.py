@@ -0,0 +1,140 @@
+"""
+Benchmark — agrégats de montants : colonnes FLOAT historiques vs unités
+mineures BIGINT (app/money.py).
+
+Deux bases SQLite temporaires, mêmes lignes d'écriture (montants à 2
+décimales) : l'une en FLOAT, l'autre en BIGINT (centièmes). Mesures :
+  1. SUM(débit), SUM(crédit) GROUP BY compte en SQL ;
+  2. évaluation des règles de la liasse : boucle dict float + round(..., 2)
+     (ancien ExcelInjector) vs index int64 trié par code
+     (AccountTotals) ;
+  3. exactitude : écart Σ Débit − Σ Crédit d'une balance équilibrée.
+
+Exécuter :
+  cd backend
+  python bench_money_aggregates.py
+  python bench_money_aggregates.py 2000000
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.money import MINOR_UNITS, AccountTotals, from_minor
+
+RULES = [
+    "21*", "22*", "24*", "-28*", "ABS(284*)", "31*, 32*", "41*", "-40*", "52*, 57*", "-56*",
+    "-101*", "-13*", "601*, -603*", "604*", "62*, 63*", "66*", "681*", "-701*", "-706*", "-77*",
+]
+
+
+def generate_lines(n_lines: int, n_accounts: int = 3000, seed: int = 16):
+    """Balanced lines: each debit line is matched by a credit line of the same amount."""
+    rng = np.random.default_rng(seed)
+    codes = np.array(sorted({f"{rng.integers(1, 9)}{rng.integers(0, 10**5):05d}" for _ in range(n_accounts)}))
+    half = n_lines // 2
+    cents = rng.integers(1, 5_000_000_00, size=half)  # montants au centime
+    accounts = rng.integers(0, len(codes), size=(2, half))
+    account_idx = np.concatenate([accounts[0], accounts[1]])
+    debit = np.concatenate([cents, np.zeros(half, dtype=np.int64)])
+    credit = np.concatenate([np.zeros(half, dtype=np.int64), cents])
+    return codes, account_idx, debit, credit
+
+
+def build_db(path: str, codes, account_idx, debit, credit, minor: bool):
+    amount_type = "BIGINT" if minor else "FLOAT"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE accounts (id INTEGER PRIMARY KEY, code TEXT)")
+    conn.execute(f"CREATE TABLE entry_lines (id INTEGER PRIMARY KEY, account_id INTEGER, debit {amount_type}, credit {amount_type})")
+    conn.executemany("INSERT INTO accounts VALUES (?, ?)", enumerate(codes.tolist(), start=1))
+    if minor:
+        rows = zip((account_idx + 1).tolist(), debit.tolist(), credit.tolist())
+    else:
+        rows = zip((account_idx + 1).tolist(), (debit / MINOR_UNITS).tolist(), (credit / MINOR_UNITS).tolist())
+    conn.executemany("INSERT INTO entry_lines (account_id, debit, credit) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+QUERY = (
+    "SELECT a.code, SUM(l.debit), SUM(l.credit) FROM entry_lines l "
+    "JOIN accounts a ON a.id = l.account_id GROUP BY a.code"
+)
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def legacy_rules(balances: dict[str, float]) -> list[float]:
+    """Former ExcelInjector._get_value_for_mapping: dict scan per prefix, float sums, round(..., 2)."""
+    values = []
+    for rule in RULES:
+        is_abs = rule.startswith("ABS(")
+        body = rule[4:-1] if is_abs else rule
+        total = 0.0
+        for pattern in (p.strip() for p in body.split(",")):
+            sign = -1.0 if pattern.startswith("-") else 1.0
+            prefix = pattern.lstrip("-").rstrip("*")
+            total += sign * sum(bal for code, bal in balances.items() if code.startswith(prefix))
+        values.append(round(abs(total) if is_abs else total, 2))
+    return values
+
+
+def minor_rules(totals: AccountTotals) -> list[float]:
+    values = []
+    for rule in RULES:
+        is_abs = rule.startswith("ABS(")
+        body = rule[4:-1] if is_abs else rule
+        total = 0
+        for pattern in (p.strip() for p in body.split(",")):
+            sign = -1 if pattern.startswith("-") else 1
+            total += sign * totals.sum_net(pattern.lstrip("-").rstrip("*"))
+        values.append(from_minor(abs(total) if is_abs else total))
+    return values
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    codes, account_idx, debit, credit = generate_lines(n_lines)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        float_db = build_db(os.path.join(tmp, "float.db"), codes, account_idx, debit, credit, minor=False)
+        minor_db = build_db(os.path.join(tmp, "minor.db"), codes, account_idx, debit, credit, minor=True)
+
+        float_rows, t_float_sql = timed(lambda: float_db.execute(QUERY).fetchall())
+        minor_rows, t_minor_sql = timed(lambda: minor_db.execute(QUERY).fetchall())
+
+        balances = {code: d - c for code, d, c in float_rows}
+        totals = AccountTotals(
+            [r[0] for r in minor_rows], [r[1] for r in minor_rows], [r[2] for r in minor_rows]
+        )
+        old_values, t_float_rules = timed(lambda: legacy_rules(balances), repeat=5)
+        new_values, t_minor_rules = timed(lambda: minor_rules(totals), repeat=5)
+
+        float_gap = sum(d for _, d, _ in float_rows) - sum(c for _, _, c in float_rows)
+        minor_gap = totals.total_debit() - totals.total_credit()
+        mismatches = sum(1 for a, b in zip(old_values, new_values) if abs(a - b) > 0.005)
+
+        float_db.close()
+        minor_db.close()
+
+    print(f"\n{n_lines:,} lignes d'écriture, {len(codes):,} comptes, {len(RULES)} règles de liasse")
+    print(f"  SUM GROUP BY compte   FLOAT : {t_float_sql * 1000:>8.1f} ms   BIGINT : {t_minor_sql * 1000:>8.1f} ms")
+    print(f"  Règles de la liasse   float : {t_float_rules * 1000:>8.2f} ms   int64  : {t_minor_rules * 1000:>8.2f} ms"
+          f"   (x{t_float_rules / max(t_minor_rules, 1e-9):.1f})")
+    print(f"  Σ Débit − Σ Crédit    float : {float_gap!r}   int64 : {minor_gap} (exact)")
+    print(f"  Règles différant de plus d'un demi-centime : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark — génération de la liasse : moteur openpyxl (classeur chargé puis
+réécrit en entier) vs moteur xml (app/services/xlsx_patch.py : seuls les
+éléments <c> des cellules du mappage sont réécrits dans l'archive).
+
+Modèle synthétique de bench_merged_cells.py (onglets de OTR_MAPPING,
+formules sur les cellules du mappage, plusieurs milliers de plages
+fusionnées par onglet). Mesures :
+  1. openpyxl, premier appel (analyse du modèle) puis modèle en cache
+     (services/template_cache) ;
+  2. xml ;
+  3. contrôle : mêmes valeurs et mêmes fusions dans les deux classeurs
+     générés, parties non modifiées recopiées à l'identique.
+
+Exécuter :
+  cd backend
+  python bench_xlsx_patch.py
+  python bench_xlsx_patch.py 10000
+"""
+
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from app.money import AccountTotals
+from app.routers.templates import OTR_MAPPING
+from app.services import template_cache
+from bench_merged_cells import SyntheticInjector, build_template, workbook_values
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def unchanged_parts(template: str, output: str) -> tuple[int, int]:
+    """(parts identical to the template, parts of the template)."""
+    with zipfile.ZipFile(template) as src, zipfile.ZipFile(output) as dst:
+        names = set(dst.namelist())
+        same = sum(1 for name in src.namelist() if name in names and src.read(name) == dst.read(name))
+        return same, len(src.namelist())
+
+
+def main():
+    merges_per_sheet = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    rng = np.random.default_rng(25)
+    codes = np.array([f"{c}{n:05d}" for c in range(1, 9) for n in rng.integers(0, 10**5, size=500)])
+    net = rng.integers(-10**9, 10**9, size=len(codes))
+    totals = AccountTotals(codes, net.clip(min=0), (-net).clip(min=0))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.xlsx")
+        build_template(template, merges_per_sheet, rng)
+        out_openpyxl, out_xml = os.path.join(tmp, "openpyxl.xlsx"), os.path.join(tmp, "xml.xlsx")
+
+        def generate(engine: str, output: str):
+            SyntheticInjector(totals).generate_report(template, output, OTR_MAPPING, engine=engine)
+
+        template_cache.invalidate()
+        t_cold = timed(lambda: generate("openpyxl", out_openpyxl), repeat=1)
+        t_warm = timed(lambda: generate("openpyxl", out_openpyxl))
+        t_xml = timed(lambda: generate("xml", out_xml))
+
+        identical = workbook_values(out_openpyxl) == workbook_values(out_xml)
+        same, total = unchanged_parts(template, out_xml)
+        size = os.path.getsize(template)
+
+    print(f"\nModèle de {size / 1e6:.1f} Mo, {len(OTR_MAPPING)} cellules du mappage")
+    print(f"  openpyxl, premier appel    : {t_cold * 1000:>9.0f} ms")
+    print(f"  openpyxl, modèle en cache  : {t_warm * 1000:>9.0f} ms")
+    print(f"  xml                        : {t_xml * 1000:>9.1f} ms   (x{t_warm / max(t_xml, 1e-9):.0f} vs cache)")
+    print(f"  Mêmes valeurs et fusions   : {'oui' if identical else 'NON'}")
+    print(f"  Parties inchangées (xml)   : {same} / {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark — lecture d'une balance .xlsx : pd.read_excel(dtype=str) historique
+vs. lecture en flux de la première feuille, parsée par blocs de
+XLSX_CHUNK_ROWS lignes (app/services/balance_import.parse_xlsx_balance).
+
+Pour chaque fichier : temps de lecture + parsing, pic mémoire (tracemalloc,
+mesuré dans un second passage) — écart signalé dans les deux sens —, et
+contrôle que les lignes parsées sont identiques entre les deux chemins.
+
+Fichiers mesurés : la balance réelle "BALACE GENERALE2024 (1).xlsx" (racine du
+dépôt) et des balances 8 colonnes générées (10 000 et 100 000 lignes par défaut).
+
+Exécuter :
+  cd backend
+  python bench_xlsx_reader.py
+  python bench_xlsx_reader.py 50000 250000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+
+from app.services.balance_import import detect_columns, parse_balance_lines, parse_xlsx_balance
+
+REAL_BALANCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "BALACE GENERALE2024 (1).xlsx")
+
+
+def write_large_balance(path: str, n_lines: int, seed: int = 7):
+    """8-column SYSCOHADA balance (no header row), numeric cells, a second sheet of noise."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Balance")
+    for i in range(n_lines):
+        code = int(f"{rng.randint(1, 8)}{rng.randint(0, 9)}{i:06d}")
+        amount = rng.randint(1, 50_000_000)
+        if rng.random() < 0.5:
+            ws.append([code, f"Compte auxiliaire {i}", amount, None, None, None, amount, None])
+        else:
+            ws.append([code, f"Compte auxiliaire {i}", None, amount, None, None, None, amount])
+    notes = wb.create_sheet("Notes")
+    for i in range(n_lines // 10):
+        notes.append([f"note {i}", i, i * 2])
+    wb.save(path)
+
+
+def legacy_parse(path: str):
+    return parse_balance_lines(*detect_columns(pd.read_excel(path, header=None, dtype=str)))
+
+
+def streaming_parse(path: str):
+    lines, skipped, _, _ = parse_xlsx_balance(path)
+    return lines, skipped
+
+
+def measure(parse, path: str):
+    t0 = time.perf_counter()
+    lines, skipped = parse(path)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return lines, skipped, elapsed, peak
+
+
+def compare(path: str, label: str):
+    old_lines, old_skipped, t_old, m_old = measure(legacy_parse, path)
+    new_lines, new_skipped, t_new, m_new = measure(streaming_parse, path)
+
+    assert old_skipped == new_skipped, f"skipped: {new_skipped} != {old_skipped}"
+    assert old_lines.equals(new_lines), "Les lignes parsées diffèrent"
+
+    print(f"\n{label} — {len(new_lines):,} lignes ({os.path.getsize(path) / 1e6:.1f} Mo)")
+    print(f"  pd.read_excel  : {t_old * 1000:>9.1f} ms   pic {m_old / 1e6:>8.1f} Mo")
+    print(f"  flux par blocs : {t_new * 1000:>9.1f} ms   pic {m_new / 1e6:>8.1f} Mo"
+          f"   (temps x{t_old / t_new:.1f}, pic mémoire {m_new / max(m_old, 1) - 1:+.0%}"
+          f"{'  ⚠ RÉGRESSION MÉMOIRE' if m_new > m_old else ''})")
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+
+    if os.path.exists(REAL_BALANCE):
+        compare(REAL_BALANCE, os.path.basename(REAL_BALANCE))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_lines in sizes:
+            path = os.path.join(tmp, f"balance_{n_lines}.xlsx")
+            write_large_balance(path, n_lines)
+            compare(path, f"Balance générée {n_lines:,} lignes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,42 @@
 """
-Génération d'une Balance Générale de test au format SYSCOHADA Révisé
-Société fictive : ETAL COMMERCE SARL — Exercice 2025 — Lomé, Togo
+Génération de balances et de journaux de test au format SYSCOHADA Révisé.
 
-Format : 6 colonnes
-  Compte | Libellé | Débit Mouvements | Crédit Mouvements | Solde Débiteur | Solde Créditeur
+1. Sans argument : la Balance Générale de démonstration
+   Société fictive : ETAL COMMERCE SARL — Exercice 2025 — Lomé, Togo
+   Format : 6 colonnes
+     Compte | Libellé | Débit Mouvements | Crédit Mouvements | Solde Débiteur | Solde Créditeur
+   → Crée : test_balance_ETAL_COMMERCE_2025.xlsx
+
+2. Avec options : générateur de volumétrie pour les benchmarks (import, injection,
+   audit, dashboard). Balances équilibrées (Σ SD = Σ SC) réparties sur les préfixes
+   des classes 1 à 8, journaux complets (ventes, achats, banque, OD) dont chaque
+   pièce est équilibrée, pour autant de sociétés que voulu. Tirages reproductibles
+   (--seed), sorties XLSX, CSV ou écriture directe en base.
 
 Exécuter :
   cd backend
   python create_test_balance.py
-→ Crée : test_balance_ETAL_COMMERCE_2025.xlsx
+  python create_test_balance.py --lines 100k --companies 20 --format csv --out /tmp/balances
+  python create_test_balance.py --lines 1k --journal 1M --format db
+  python create_test_balance.py --lines 1M --companies 3 --format csv --journal 1M
+
+Les fichiers générés sont accompagnés d'un manifest.csv (société;fichier) pour
+import_batch.py --manifest.
 """
 
+import argparse
+import csv
+import os
+import time
+from datetime import datetime
+
+import numpy as np
 import openpyxl
+import pandas as pd
 from openpyxl.styles import (
     Font, PatternFill, Alignment, Border, Side, numbers
 )
 from openpyxl.utils import get_column_letter
-import os
 
 # ---------------------------------------------------------------------------
 # DONNÉES — Balance équilibrée (Σ SD = Σ SC = 277 300 000 FCFA)
@@ -67,7 +87,6 @@ LIGNES = [
 total_sd = sum(l[4] for l in LIGNES)
 total_sc = sum(l[5] for l in LIGNES)
 assert total_sd == total_sc, f"ERREUR : La balance n'est PAS équilibrée ! SD={total_sd:,} ≠ SC={total_sc:,}"
-print(f"✅ Balance équilibrée : Σ SD = Σ SC = {total_sd:,.0f} FCFA")
 
 # ---------------------------------------------------------------------------
 # STYLES
@@ -111,133 +130,566 @@ CLASS_LABELS = {
 }
 
 # ---------------------------------------------------------------------------
-# CRÉATION DU CLASSEUR
+# BALANCE ETAL COMMERCE (fichier de démonstration)
 # ---------------------------------------------------------------------------
-wb = openpyxl.Workbook()
-ws = wb.active
-ws.title = "Balance Générale"
-
-# ---- Titre ----
-ws.merge_cells("A1:F1")
-ws["A1"] = "ETAL COMMERCE SARL — BALANCE GÉNÉRALE AU 31/12/2025"
-ws["A1"].font = Font(name="Calibri", bold=True, size=13, color="1B4F8A")
-ws["A1"].alignment = Alignment(horizontal="center", vertical="center")
-ws.row_dimensions[1].height = 28
-
-ws.merge_cells("A2:F2")
-ws["A2"] = "RC Togo 2020B12345 — NIF 1234567890 — Secteur : Commerce Général — Lomé"
-ws["A2"].font = Font(name="Calibri", size=9, italic=True, color="555555")
-ws["A2"].alignment = Alignment(horizontal="center")
-
-ws.merge_cells("A3:F3")  # spacer
-
-# ---- En-têtes colonnes ----
-HEADERS = ["Compte", "Libellé", "Débit Mouvements", "Crédit Mouvements", "Solde Débiteur", "Solde Créditeur"]
-HDR_ROW = 4
-for col_idx, header in enumerate(HEADERS, 1):
-    cell = ws.cell(row=HDR_ROW, column=col_idx, value=header)
-    cell.font = HEADER_FONT
-    cell.fill = HEADER_FILL
-    cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    cell.border = BORDER_STD
-ws.row_dimensions[HDR_ROW].height = 32
-
-# ---- Largeur colonnes ----
-COL_WIDTHS = [12, 42, 20, 20, 20, 20]
-for i, w in enumerate(COL_WIDTHS, 1):
-    ws.column_dimensions[get_column_letter(i)].width = w
-
-# ---- Lignes de données ----
-data_row = HDR_ROW + 1
-seen_classes = set()
-
-for code, libelle, d_mvt, c_mvt, sd, sc in LIGNES:
-    cls = code[0]
-    fill = CLASS_FILL.get(cls, PatternFill())
-
-    # Séparateur de classe
-    if cls not in seen_classes:
-        seen_classes.add(cls)
-        ws.merge_cells(f"A{data_row}:F{data_row}")
-        sep_cell = ws[f"A{data_row}"]
-        sep_cell.value = CLASS_LABELS.get(cls, f"CLASSE {cls}")
-        sep_cell.font = Font(name="Calibri", bold=True, size=9, color="1B4F8A")
-        sep_cell.fill = PatternFill("solid", fgColor="EAF2FB")
-        sep_cell.alignment = Alignment(horizontal="left", vertical="center", indent=1)
-        sep_cell.border = Border(bottom=Side(style="thin", color="1B4F8A"))
-        ws.row_dimensions[data_row].height = 16
+def write_etal_balance():
+    print(f"✅ Balance équilibrée : Σ SD = Σ SC = {total_sd:,.0f} FCFA")
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Balance Générale"
+
+    # ---- Titre ----
+    ws.merge_cells("A1:F1")
+    ws["A1"] = "ETAL COMMERCE SARL — BALANCE GÉNÉRALE AU 31/12/2025"
+    ws["A1"].font = Font(name="Calibri", bold=True, size=13, color="1B4F8A")
+    ws["A1"].alignment = Alignment(horizontal="center", vertical="center")
+    ws.row_dimensions[1].height = 28
+
+    ws.merge_cells("A2:F2")
+    ws["A2"] = "RC Togo 2020B12345 — NIF 1234567890 — Secteur : Commerce Général — Lomé"
+    ws["A2"].font = Font(name="Calibri", size=9, italic=True, color="555555")
+    ws["A2"].alignment = Alignment(horizontal="center")
+
+    ws.merge_cells("A3:F3")  # spacer
+
+    # ---- En-têtes colonnes ----
+    HEADERS = ["Compte", "Libellé", "Débit Mouvements", "Crédit Mouvements", "Solde Débiteur", "Solde Créditeur"]
+    HDR_ROW = 4
+    for col_idx, header in enumerate(HEADERS, 1):
+        cell = ws.cell(row=HDR_ROW, column=col_idx, value=header)
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        cell.border = BORDER_STD
+    ws.row_dimensions[HDR_ROW].height = 32
+
+    # ---- Largeur colonnes ----
+    COL_WIDTHS = [12, 42, 20, 20, 20, 20]
+    for i, w in enumerate(COL_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+
+    # ---- Lignes de données ----
+    data_row = HDR_ROW + 1
+    seen_classes = set()
+
+    for code, libelle, d_mvt, c_mvt, sd, sc in LIGNES:
+        cls = code[0]
+        fill = CLASS_FILL.get(cls, PatternFill())
+
+        # Séparateur de classe
+        if cls not in seen_classes:
+            seen_classes.add(cls)
+            ws.merge_cells(f"A{data_row}:F{data_row}")
+            sep_cell = ws[f"A{data_row}"]
+            sep_cell.value = CLASS_LABELS.get(cls, f"CLASSE {cls}")
+            sep_cell.font = Font(name="Calibri", bold=True, size=9, color="1B4F8A")
+            sep_cell.fill = PatternFill("solid", fgColor="EAF2FB")
+            sep_cell.alignment = Alignment(horizontal="left", vertical="center", indent=1)
+            sep_cell.border = Border(bottom=Side(style="thin", color="1B4F8A"))
+            ws.row_dimensions[data_row].height = 16
+            data_row += 1
+
+        # Ligne de compte
+        row_data = [code, libelle, d_mvt if d_mvt else None, c_mvt if c_mvt else None,
+                    sd if sd else None, sc if sc else None]
+        for col_idx, val in enumerate(row_data, 1):
+            cell = ws.cell(row=data_row, column=col_idx, value=val)
+            cell.font = DEF_FONT
+            cell.fill = fill
+            cell.border = BORDER_STD
+            if col_idx == 1:
+                cell.font = Font(name="Courier New", size=10, bold=True)
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+            elif col_idx == 2:
+                cell.alignment = Alignment(horizontal="left", vertical="center", indent=1)
+            else:
+                cell.number_format = NUM_FORMAT
+                cell.alignment = Alignment(horizontal="right", vertical="center")
+        ws.row_dimensions[data_row].height = 17
         data_row += 1
 
-    # Ligne de compte
-    row_data = [code, libelle, d_mvt if d_mvt else None, c_mvt if c_mvt else None,
-                sd if sd else None, sc if sc else None]
-    for col_idx, val in enumerate(row_data, 1):
-        cell = ws.cell(row=data_row, column=col_idx, value=val)
-        cell.font = DEF_FONT
-        cell.fill = fill
-        cell.border = BORDER_STD
-        if col_idx == 1:
-            cell.font = Font(name="Courier New", size=10, bold=True)
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        elif col_idx == 2:
-            cell.alignment = Alignment(horizontal="left", vertical="center", indent=1)
-        else:
-            cell.number_format = NUM_FORMAT
-            cell.alignment = Alignment(horizontal="right", vertical="center")
-    ws.row_dimensions[data_row].height = 17
+    # ---- Ligne TOTAL ----
     data_row += 1
+    ws.merge_cells(f"A{data_row}:B{data_row}")
+    total_label = ws[f"A{data_row}"]
+    total_label.value = "TOTAL GÉNÉRAL"
+    total_label.font = TOTAL_FONT
+    total_label.fill = TOTAL_FILL
+    total_label.alignment = Alignment(horizontal="center", vertical="center")
+    total_label.border = BORDER_STD
+
+    for col_offset, val in enumerate([
+        sum(l[2] for l in LIGNES),
+        sum(l[3] for l in LIGNES),
+        total_sd,
+        total_sc,
+    ], 3):
+        cell = ws.cell(row=data_row, column=col_offset, value=val)
+        cell.font = TOTAL_FONT
+        cell.fill = TOTAL_FILL
+        cell.number_format = NUM_FORMAT
+        cell.alignment = Alignment(horizontal="right", vertical="center")
+        cell.border = BORDER_STD
+    ws.row_dimensions[data_row].height = 22
+
+    # ---- Équilibre check ----
+    data_row += 2
+    ws.merge_cells(f"A{data_row}:F{data_row}")
+    check_cell = ws[f"A{data_row}"]
+    check_cell.value = (
+        f"✅  Balance ÉQUILIBRÉE — Σ Soldes Débiteurs = Σ Soldes Créditeurs = {total_sd:,.0f} FCFA  |  "
+        f"Résultat d'Exercice implicite (Produits - Charges) = {(sum(l[5] for l in LIGNES if l[0].startswith('7')) - sum(l[4] for l in LIGNES if l[0].startswith('6'))):,.0f} FCFA"
+    )
+    check_cell.font = Font(name="Calibri", bold=True, size=9, color="1A5276")
+    check_cell.alignment = Alignment(horizontal="center")
+
+    # ---- Freeze panes ----
+    ws.freeze_panes = ws[f"A{HDR_ROW + 1}"]
+
+    # ---- Sauvegarde ----
+    OUTPUT_NAME = "test_balance_ETAL_COMMERCE_2025.xlsx"
+    OUTPUT_PATH = os.path.join(os.path.dirname(__file__), OUTPUT_NAME)
+    wb.save(OUTPUT_PATH)
+    print(f"\n📁 Fichier généré : {OUTPUT_PATH}")
+    print(f"\n📊 Résumé de la balance :")
+    print(f"   Nombre de comptes  : {len(LIGNES)}")
+    print(f"   Σ Soldes Débiteurs : {total_sd:>20,.0f} FCFA")
+    print(f"   Σ Soldes Créditeurs: {total_sc:>20,.0f} FCFA")
+    profit = sum(l[5] for l in LIGNES if l[0].startswith('7')) - \
+             sum(l[4] for l in LIGNES if l[0].startswith('6'))
+    print(f"   Résultat Exercice  : {profit:>20,.0f} FCFA  (Bénéfice)" if profit >= 0 else
+          f"   Résultat Exercice  : {profit:>20,.0f} FCFA  (Perte)")
+    print(f"\n✅ Prêt à importer dans Auditia via : Import > Importer une Balance")
 
-# ---- Ligne TOTAL ----
-data_row += 1
-ws.merge_cells(f"A{data_row}:B{data_row}")
-total_label = ws[f"A{data_row}"]
-total_label.value = "TOTAL GÉNÉRAL"
-total_label.font = TOTAL_FONT
-total_label.fill = TOTAL_FILL
-total_label.alignment = Alignment(horizontal="center", vertical="center")
-total_label.border = BORDER_STD
-
-for col_offset, val in enumerate([
-    sum(l[2] for l in LIGNES),
-    sum(l[3] for l in LIGNES),
-    total_sd,
-    total_sc,
-], 3):
-    cell = ws.cell(row=data_row, column=col_offset, value=val)
-    cell.font = TOTAL_FONT
-    cell.fill = TOTAL_FILL
-    cell.number_format = NUM_FORMAT
-    cell.alignment = Alignment(horizontal="right", vertical="center")
-    cell.border = BORDER_STD
-ws.row_dimensions[data_row].height = 22
-
-# ---- Équilibre check ----
-data_row += 2
-ws.merge_cells(f"A{data_row}:F{data_row}")
-check_cell = ws[f"A{data_row}"]
-check_cell.value = (
-    f"✅  Balance ÉQUILIBRÉE — Σ Soldes Débiteurs = Σ Soldes Créditeurs = {total_sd:,.0f} FCFA  |  "
-    f"Résultat d'Exercice implicite (Produits - Charges) = {(sum(l[5] for l in LIGNES if l[0].startswith('7')) - sum(l[4] for l in LIGNES if l[0].startswith('6'))):,.0f} FCFA"
-)
-check_cell.font = Font(name="Calibri", bold=True, size=9, color="1A5276")
-check_cell.alignment = Alignment(horizontal="center")
-
-# ---- Freeze panes ----
-ws.freeze_panes = ws[f"A{HDR_ROW + 1}"]
 
 # ---------------------------------------------------------------------------
-# SAUVEGARDE
+# GÉNÉRATEUR DE VOLUMÉTRIE
 # ---------------------------------------------------------------------------
-OUTPUT_NAME = "test_balance_ETAL_COMMERCE_2025.xlsx"
-OUTPUT_PATH = os.path.join(os.path.dirname(__file__), OUTPUT_NAME)
-wb.save(OUTPUT_PATH)
-print(f"\n📁 Fichier généré : {OUTPUT_PATH}")
-print(f"\n📊 Résumé de la balance :")
-print(f"   Nombre de comptes  : {len(LIGNES)}")
-print(f"   Σ Soldes Débiteurs : {total_sd:>20,.0f} FCFA")
-print(f"   Σ Soldes Créditeurs: {total_sc:>20,.0f} FCFA")
-profit = sum(l[5] for l in LIGNES if l[0].startswith('7')) - \
-         sum(l[4] for l in LIGNES if l[0].startswith('6'))
-print(f"   Résultat Exercice  : {profit:>20,.0f} FCFA  (Bénéfice)" if profit >= 0 else
-      f"   Résultat Exercice  : {profit:>20,.0f} FCFA  (Perte)")
-print(f"\n✅ Prêt à importer dans Auditia via : Import > Importer une Balance")
+# Plan de comptes : (préfixe, libellé, sens du solde, poids, rotation)
+#   sens     : D = débiteur, C = créditeur, M = l'un ou l'autre
+#   poids    : part relative des lignes de balance sur ce préfixe (les tiers dominent)
+#   rotation : mouvements de l'exercice rapportés au solde (trésorerie et tiers tournent)
+CHART = [
+    # CLASSE 1 : RESSOURCES DURABLES
+    ("101", "Capital social",                                   "C", 1, 0.0),
+    ("111", "Réserve légale",                                   "C", 1, 0.0),
+    ("121", "Report à nouveau créditeur",                       "C", 1, 0.0),
+    ("162", "Emprunts auprès des établissements de crédit",     "C", 2, 0.3),
+    # CLASSE 2 : ACTIF IMMOBILISÉ
+    ("213", "Logiciels et sites internet",                      "D", 1, 0.1),
+    ("231", "Bâtiments industriels, agricoles et commerciaux",  "D", 2, 0.1),
+    ("241", "Matériel et outillage industriel",                 "D", 3, 0.2),
+    ("244", "Matériel et mobilier de bureau",                   "D", 2, 0.2),
+    ("245", "Matériel de transport",                            "D", 2, 0.2),
+    ("283", "Amortissements des bâtiments",                     "C", 1, 0.0),
+    ("284", "Amortissements du matériel",                       "C", 2, 0.0),
+    # CLASSE 3 : STOCKS
+    ("311", "Marchandises",                                     "D", 3, 2.0),
+    ("321", "Matières premières",                               "D", 2, 2.0),
+    # CLASSE 4 : TIERS
+    ("401", "Fournisseurs, dettes en compte",                   "C", 20, 3.0),
+    ("411", "Clients",                                          "D", 30, 3.0),
+    ("422", "Personnel, rémunérations dues",                    "C", 3, 4.0),
+    ("431", "Sécurité sociale",                                 "C", 2, 4.0),
+    ("441", "État, impôt sur les bénéfices",                    "C", 1, 1.0),
+    ("443", "État, TVA facturée",                               "C", 2, 4.0),
+    ("445", "État, TVA récupérable",                            "D", 2, 4.0),
+    ("471", "Débiteurs et créditeurs divers",                   "M", 3, 1.0),
+    # CLASSE 5 : TRÉSORERIE
+    ("521", "Banques locales",                                  "D", 3, 6.0),
+    ("571", "Caisse siège social",                              "D", 2, 6.0),
+    # CLASSE 6 : CHARGES
+    ("601", "Achats de marchandises",                           "D", 6, 0.05),
+    ("604", "Achats stockés de matières et fournitures",        "D", 3, 0.05),
+    ("605", "Autres achats",                                    "D", 4, 0.05),
+    ("611", "Transports sur achats",                            "D", 2, 0.05),
+    ("622", "Locations et charges locatives",                   "D", 2, 0.05),
+    ("624", "Entretien, réparations et maintenance",            "D", 2, 0.05),
+    ("627", "Publicité, publications, relations publiques",     "D", 1, 0.05),
+    ("631", "Frais bancaires",                                  "D", 1, 0.05),
+    ("632", "Rémunérations d'intermédiaires et de conseils",    "D", 2, 0.05),
+    ("641", "Impôts et taxes directs",                          "D", 1, 0.05),
+    ("661", "Rémunérations directes versées au personnel",      "D", 4, 0.05),
+    ("664", "Charges sociales",                                 "D", 2, 0.05),
+    ("671", "Intérêts des emprunts",                            "D", 1, 0.05),
+    ("681", "Dotations aux amortissements d'exploitation",      "D", 2, 0.0),
+    # CLASSE 7 : PRODUITS
+    ("701", "Ventes de marchandises",                           "C", 8, 0.05),
+    ("706", "Services vendus",                                  "C", 4, 0.05),
+    ("707", "Produits accessoires",                             "C", 1, 0.05),
+    ("771", "Intérêts de prêts et créances diverses",           "C", 1, 0.0),
+    # CLASSE 8 : HORS ACTIVITÉS ORDINAIRES
+    ("812", "Valeurs comptables des cessions d'immobilisations", "D", 1, 0.0),
+    ("822", "Produits des cessions d'immobilisations",          "C", 1, 0.0),
+]
+
+# Pièces types : (journal, libellé, [(préfixe, sens, montant)])
+#   montant : ht = base tirée, tva = 18 % de la base, ttc = ht + tva → pièce équilibrée
+ENTRY_TEMPLATES = [
+    ("VT", "Facture client",          [("411", "D", "ttc"), ("701", "C", "ht"), ("443", "C", "tva")], 30),
+    ("VT", "Facture de prestations",  [("411", "D", "ttc"), ("706", "C", "ht"), ("443", "C", "tva")], 10),
+    ("AC", "Facture fournisseur",     [("601", "D", "ht"), ("445", "D", "tva"), ("401", "C", "ttc")], 25),
+    ("AC", "Services extérieurs",     [("622", "D", "ht"), ("445", "D", "tva"), ("401", "C", "ttc")], 8),
+    ("BQ", "Règlement client",        [("521", "D", "ttc"), ("411", "C", "ttc")], 25),
+    ("BQ", "Règlement fournisseur",   [("401", "D", "ttc"), ("521", "C", "ttc")], 20),
+    ("BQ", "Frais bancaires",         [("631", "D", "ht"), ("521", "C", "ht")], 3),
+    ("OD", "Salaires du mois",        [("661", "D", "ht"), ("422", "C", "ht")], 4),
+    ("OD", "Dotation aux amortissements", [("681", "D", "ht"), ("284", "C", "ht")], 1),
+]
+
+JOURNAL_NAMES = {
+    "VT": "Ventes",
+    "AC": "Achats",
+    "BQ": "Banque",
+    "OD": "Opérations Diverses",
+}
+
+BALANCE_HEADERS = ["Compte", "Libellé", "Débit Mouvements", "Crédit Mouvements", "Solde Débiteur", "Solde Créditeur"]
+JOURNAL_HEADERS = ["Date", "Journal", "Pièce", "Compte", "Libellé", "Débit", "Crédit"]
+
+XLSX_MAX_ROWS = 1_048_576
+VAT_RATE = 0.18
+
+
+def parse_size(value: str) -> int:
+    """'1k' → 1 000, '100k' → 100 000, '1M' → 1 000 000, '2500' → 2 500."""
+    text = value.strip().lower().replace("_", "")
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    try:
+        return int(float(text[:-1] if factor > 1 else text) * factor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"taille invalide : {value}")
+
+
+def company_ref(index: int) -> tuple[str, str]:
+    """(NIF, raison sociale) of the index-th synthetic company."""
+    return f"TG{index:08d}", f"SOCIÉTÉ TEST {index:04d} SARL"
+
+
+def _serials(prefix_idx: np.ndarray) -> np.ndarray:
+    """1, 2, 3 ... within each prefix, in order of appearance."""
+    return pd.Series(prefix_idx).groupby(prefix_idx).cumcount().to_numpy() + 1
+
+
+def generate_balance(n_lines: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Balance of `n_lines` distinct accounts, columns code|label|debit_mvt|credit_mvt|solde_d|solde_c.
+    Soldes follow each prefix's usual side; the last line (121 Report à nouveau,
+    or 129 on the debit side) absorbs the difference so that Σ SD = Σ SC.
+    Amounts are whole FCFA.
+    """
+    if n_lines < 2:
+        raise ValueError("Une balance équilibrée demande au moins 2 lignes")
+    n = n_lines - 1
+    weights = np.array([c[3] for c in CHART], dtype=float)
+    idx = rng.choice(len(CHART), size=n, p=weights / weights.sum())
+    serial = _serials(idx)
+    width = max(3, len(str(int(serial.max()))))
+
+    prefixes = np.array([c[0] for c in CHART])[idx]
+    names = np.array([c[1] for c in CHART])[idx]
+    codes = pd.Series(prefixes).str.cat(pd.Series(serial).astype(str).str.zfill(width))
+    labels = pd.Series(names).str.cat(pd.Series(serial).astype(str), sep=" n°")
+
+    solde = np.maximum(np.rint(rng.lognormal(mean=13.0, sigma=1.6, size=n)), 1_000)
+    sides = np.array([c[2] for c in CHART])[idx]
+    mixed = sides == "M"
+    sides[mixed] = np.where(rng.random(mixed.sum()) < 0.5, "D", "C")
+    is_debit = sides == "D"
+    solde_d = np.where(is_debit, solde, 0)
+    solde_c = np.where(is_debit, 0, solde)
+
+    rotation = np.array([c[4] for c in CHART])[idx]
+    turnover = np.rint(solde * rotation * rng.random(n))
+    debit_mvt = solde_d + turnover
+    credit_mvt = solde_c + turnover
+
+    df = pd.DataFrame({
+        "code": codes, "label": labels,
+        "debit_mvt": debit_mvt, "credit_mvt": credit_mvt,
+        "solde_d": solde_d, "solde_c": solde_c,
+    })
+
+    gap = solde_d.sum() - solde_c.sum()
+    zero = "0" * width
+    closing = (
+        {"code": "121" + zero, "label": "Report à nouveau créditeur", "solde_d": 0, "solde_c": gap}
+        if gap >= 0 else
+        {"code": "129" + zero, "label": "Report à nouveau débiteur", "solde_d": -gap, "solde_c": 0}
+    )
+    closing.update(debit_mvt=closing["solde_d"], credit_mvt=closing["solde_c"])
+    df = pd.concat([df, pd.DataFrame([closing])], ignore_index=True)
+    df = df.sort_values("code", kind="stable", ignore_index=True)
+
+    for col in ("debit_mvt", "credit_mvt", "solde_d", "solde_c"):
+        df[col] = df[col].astype("int64")
+    assert df["solde_d"].sum() == df["solde_c"].sum()
+    return df
+
+
+def generate_journal(n_lines: int, fiscal_year: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Journal of about `n_lines` lines (whole entries only), columns
+    entry_no|date|journal|reference|code|label|debit|credit, sorted by date.
+    Each entry comes from ENTRY_TEMPLATES and balances on its own; customers and
+    suppliers are drawn from a pool of sub-accounts (411xxxxx / 401xxxxx).
+    """
+    sizes = np.array([len(t[2]) for t in ENTRY_TEMPLATES])
+    weights = np.array([t[3] for t in ENTRY_TEMPLATES], dtype=float)
+    weights /= weights.sum()
+
+    n_entries = int(n_lines / (sizes * weights).sum()) + 1
+    tpl = rng.choice(len(ENTRY_TEMPLATES), size=n_entries, p=weights)
+    tpl = tpl[np.cumsum(sizes[tpl]) <= n_lines]
+    n_entries = len(tpl)
+    if n_entries == 0:
+        raise ValueError("Journal trop petit : au moins 2 lignes par pièce")
+
+    start = np.datetime64(f"{fiscal_year}-01-01")
+    days = (np.datetime64(f"{fiscal_year + 1}-01-01") - start).astype(int)
+    dates = np.sort(start + rng.integers(0, days, size=n_entries).astype("timedelta64[D]"))
+
+    base = np.maximum(np.rint(rng.lognormal(mean=12.0, sigma=1.3, size=n_entries)), 500)
+    vat = np.rint(base * VAT_RATE)
+    amounts = {"ht": base, "tva": vat, "ttc": base + vat}
+
+    tiers_pool = max(50, n_entries // 100)
+    tiers = rng.integers(1, tiers_pool + 1, size=n_entries)
+    tiers_codes = pd.Series(tiers).astype(str).str.zfill(5).to_numpy()
+
+    journals = np.array([t[0] for t in ENTRY_TEMPLATES])[tpl]
+    # Numérotation continue par journal, dans l'ordre chronologique
+    seq = _serials(journals)
+    references = pd.Series(journals).str.cat(pd.Series(seq).astype(str).str.zfill(7)).to_numpy()
+    entry_labels = np.array([t[1] for t in ENTRY_TEMPLATES])[tpl]
+
+    parts = []
+    for t, (_, _, lines, _) in enumerate(ENTRY_TEMPLATES):
+        entries = np.flatnonzero(tpl == t)
+        if not len(entries):
+            continue
+        for pos, (prefix, side, kind) in enumerate(lines):
+            amount = amounts[kind][entries]
+            if prefix in ("401", "411"):
+                codes = prefix + tiers_codes[entries].astype(object)
+            else:
+                codes = np.full(len(entries), prefix + "100", dtype=object)
+            parts.append(pd.DataFrame({
+                "entry_no": entries,
+                "pos": pos,
+                "code": codes,
+                "debit": amount if side == "D" else 0.0,
+                "credit": amount if side == "C" else 0.0,
+            }))
+
+    df = pd.concat(parts, ignore_index=True).sort_values(["entry_no", "pos"], ignore_index=True)
+    df["date"] = dates[df["entry_no"].to_numpy()]
+    df["journal"] = journals[df["entry_no"].to_numpy()]
+    df["reference"] = references[df["entry_no"].to_numpy()]
+    df["label"] = pd.Series(entry_labels[df["entry_no"].to_numpy()]).str.cat(df["reference"], sep=" ")
+    for col in ("debit", "credit"):
+        df[col] = df[col].astype("int64")
+    assert df["debit"].sum() == df["credit"].sum()
+    return df[["entry_no", "date", "journal", "reference", "code", "label", "debit", "credit"]]
+
+
+# ---- Sorties fichiers ------------------------------------------------------
+
+def write_csv(path: str, headers: list[str], rows: pd.DataFrame):
+    rows.to_csv(path, sep=";", header=headers, index=False, encoding="utf-8")
+
+
+def write_xlsx(path: str, sheet: str, headers: list[str], rows: pd.DataFrame):
+    """Write-only workbook (no styles): the only way to produce 1M rows in reasonable time."""
+    if len(rows) + 1 > XLSX_MAX_ROWS:
+        raise ValueError(f"{len(rows):,} lignes : au-delà de la limite Excel ({XLSX_MAX_ROWS:,}). Utilisez --format csv.")
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(headers)
+    for row in rows.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path)
+
+
+def balance_rows(balance: pd.DataFrame) -> pd.DataFrame:
+    return balance[["code", "label", "debit_mvt", "credit_mvt", "solde_d", "solde_c"]]
+
+
+def journal_rows(journal: pd.DataFrame) -> pd.DataFrame:
+    out = journal[["date", "journal", "reference", "code", "label", "debit", "credit"]].copy()
+    # 365 dates distinctes au plus : formatées une fois chacune
+    days = out["date"].to_numpy()
+    unique_days = np.unique(days)
+    out["date"] = pd.to_datetime(unique_days).strftime("%d/%m/%Y").to_numpy()[np.searchsorted(unique_days, days)]
+    return out
+
+
+# ---- Écriture directe en base ---------------------------------------------
+
+def _get_or_create_company(db, tax_id: str, name: str):
+    from app import models
+
+    company = db.query(models.Company).filter(models.Company.tax_id == tax_id).first()
+    if not company:
+        company = models.Company(name=name, tax_id=tax_id, city="Lomé", address="Lomé, Togo")
+        db.add(company)
+        db.commit()
+    return company
+
+
+def load_balance_db(db, company_id: int, balance: pd.DataFrame, fiscal_year: int) -> dict:
+    """Same path as a real import: one BG-<year> entry, bulk inserts, one transaction."""
+    from app.services import balance_import
+
+    lines = pd.DataFrame({
+        "code": balance["code"],
+        "label": balance["label"],
+        "debit": balance["solde_d"].astype(float),
+        "credit": balance["solde_c"].astype(float),
+    })
+    lines = lines[(lines["debit"] != 0) | (lines["credit"] != 0)]
+    name = f"balance_synthetique_{fiscal_year}.xlsx"
+    document = balance_import.new_balance_document(company_id, name, fiscal_year)
+    return balance_import.write_balance(db, company_id, document, lines, 0, fiscal_year, name)
+
+
+def load_journal_db(db, company_id: int, journal: pd.DataFrame, chunk_size: int = 50_000) -> int:
+    """
+    Journals, missing accounts, entries (multi-row INSERT ... RETURNING),
+    lines (COPY on PostgreSQL) and their account_balances totals, all committed
+    at once. Returns the entry count.
+    """
+    from sqlalchemy import insert
+
+    from app import crud, models
+
+    try:
+        journal_ids = {}
+        for code in journal["journal"].unique():
+            db_journal = (
+                db.query(models.Journal)
+                .filter(models.Journal.company_id == company_id, models.Journal.code == code)
+                .first()
+            )
+            if not db_journal:
+                db_journal = models.Journal(code=code, name=JOURNAL_NAMES.get(code, code), company_id=company_id)
+                db.add(db_journal)
+                db.flush()
+            journal_ids[code] = db_journal.id
+
+        account_ids = crud.get_account_ids_by_code(db, company_id)
+        names = {c[0]: c[1] for c in CHART}
+        missing = sorted(set(journal["code"].unique()) - account_ids.keys())
+        account_ids.update(crud.bulk_create_accounts(
+            db,
+            [{"code": code, "name": names.get(code[:3], f"Compte {code}"), "class_code": int(code[0])} for code in missing],
+            company_id,
+        ))
+
+        headers = journal.drop_duplicates("entry_no")
+        entry_ids = []
+        header_rows = [
+            {"date": pd.Timestamp(d).to_pydatetime(), "reference": ref, "label": label,
+             "journal_id": journal_ids[j], "company_id": company_id, "validated": False, "created_at": datetime.utcnow()}
+            for d, ref, label, j in zip(headers["date"], headers["reference"], headers["label"], headers["journal"])
+        ]
+        stmt = insert(models.Entry).returning(models.Entry.id, sort_by_parameter_order=True)
+        for start in range(0, len(header_rows), chunk_size):
+            entry_ids.extend(db.scalars(stmt, header_rows[start:start + chunk_size]).all())
+
+        entry_id_of = dict(zip(headers["entry_no"], entry_ids))
+        line_rows = [
+            {"entry_id": entry_id_of[no], "company_id": company_id, "account_id": account_ids[code],
+             "debit": float(d), "credit": float(c), "label": label}
+            for no, code, d, c, label in zip(journal["entry_no"], journal["code"], journal["debit"],
+                                             journal["credit"], journal["label"])
+        ]
+        for start in range(0, len(line_rows), chunk_size * 4):
+            crud.bulk_create_entry_lines(db, line_rows[start:start + chunk_size * 4])
+
+        crud.record_account_balances(db, company_id, (
+            (account_ids[code], day, float(d), float(c), 1)
+            for code, day, d, c in zip(journal["code"], pd.DatetimeIndex(journal["date"]), journal["debit"],
+                                       journal["credit"])
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(entry_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Générateur de balances et journaux SYSCOHADA de test.")
+    parser.add_argument("--lines", type=parse_size, default=None, help="Lignes par balance (ex: 1k, 100k, 1M ; 0 = pas de balance)")
+    parser.add_argument("--journal", type=parse_size, default=0, help="Lignes de journal par société (0 = pas de journal)")
+    parser.add_argument("--companies", type=int, default=1, help="Nombre de sociétés")
+    parser.add_argument("--year", type=int, default=2025, help="Exercice")
+    parser.add_argument("--format", choices=["xlsx", "csv", "db"], default="xlsx")
+    parser.add_argument("--out", default="generated", help="Dossier de sortie (xlsx / csv)")
+    parser.add_argument("--seed", type=int, default=2025, help="Graine : mêmes options + même graine = mêmes données")
+    args = parser.parse_args()
+
+    if args.lines is None and not args.journal:
+        write_etal_balance()
+        return
+    n_lines = args.lines or 0
+
+    db = None
+    if args.format == "db":
+        from app.database import SessionLocal
+        db = SessionLocal()
+    else:
+        os.makedirs(args.out, exist_ok=True)
+
+    manifest = []
+    t0 = time.perf_counter()
+    try:
+        for i in range(1, args.companies + 1):
+            tax_id, name = company_ref(i)
+            rng = np.random.default_rng([args.seed, i])
+            company = _get_or_create_company(db, tax_id, name) if db else None
+
+            if n_lines:
+                balance = generate_balance(n_lines, rng)
+                if db:
+                    result = load_balance_db(db, company.id, balance, args.year)
+                    print(f"✅ {name} : balance {result['entries_count']:,} lignes (BG-{args.year})")
+                else:
+                    path = os.path.join(args.out, f"balance_{tax_id}_{args.year}.{args.format}")
+                    if args.format == "csv":
+                        write_csv(path, BALANCE_HEADERS, balance_rows(balance))
+                    else:
+                        write_xlsx(path, "Balance Générale", BALANCE_HEADERS, balance_rows(balance))
+                    manifest.append((tax_id, os.path.abspath(path)))
+                    print(f"✅ {path} : {len(balance):,} lignes, Σ SD = Σ SC = {balance['solde_d'].sum():,.0f} FCFA")
+
+            if args.journal:
+                journal = generate_journal(args.journal, args.year, rng)
+                if db:
+                    n_entries = load_journal_db(db, company.id, journal)
+                    print(f"✅ {name} : journal {len(journal):,} lignes, {n_entries:,} pièces")
+                else:
+                    path = os.path.join(args.out, f"journal_{tax_id}_{args.year}.{args.format}")
+                    if args.format == "csv":
+                        write_csv(path, JOURNAL_HEADERS, journal_rows(journal))
+                    else:
+                        write_xlsx(path, "Journal", JOURNAL_HEADERS, journal_rows(journal))
+                    print(f"✅ {path} : {len(journal):,} lignes, {journal['entry_no'].nunique():,} pièces")
+    finally:
+        if db:
+            db.close()
+
+    if manifest:
+        manifest_path = os.path.join(args.out, "manifest.csv")
+        with open(manifest_path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh, delimiter=";")
+            writer.writerow(["societe", "fichier"])
+            writer.writerows(manifest)
+        print(f"\n📁 Manifeste pour import_batch.py : {manifest_path}")
+    print(f"\nTerminé en {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Import de portefeuille en ligne de commande — plusieurs balances, plusieurs sociétés.
+
+Chaque fichier est associé à une société par son NIF (tax_id) ou son ID :
+  cd backend
+  python import_batch.py 1234567890=balances/etal_2025.xlsx 7=balances/sopal_2025.csv
+  python import_batch.py --manifest portefeuille.csv --workers 8
+  python import_batch.py --incremental 1234567890=balances/etal_2025_corrigee.xlsx
+
+Manifeste CSV (séparateur ; ou ,) : société;fichier — une ligne par balance,
+ligne d'en-tête facultative (ex. « societe;fichier », « nif;chemin »).
+Le parsing est réparti sur un pool de processus (un par cœur par défaut),
+chaque société est écrite dans sa propre transaction.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+from app.database import SessionLocal
+from app.services import batch_import, storage
+
+
+# Noms de colonnes reconnus pour la ligne d'en-tête du manifeste
+HEADER_COMPANY = {"societe", "société", "company", "company_id", "nif", "tax_id", "id"}
+HEADER_FILE = {"fichier", "file", "file_path", "chemin", "path", "balance"}
+
+
+def is_header(row: list[str]) -> bool:
+    company, file_path = (cell.strip().lower() for cell in row[:2])
+    return company in HEADER_COMPANY or file_path in HEADER_FILE
+
+
+def read_manifest(path: str) -> list[tuple[str, str]]:
+    """
+    (société, fichier) of every data row, in file order. Missing files are
+    kept: run_batch reports them as « fichier introuvable ».
+    """
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        sample = fh.read(2048)
+        fh.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,")
+        pairs = []
+        for row in csv.reader(fh, dialect):
+            if len(row) < 2 or not row[0].strip():
+                continue
+            if not pairs and is_header(row):
+                continue
+            pairs.append((row[0].strip(), row[1].strip()))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import de balances en lot (portefeuille de dossiers).")
+    parser.add_argument("items", nargs="*", metavar="SOCIETE=FICHIER", help="NIF ou ID de la société = chemin de la balance")
+    parser.add_argument("--manifest", help="CSV société;fichier")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de parsing (défaut : nombre de cœurs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Réimport : mettre à jour l'écriture BG-<exercice> existante (lignes modifiées uniquement)")
+    args = parser.parse_args()
+
+    pairs = [tuple(item.split("=", 1)) for item in args.items if "=" in item]
+    if args.manifest:
+        pairs += read_manifest(args.manifest)
+    if not pairs:
+        parser.error("aucun fichier à importer")
+
+    db = SessionLocal()
+    try:
+        items = []
+        for company_ref, src_path in pairs:
+            company_id = batch_import.resolve_company_id(db, company_ref)
+            item = {"filename": os.path.basename(src_path), "company": company_ref, "company_id": company_id}
+            if not os.path.exists(src_path):
+                item["error"] = f"Fichier introuvable : {src_path}"
+            elif company_id is not None:
+                item["file_path"], item["content_hash"] = storage.store_local_file(company_id, src_path)
+            items.append(item)
+
+        t0 = time.perf_counter()
+        summary = batch_import.summarize(batch_import.run_batch(db, items, args.workers, args.incremental))
+        elapsed = time.perf_counter() - t0
+    finally:
+        db.close()
+
+    for report in summary["reports"]:
+        if report["status"] == "success":
+            print(f"✅ {report['file']:<45} {report['company']:<15} "
+                  f"{report['entries_count']:>8,} lignes  écart {report['gap']:>14,.2f}")
+            if "lines_unchanged" in report:
+                print(f"   réimport : +{report['lines_added']} ~{report['lines_updated']} "
+                      f"-{report['lines_removed']} ({report['lines_unchanged']} inchangées)")
+            if report.get("gap_note"):
+                print(f"   {report['gap_note']}")
+        else:
+            print(f"❌ {report['file']:<45} {report['company']:<15} {report['error']}")
+
+    print(f"\n{summary['succeeded']}/{summary['files']} balances importées en {elapsed:.1f} s")
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Migration : montants en unités mineures (BIGINT, centièmes de FCFA).
+
+- entry_lines.debit / credit : FLOAT → BIGINT (montant × 100, arrondi).
+  PostgreSQL : ALTER COLUMN ... TYPE BIGINT USING ROUND(...).
+  SQLite (pas d'ALTER COLUMN) : table reconstruite (schéma figé dans ce
+  script, pas celui du modèle courant) puis recopiée ; index et triggers de
+  la table (dont ceux de la recherche plein texte) recréés à l'identique.
+- account_balances / account_monthly_balances : données dérivées, recréées
+  au nouveau type puis recalculées depuis entry_lines.
+
+Sans effet si les colonnes sont déjà en BIGINT. Exécuter :
+  cd backend
+  python migrate_money_minor_units.py
+"""
+
+from sqlalchemy import Float, inspect, text
+
+from app import crud, models
+from app.database import SessionLocal, engine
+from app.money import MINOR_UNITS
+
+AMOUNT_COLUMNS = ("debit", "credit")
+
+# entry_lines au moment de cette migration ; company_id seulement s'il existe déjà
+ENTRY_LINES_DDL = """CREATE TABLE entry_lines (
+    id INTEGER NOT NULL PRIMARY KEY,
+    entry_id INTEGER REFERENCES entries (id),
+    account_id INTEGER REFERENCES accounts (id),{company_id}
+    debit BIGINT,
+    credit BIGINT,
+    label VARCHAR
+)"""
+
+
+def _float_columns(table: str) -> list[str]:
+    columns = {col["name"]: col["type"] for col in inspect(engine).get_columns(table)}
+    return [name for name in AMOUNT_COLUMNS if isinstance(columns.get(name), Float)]
+
+
+def migrate_entry_lines():
+    if not inspect(engine).has_table("entry_lines"):
+        print("entry_lines absente : rien à migrer (create_all crée les colonnes en BIGINT).")
+        return
+    to_migrate = _float_columns("entry_lines")
+    if not to_migrate:
+        print("OK: entry_lines.debit / credit déjà en unités mineures")
+        return
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            for column in to_migrate:
+                conn.execute(text(
+                    f"ALTER TABLE entry_lines ALTER COLUMN {column} TYPE BIGINT "
+                    f"USING ROUND(COALESCE({column}, 0) * {MINOR_UNITS})::bigint"
+                ))
+        else:
+            # Index et triggers suivraient la table renommée : supprimés, puis recréés
+            # d'après leur définition une fois la copie faite (les triggers FTS ne
+            # voient donc pas la recopie ; les id sont conservés, l'index aussi)
+            schema = conn.execute(text(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE tbl_name = 'entry_lines' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+            )).all()
+            for kind, name, _ in schema:
+                conn.execute(text(f"DROP {kind.upper()} IF EXISTS {name}"))
+            # company_id (add_company_id_columns.py) recopié s'il existe déjà
+            has_company = "company_id" in {c["name"] for c in inspect(conn).get_columns("entry_lines")}
+            kept = ", company_id" if has_company else ""
+            conn.execute(text("ALTER TABLE entry_lines RENAME TO entry_lines_float"))
+            conn.execute(text(ENTRY_LINES_DDL.format(
+                company_id="\n    company_id INTEGER REFERENCES companies (id)," if has_company else ""
+            )))
+            conn.execute(text(
+                f"INSERT INTO entry_lines (id, entry_id, account_id{kept}, debit, credit, label) "
+                f"SELECT id, entry_id, account_id{kept}, "
+                f"CAST(ROUND(COALESCE(debit, 0) * {MINOR_UNITS}) AS INTEGER), "
+                f"CAST(ROUND(COALESCE(credit, 0) * {MINOR_UNITS}) AS INTEGER), label "
+                "FROM entry_lines_float"
+            ))
+            conn.execute(text("DROP TABLE entry_lines_float"))
+            for _, _, sql in schema:
+                conn.execute(text(sql))
+            if any(kind == "trigger" for kind, _, _ in schema):
+                print("OK: triggers de recherche plein texte d'entry_lines recréés")
+    print(f"OK: entry_lines.{' / '.join(to_migrate)} → BIGINT (× {MINOR_UNITS})")
+
+
+def rebuild_balances():
+    for model in (models.AccountBalance, models.AccountMonthlyBalance):
+        model.__table__.drop(bind=engine, checkfirst=True)
+        model.__table__.create(bind=engine)
+
+    db = SessionLocal()
+    try:
+        rows = crud.rebuild_account_balances(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"OK: account_balances / account_monthly_balances recalculées ({rows} lignes)")
+
+
+if __name__ == "__main__":
+    migrate_entry_lines()
+    rebuild_balances()
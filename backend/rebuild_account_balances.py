@@ -0,0 +1,45 @@
+"""
+Reconstruit les tables account_balances (totaux Débit / Crédit par société,
+compte et exercice) et account_monthly_balances (par société, compte et mois)
+à partir des lignes d'écriture.
+
+Les tables sont tenues à jour à chaque écriture ; la reconstruction sert après
+l'ajout des tables sur une base existante, un chargement hors application
+ou une correction manuelle en SQL :
+  cd backend
+  python rebuild_account_balances.py
+  python rebuild_account_balances.py --company 3
+"""
+
+import argparse
+import time
+
+from app import crud, models
+from app.database import SessionLocal, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruit account_balances et account_monthly_balances depuis entry_lines.")
+    parser.add_argument("--company", type=int, default=None, help="ID de la société (toutes par défaut)")
+    args = parser.parse_args()
+
+    models.AccountBalance.__table__.create(bind=engine, checkfirst=True)
+    models.AccountMonthlyBalance.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        rows = crud.rebuild_account_balances(db, args.company)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    scope = f"société {args.company}" if args.company is not None else "toutes les sociétés"
+    print(f"Soldes reconstruits ({scope}) : {rows} ligne(s) en {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
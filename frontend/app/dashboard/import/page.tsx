@@ -11,25 +11,11 @@ import {
     Upload, FileSpreadsheet, CheckCircle, AlertCircle,
     ArrowLeft, AlertTriangle, ArrowRight, Table2, BookOpen
 } from "lucide-react";
-import { importBalance } from "@/lib/api";
+import { importBalance, type ImportResult } from "@/lib/api";
 import Link from "next/link";
 import { useRouter } from "next/navigation";
 import { cn } from "@/lib/utils";
 
-interface ImportResult {
-    status: string;
-    document_id: number;
-    entries_count: number;
-    accounts_created: number;
-    accounts_matched: number;
-    skipped_rows: number;
-    fiscal_year: number;
-    total_debit: number;
-    total_credit: number;
-    gap: number;
-    gap_note: string | null;
-}
-
 const ACCEPTED_FORMATS = [
     { cols: "4 colonnes", desc: "Compte | Libellé | Débit | Crédit" },
     { cols: "6 colonnes", desc: "Compte | Libellé | Débit Mvt | Crédit Mvt | Solde D | Solde C" },
@@ -47,7 +47,21 @@ export async function getJournals(companyId: number): Promise<Journal[]> {
     return fetchAPI(`/accounting/journals/${companyId}`);
 }
 
-export async function importBalance(companyId: number, file: File) {
+export interface ImportResult {
+    status: string;
+    document_id: number;
+    entries_count: number;
+    accounts_created: number;
+    accounts_matched: number;
+    skipped_rows: number;
+    fiscal_year: number;
+    total_debit: number;
+    total_credit: number;
+    gap: number;
+    gap_note: string | null;
+}
+
+export async function importBalance(companyId: number, file: File): Promise<ImportResult> {
     const formData = new FormData();
     formData.append("file", file);
 
@@ -61,5 +75,68 @@ export async function importBalance(companyId: number, file: File) {
         throw new Error(errorData.detail || "Échec de l'import");
     }
 
+    // The import runs as a background job: poll until it is done
+    let job: ImportJob = await res.json();
+    while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = await getImportJob(job.id);
+    }
+
+    if (job.status === "failed") {
+        throw new Error(job.error || "Échec de l'import");
+    }
+
+    return job.result as ImportResult;
+}
+
+export interface ImportPreview {
+    status: "preview";
+    filename: string;
+    fiscal_year: number;
+    col_map: Record<string, string>;
+    rows_read: number;
+    lines_count: number;
+    skipped_rows: number;
+    sample_lines: { code: string; label: string; debit: number; credit: number }[];
+    total_debit: number;
+    total_credit: number;
+    gap: number;
+    suspense_adjustment: { code: string; label: string; debit: number; credit: number } | null;
+    gap_note: string | null;
+    accounts_to_create: number;
+    accounts_matched: number;
+    existing_entry_id: number | null;
+}
+
+export async function previewImportBalance(companyId: number, file: File, sample = 20): Promise<ImportPreview> {
+    const formData = new FormData();
+    formData.append("file", file);
+
+    const res = await fetch(`${API_BASE_URL}/accounting/import-balance/${companyId}/preview?sample=${sample}`, {
+        method: "POST",
+        body: formData,
+    });
+
+    if (!res.ok) {
+        const errorData = await res.json().catch(() => ({}));
+        throw new Error(errorData.detail || "Fichier inexploitable");
+    }
     return res.json();
 }
+
+export interface ImportJob {
+    id: number;
+    company_id: number;
+    document_id: number | null;
+    filename: string;
+    status: "queued" | "running" | "done" | "failed";
+    phase: string;
+    rows_parsed: number;
+    rows_written: number;
+    result: ImportResult | null;
+    error: string | null;
+}
+
+export async function getImportJob(jobId: number): Promise<ImportJob> {
+    return fetchAPI(`/accounting/import-jobs/${jobId}`);
+}